@@ -1,11 +1,17 @@
 """Truenas platform configuration."""
 
+from functools import partial
+
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers.device_registry import DeviceEntry
 
-from .const import PLATFORMS
+from .aggregate import FLEET_MIN_HOSTS, async_remove_fleet_device
+from .connection import async_get_connections
+from .const import DOMAIN, PLATFORMS
 from .coordinator import TruenasDataUpdateCoordinator
+from .fleet import async_get_fleet
+from .planner import async_get_planner
 from .service import async_setup_services
 
 type TruenasConfigEntry = ConfigEntry[TruenasDataUpdateCoordinator]
@@ -19,13 +25,40 @@ async def async_setup_entry(hass: HomeAssistant, entry: TruenasConfigEntry) -> b
 
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
     await async_setup_services(hass, coordinator)
+    entry.async_on_unload(async_get_fleet(hass).async_add(coordinator))
+    entry.async_on_unload(
+        partial(async_get_planner(hass).async_untrack, entry.entry_id)
+    )
+    entry.async_on_unload(entry.add_update_listener(async_update_options))
 
     return True
 
 
+async def async_update_options(hass: HomeAssistant, entry: TruenasConfigEntry) -> None:
+    """Apply the changed options in place, reload for the structural ones."""
+    if not entry.runtime_data.async_apply_options():
+        await hass.config_entries.async_reload(entry.entry_id)
+
+
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload a config entry."""
-    return await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
+    if unload_ok := await hass.config_entries.async_unload_platforms(entry, PLATFORMS):
+        # Kept open for a reload, closed if the entry is not set up again
+        await async_get_connections(hass).async_release(entry.entry_id)
+    return unload_ok
+
+
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Close the connection of a removed config entry."""
+    await async_get_connections(hass).async_close(entry.entry_id)
+    remaining = [
+        other
+        for other in hass.config_entries.async_entries(DOMAIN)
+        if other.entry_id != entry.entry_id
+    ]
+    if len(remaining) < FLEET_MIN_HOSTS:
+        # Kept while the hosts are unloaded, the fleet is gone with the entries
+        async_remove_fleet_device(hass)
 
 
 async def async_remove_config_entry_device(
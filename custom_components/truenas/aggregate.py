@@ -0,0 +1,243 @@
+"""Totals aggregated over all the TrueNAS hosts."""
+
+from __future__ import annotations
+
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from functools import partial
+from typing import TYPE_CHECKING, Any
+
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.helpers import device_registry as dr
+from homeassistant.helpers import entity_registry as er
+from homeassistant.util.hass_dict import HassKey
+
+from .apps import app_update_call
+from .const import DOMAIN
+from .helpers import finditem
+
+if TYPE_CHECKING:
+    from .coordinator import TruenasDataUpdateCoordinator
+
+DATA_AGGREGATOR: HassKey[FleetAggregator] = HassKey(f"{DOMAIN}_aggregator")
+# Hosts needed for the fleet sensors, a single host has its own sensors
+FLEET_MIN_HOSTS = 2
+
+
+def _pools_totals(pools: Any) -> dict[str, int]:
+    """Return the capacity and health totals of the pools of a host."""
+    totals = {"pool_free": 0, "pool_used": 0, "pools_unhealthy": 0}
+    for pool in pools or []:
+        totals["pool_free"] += pool.get("free") or 0
+        totals["pool_used"] += pool.get("allocated") or 0
+        totals["pools_unhealthy"] += pool.get("healthy") is False
+    return totals
+
+
+def _datasets_totals(datasets: Any) -> dict[str, int]:
+    """Return the number of datasets of a host."""
+    return {"datasets": len(datasets or [])}
+
+
+def _alerts_totals(events: Any) -> dict[str, int]:
+    """Return the number of active alerts of a host."""
+    alerts = finditem(events, "alert_list", []) if events else []
+    if not isinstance(alerts, list):
+        return {"alerts": 0}
+    return {"alerts": sum(1 for alert in alerts if not alert.get("dismissed"))}
+
+
+def _apps_totals(apps: Any) -> dict[str, int]:
+    """Return the number of apps of a host with an update available."""
+    return {
+        "apps_outdated": sum(
+            1 for app in apps or [] if app_update_call(app) is not None
+        )
+    }
+
+
+@dataclass(frozen=True, slots=True)
+class AggregateSource:
+    """A collection of the coordinator data contributing to the totals."""
+
+    key: str
+    totals_fn: Callable[[Any], dict[str, int]]
+    # The collection is changed in place, its identity does not tell a change
+    in_place: bool = False
+
+
+AGGREGATE_SOURCES: tuple[AggregateSource, ...] = (
+    AggregateSource("pools", _pools_totals),
+    AggregateSource("datasets", _datasets_totals),
+    AggregateSource("events", _alerts_totals, in_place=True),
+    AggregateSource("apps", _apps_totals),
+)
+AGGREGATE_TOTALS: tuple[str, ...] = (
+    "pool_free",
+    "pool_used",
+    "pools_unhealthy",
+    "datasets",
+    "alerts",
+    "apps_outdated",
+)
+
+
+@dataclass
+class FleetHost:
+    """The contribution of a host to the totals."""
+
+    coordinator: TruenasDataUpdateCoordinator
+    # Last collection seen and its totals, by data key
+    seen: dict[str, Any] = field(default_factory=dict)
+    parts: dict[str, dict[str, int]] = field(default_factory=dict)
+    unsub: CALLBACK_TYPE | None = None
+
+
+class FleetAggregator:
+    """Keep running totals over the coordinators of all the config entries.
+
+    The coordinator data replaces a collection with a new list when it
+    changes, so a host update only recomputes the contribution of the
+    collections it replaced and moves the totals by the difference with the
+    previous one. The totals are exposed by one set of fleet sensors while
+    there are ``FLEET_MIN_HOSTS`` hosts, added by the sensor platform of a
+    single entry and handed over to another entry when that one is unloaded.
+    """
+
+    def __init__(self) -> None:
+        """Initialize."""
+        self.hosts: dict[str, FleetHost] = {}
+        self.totals: dict[str, int] = dict.fromkeys(AGGREGATE_TOTALS, 0)
+        self.recomputed = 0
+        self._listeners: list[CALLBACK_TYPE] = []
+        self._adders: dict[str, Callable[[], CALLBACK_TYPE]] = {}
+        self._owner: str | None = None
+        self._remove_entities: CALLBACK_TYPE | None = None
+
+    @callback
+    def async_add(
+        self,
+        coordinator: TruenasDataUpdateCoordinator,
+        add_entities: Callable[[], CALLBACK_TYPE],
+    ) -> CALLBACK_TYPE:
+        """Add a host to the totals and return a callback removing it.
+
+        ``add_entities`` adds the fleet sensors to the platform of the host and
+        returns a callback removing them, it is called if no other entry
+        provides them once the fleet has enough hosts.
+        """
+        entry_id = coordinator.config_entry.entry_id
+        host = self.hosts[entry_id] = FleetHost(coordinator)
+        host.unsub = coordinator.async_add_listener(
+            partial(self._async_host_updated, entry_id)
+        )
+        self._adders[entry_id] = add_entities
+        self._async_host_updated(entry_id)
+        self._async_update_owner()
+        return partial(self._async_remove, entry_id)
+
+    @callback
+    def _async_remove(self, entry_id: str) -> None:
+        """Remove a host from the totals."""
+        self._adders.pop(entry_id, None)
+        if (host := self.hosts.pop(entry_id, None)) is None:
+            return
+        if host.unsub is not None:
+            host.unsub()
+        for part in host.parts.values():
+            self._async_apply(part, -1)
+        if self._owner == entry_id and len(self.hosts) >= FLEET_MIN_HOSTS:
+            # The fleet sensors were unloaded with the platform of this entry
+            self._owner = None
+            self._remove_entities = None
+        self._async_update_owner()
+        self._async_notify()
+
+    @callback
+    def _async_update_owner(self) -> None:
+        """Add the fleet sensors with enough hosts, remove them without."""
+        if len(self.hosts) < FLEET_MIN_HOSTS:
+            if self._remove_entities is not None:
+                self._remove_entities()
+            self._owner = None
+            self._remove_entities = None
+        elif self._owner is None:
+            self._owner = min(self._adders)
+            self._remove_entities = self._adders[self._owner]()
+
+    @callback
+    def _async_host_updated(self, entry_id: str) -> None:
+        """Move the totals by the changes of the collections of a host."""
+        if (host := self.hosts.get(entry_id)) is None:
+            return
+        data = host.coordinator.data or {}
+        changed = False
+        for source in AGGREGATE_SOURCES:
+            collection = data.get(source.key)
+            if (
+                not source.in_place
+                and source.key in host.seen
+                and host.seen[source.key] is collection
+            ):
+                continue
+            host.seen[source.key] = collection
+            part = source.totals_fn(collection)
+            self.recomputed += 1
+            previous = host.parts.get(source.key, {})
+            if part == previous:
+                continue
+            self._async_apply(previous, -1)
+            self._async_apply(part, 1)
+            host.parts[source.key] = part
+            changed = True
+        if changed:
+            self._async_notify()
+
+    @callback
+    def _async_apply(self, part: dict[str, int], sign: int) -> None:
+        """Add, or subtract, the contribution of a collection to the totals."""
+        for key, value in part.items():
+            self.totals[key] += sign * value
+
+    @callback
+    def async_add_listener(self, update_callback: CALLBACK_TYPE) -> CALLBACK_TYPE:
+        """Listen for changes of the totals."""
+        self._listeners.append(update_callback)
+        return partial(self._listeners.remove, update_callback)
+
+    @callback
+    def _async_notify(self) -> None:
+        """Notify the listeners of a change of the totals."""
+        for update_callback in list(self._listeners):
+            update_callback()
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the aggregator state as a dictionary."""
+        return {
+            "hosts": len(self.hosts),
+            "owner": self._owner,
+            "recomputed": self.recomputed,
+            "totals": dict(self.totals),
+        }
+
+
+@callback
+def async_remove_fleet_device(hass: HomeAssistant) -> None:
+    """Remove the fleet device and the registry entries of its sensors."""
+    devices = dr.async_get(hass)
+    if (device := devices.async_get_device(identifiers={(DOMAIN, "fleet")})) is None:
+        return
+    registry = er.async_get(hass)
+    for entity in er.async_entries_for_device(
+        registry, device.id, include_disabled_entities=True
+    ):
+        registry.async_remove(entity.entity_id)
+    devices.async_remove_device(device.id)
+
+
+@callback
+def async_get_aggregator(hass: HomeAssistant) -> FleetAggregator:
+    """Return the aggregator shared by the config entries."""
+    if (aggregator := hass.data.get(DATA_AGGREGATOR)) is None:
+        aggregator = hass.data[DATA_AGGREGATOR] = FleetAggregator()
+    return aggregator
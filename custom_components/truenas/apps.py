@@ -0,0 +1,148 @@
+"""Updates of many apps at once."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from functools import partial
+from typing import TYPE_CHECKING, Any
+
+from homeassistant.core import callback
+from homeassistant.exceptions import HomeAssistantError
+from truenaspy import TruenasException
+
+from .jobs import Job, is_job_id
+
+if TYPE_CHECKING:
+    from .coordinator import TruenasDataUpdateCoordinator
+
+_LOGGER = logging.getLogger(__name__)
+
+# Apps updated at the same time on a host
+APP_UPDATE_PARALLELISM = 2
+# Maximum wait (seconds) for the job of an app update
+APP_UPDATE_TIMEOUT = 3600
+
+
+def app_update_call(app: dict[str, Any]) -> tuple[str, list[Any]] | None:
+    """Return the method and params updating an app, None if it is current."""
+    if app.get("upgrade_available"):
+        return "app.upgrade", [app["id"]]
+    if app.get("image_updates_available"):
+        return "app.pull_images", [app["id"], {"redeploy": True}]
+    return None
+
+
+class AppUpdater:
+    """Update the apps of a host with a bounded parallelism.
+
+    Every update is followed through its job from the shared job tracker and
+    the progress of the run is the mean of the progress of its apps. The apps
+    are refetched once, when all the updates are done.
+    """
+
+    def __init__(self, coordinator: TruenasDataUpdateCoordinator) -> None:
+        """Initialize."""
+        self.coordinator = coordinator
+        self.percents: dict[str, int] = {}
+
+    @property
+    def running(self) -> bool:
+        """Return True if an update of the apps is running."""
+        return bool(self.percents)
+
+    @property
+    def progress(self) -> int | None:
+        """Return the progress percentage of the running update."""
+        if not self.percents:
+            return None
+        return sum(self.percents.values()) // len(self.percents)
+
+    def outdated(self) -> list[str]:
+        """Return the ids of the apps with an update available."""
+        return [
+            app["id"]
+            for app in (self.coordinator.data or {}).get("apps") or []
+            if app_update_call(app) is not None
+        ]
+
+    async def async_update(
+        self,
+        app_ids: list[str] | None = None,
+        parallelism: int = APP_UPDATE_PARALLELISM,
+    ) -> list[dict[str, Any]]:
+        """Update apps, all the outdated ones by default, and return the outcomes.
+
+        Apps without an update available are skipped.
+        """
+        if self.running:
+            raise HomeAssistantError("An update of the apps is already running")
+        apps = {app["id"]: app for app in self.coordinator.data.get("apps") or []}
+        updates = {
+            app_id: call
+            for app_id in (self.outdated() if app_ids is None else app_ids)
+            if (call := app_update_call(apps.get(app_id, {}))) is not None
+        }
+        if not updates:
+            return []
+
+        self.percents = dict.fromkeys(updates, 0)
+        self.coordinator.event_queue.async_schedule()
+        semaphore = asyncio.Semaphore(parallelism)
+        try:
+            results = await asyncio.gather(
+                *(
+                    self._async_update_app(semaphore, app_id, method, params)
+                    for app_id, (method, params) in updates.items()
+                )
+            )
+        finally:
+            self.percents = {}
+
+        try:
+            await self.coordinator.async_refresh_item("app.query", "apps")
+        except TruenasException as error:
+            _LOGGER.warning("Refresh of the apps failed: %s", error)
+            self.coordinator.event_queue.async_schedule()
+        return list(results)
+
+    async def _async_update_app(
+        self, semaphore: asyncio.Semaphore, app_id: str, method: str, params: list
+    ) -> dict[str, Any]:
+        """Update an app and wait for its job."""
+        status: dict[str, Any] = {"app": app_id, "method": method, "job_id": None}
+        error: str | None = None
+        async with semaphore:
+            try:
+                result = await self.coordinator.async_call(method, params)
+            except TruenasException as err:
+                error = str(err)
+            else:
+                if is_job_id(result):
+                    status["job_id"] = result
+                    error = await self._async_wait_job(app_id, result)
+            finally:
+                self.percents[app_id] = 100
+                self.coordinator.event_queue.async_schedule()
+        if error is not None:
+            _LOGGER.error("Update of %s failed: %s", app_id, error)
+        return {**status, "success": error is None, "error": error}
+
+    async def _async_wait_job(self, app_id: str, job_id: int) -> str | None:
+        """Follow the job of an app update and return its error, if any."""
+        job = self.coordinator.jobs.track(job_id)
+        remove_listener = job.async_add_listener(partial(self._async_progress, app_id))
+        try:
+            await job.async_wait(APP_UPDATE_TIMEOUT)
+        except TimeoutError:
+            return "timeout"
+        finally:
+            remove_listener()
+        return None if job.success else (job.error or job.state)
+
+    @callback
+    def _async_progress(self, app_id: str, job: Job) -> None:
+        """Report the progress of an app update."""
+        if (percent := job.percent) is not None and app_id in self.percents:
+            self.percents[app_id] = min(percent, 99)
+            self.coordinator.event_queue.async_schedule()
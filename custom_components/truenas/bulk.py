@@ -0,0 +1,107 @@
+"""Calls of a method over many targets."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import TYPE_CHECKING, Any
+
+from truenaspy import TruenasException
+
+from .jobs import is_job_id
+
+if TYPE_CHECKING:
+    from .coordinator import TruenasDataUpdateCoordinator
+
+_LOGGER = logging.getLogger(__name__)
+
+# Concurrent calls, core.bulk is only used for serial calls
+BULK_CONCURRENCY = 4
+# Maximum wait (seconds) for the job of each call
+BULK_JOB_TIMEOUT = 600
+
+
+async def async_call_bulk(
+    coordinator: TruenasDataUpdateCoordinator,
+    method: str,
+    params: list[list[Any]],
+    concurrency: int = BULK_CONCURRENCY,
+    timeout: float = BULK_JOB_TIMEOUT,
+    wait: bool = True,
+) -> list[dict[str, Any]]:
+    """Call a method once per params and return a status per call.
+
+    The calls run concurrently with at most ``concurrency`` calls in flight,
+    the job of each call is waited for through the job tracker for at most
+    ``timeout`` seconds. Every status is a core.bulk status: ``result``,
+    ``error`` and the ``job_id`` of the job the call started, if any.
+
+    core.bulk waits for the jobs of the calls one after the other, so it is
+    only used for serial calls (``concurrency`` of 1) that are waited for,
+    with a ``timeout`` for each call. Without ``wait`` the calls return as
+    soon as their jobs are started.
+    """
+    if not params:
+        return []
+    if wait and concurrency == 1:
+        try:
+            statuses = await _async_core_bulk(
+                coordinator, method, params, timeout * len(params)
+            )
+        except TruenasException as error:
+            _LOGGER.debug("core.bulk %s failed, calling one by one: %s", method, error)
+        else:
+            if statuses is not None:
+                return statuses
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def _async_call_one(call_params: list[Any]) -> dict[str, Any]:
+        async with semaphore:
+            try:
+                result = await coordinator.async_call(method, call_params)
+            except TruenasException as error:
+                return {"result": None, "error": str(error), "job_id": None}
+            if not is_job_id(result):
+                return {"result": result, "error": None, "job_id": None}
+            if not wait:
+                return {"result": None, "error": None, "job_id": result}
+            return await _async_wait_job(coordinator, result, timeout)
+
+    return list(await asyncio.gather(*(_async_call_one(p) for p in params)))
+
+
+async def _async_core_bulk(
+    coordinator: TruenasDataUpdateCoordinator,
+    method: str,
+    params: list[list[Any]],
+    timeout: float,
+) -> list[dict[str, Any]] | None:
+    """Run the calls in one core.bulk job and return its statuses.
+
+    Return None if core.bulk did not start a job.
+    """
+    job_id = await coordinator.async_call("core.bulk", [method, params])
+    if not is_job_id(job_id):
+        return None
+    status = await _async_wait_job(coordinator, job_id, timeout)
+    if status["error"] is not None or not isinstance(status["result"], list):
+        error = status["error"] or "no result"
+        return [{"result": None, "error": error, "job_id": None} for _ in params]
+    return [
+        {"result": s.get("result"), "error": s.get("error"), "job_id": s.get("job_id")}
+        for s in status["result"]
+    ]
+
+
+async def _async_wait_job(
+    coordinator: TruenasDataUpdateCoordinator, job_id: int, timeout: float
+) -> dict[str, Any]:
+    """Wait for a job and return its status."""
+    job = coordinator.jobs.track(job_id)
+    try:
+        await job.async_wait(timeout)
+    except TimeoutError:
+        return {"result": None, "error": "timeout", "job_id": job_id}
+    error = None if job.success else (job.error or job.state)
+    return {"result": job.result, "error": error, "job_id": job_id}
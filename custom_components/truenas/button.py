@@ -1,5 +1,8 @@
 """Button for TrueNAS integration."""
 
+from __future__ import annotations
+
+from collections.abc import Callable
 from dataclasses import dataclass
 import logging
 from typing import Final
@@ -8,18 +11,50 @@ from truenaspy import TruenasException
 
 from homeassistant.components.button import ButtonEntity, ButtonEntityDescription
 from homeassistant.core import HomeAssistant
+from homeassistant.exceptions import HomeAssistantError
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 
 from . import TruenasConfigEntry
 from .entity import TruenasEntity, TruenasEntityDescription
 
 
+class ButtonSensor(TruenasEntity, ButtonEntity):
+    """Representation of a button for TrueNAS."""
+
+    entity_description: TruenasButtonEntityDescription
+
+    async def async_press(self) -> None:
+        """Handle the button press."""
+        try:
+            await self.coordinator.async_call(method=self.entity_description.fn)
+            await self.coordinator.async_refresh_item(
+                "system.info", self.entity_description.api
+            )
+        except TruenasException as error:
+            _LOGGER.error(error)
+
+
+class AppsUpdateButton(ButtonSensor):
+    """Representation of a button updating all the outdated apps of a host."""
+
+    async def async_press(self) -> None:
+        """Start the update of the outdated apps, followed by the apps sensor."""
+        if self.coordinator.app_updates.running:
+            raise HomeAssistantError("An update of the apps is already running")
+        self.coordinator.config_entry.async_create_background_task(
+            self.hass,
+            self.coordinator.app_updates.async_update(),
+            "truenas update all apps",
+        )
+
+
 @dataclass(frozen=True, kw_only=True)
 class TruenasButtonEntityDescription(ButtonEntityDescription, TruenasEntityDescription):
     """Class describing entities."""
 
-    fn: str
+    fn: str | None = None
     attribute: str | None = None
+    cls: Callable[..., ButtonSensor] = ButtonSensor
 
 
 BUTTON_LIST: Final[tuple[TruenasButtonEntityDescription, ...]] = (
@@ -39,6 +74,14 @@ BUTTON_LIST: Final[tuple[TruenasButtonEntityDescription, ...]] = (
         device="System",
         api="system_infos",
     ),
+    TruenasButtonEntityDescription(
+        key="apps_update",
+        name="Update all apps",
+        icon="mdi:package-up",
+        device="Apps",
+        api="apps",
+        cls=AppsUpdateButton,
+    ),
 )
 
 _LOGGER = logging.getLogger(__name__)
@@ -51,22 +94,7 @@ async def async_setup_entry(
 ) -> None:
     """Set up sensor."""
     coordinator = entry.runtime_data
-    entities = [ButtonSensor(coordinator, description) for description in BUTTON_LIST]
+    entities = [
+        description.cls(coordinator, description) for description in BUTTON_LIST
+    ]
     async_add_entities(entities)
-
-
-class ButtonSensor(TruenasEntity, ButtonEntity):
-    """Representation of a button for TrueNAS."""
-
-    entity_description: TruenasButtonEntityDescription
-
-    async def async_press(self) -> None:
-        """Handle the button press."""
-        try:
-            await self.coordinator.websocket.async_call(
-                method=self.entity_description.fn
-            )
-        except TruenasException as error:
-            _LOGGER.error(error)
-        else:
-            await self.coordinator.async_refresh()
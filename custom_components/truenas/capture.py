@@ -0,0 +1,150 @@
+"""Capture of the TrueNAS websocket traffic."""
+
+from __future__ import annotations
+
+import asyncio
+import gzip
+import logging
+import time
+from contextlib import suppress
+from typing import TYPE_CHECKING, Any
+
+from homeassistant.components import persistent_notification
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.core import HomeAssistant
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers.json import json_bytes
+from homeassistant.util import dt as dt_util
+
+from .const import DOMAIN, TO_REDACT
+
+if TYPE_CHECKING:
+    from .coordinator import TruenasDataUpdateCoordinator
+
+_LOGGER = logging.getLogger(__name__)
+
+CAPTURE_VERSION = 1
+MAX_RECORDS = 200_000
+# Fired with the file, records and dropped counts once a capture is written
+EVENT_CAPTURE_DONE = f"{DOMAIN}_capture_done"
+
+
+class TrafficCapture:
+    """Record calls, responses and events with their timestamps.
+
+    The capture is written as gzip compressed JSON lines: a header line
+    followed by one record per line. Calls are stored as
+    ``{"t", "type": "call", "method", "params", "result" | "error", "elapsed"}``
+    and events as ``{"t", "type": "event", "event"}`` where ``t`` is the offset
+    in seconds from the start of the capture.
+    """
+
+    def __init__(self) -> None:
+        """Initialize."""
+        self.started = dt_util.utcnow()
+        self.records: list[dict[str, Any]] = []
+        self.dropped = 0
+        self.stop = asyncio.Event()
+        self._start = time.monotonic()
+
+    def _append(self, record: dict[str, Any]) -> None:
+        """Append a redacted record."""
+        if len(self.records) >= MAX_RECORDS:
+            self.dropped += 1
+            return
+        record["t"] = round(time.monotonic() - self._start, 4)
+        self.records.append(async_redact_data(record, TO_REDACT))
+
+    def record_call(
+        self,
+        method: str,
+        params: Any,
+        elapsed: float,
+        result: Any = None,
+        error: str | None = None,
+    ) -> None:
+        """Record a call and its response."""
+        record: dict[str, Any] = {
+            "type": "call",
+            "method": method,
+            "params": params,
+            "elapsed": round(elapsed, 4),
+        }
+        if error is not None:
+            record["error"] = error
+        else:
+            record["result"] = result
+        self._append(record)
+
+    def record_event(self, event: dict[str, Any]) -> None:
+        """Record an event received from a subscription."""
+        self._append({"type": "event", "event": event})
+
+    def write(self, path: str) -> None:
+        """Write the capture to a file."""
+        header = {
+            "version": CAPTURE_VERSION,
+            "started": self.started.isoformat(),
+            "records": len(self.records),
+            "dropped": self.dropped,
+        }
+        with gzip.open(path, "wb") as file:
+            file.write(json_bytes(header) + b"\n")
+            for record in self.records:
+                file.write(json_bytes(record) + b"\n")
+
+
+async def async_start_capture(
+    hass: HomeAssistant, coordinator: TruenasDataUpdateCoordinator, duration: float
+) -> None:
+    """Start a capture of the coordinator traffic in the background."""
+    if coordinator.capture is not None:
+        raise HomeAssistantError("A TrueNAS capture is already running")
+
+    capture = coordinator.capture = TrafficCapture()
+    coordinator.config_entry.async_create_background_task(
+        hass,
+        _async_run_capture(hass, coordinator, capture, duration),
+        "truenas capture",
+    )
+
+
+def async_stop_capture(coordinator: TruenasDataUpdateCoordinator) -> None:
+    """Stop the running capture, its file is written right after."""
+    if coordinator.capture is None:
+        raise HomeAssistantError("No TrueNAS capture is running")
+    coordinator.capture.stop.set()
+
+
+async def _async_run_capture(
+    hass: HomeAssistant,
+    coordinator: TruenasDataUpdateCoordinator,
+    capture: TrafficCapture,
+    duration: float,
+) -> None:
+    """Capture for a duration or until stopped, then write the file."""
+    try:
+        # Every collection is fetched while capturing, whatever the plan
+        await coordinator.async_refresh()
+        with suppress(TimeoutError):
+            async with asyncio.timeout(duration):
+                await capture.stop.wait()
+    finally:
+        coordinator.capture = None
+
+    path = hass.config.path(
+        f"truenas_capture_{capture.started.strftime('%Y%m%d_%H%M%S')}.jsonl.gz"
+    )
+    await hass.async_add_executor_job(capture.write, path)
+    _LOGGER.debug("Capture of %s records written to %s", len(capture.records), path)
+    report = {"file": path, "records": len(capture.records), "dropped": capture.dropped}
+    hass.bus.async_fire(
+        EVENT_CAPTURE_DONE,
+        {"config_entry_id": coordinator.config_entry.entry_id, **report},
+    )
+    persistent_notification.async_create(
+        hass,
+        f"{report['records']} record(s) captured, capture written to {path}",
+        title="TrueNAS capture",
+        notification_id=f"{DOMAIN}_capture",
+    )
@@ -2,16 +2,12 @@
 
 from typing import Any
 
-from truenaspy import (
-    AuthenticationFailed,
-    ConnectionError,
-    TruenasException,
-    TruenasWebsocket,
-)
+from truenaspy import AuthenticationFailed, ConnectionError, TruenasException
 import voluptuous as vol
 
 from homeassistant import config_entries
 from homeassistant.const import (
+    CONF_API_KEY,
     CONF_HOST,
     CONF_NAME,
     CONF_PASSWORD,
@@ -22,20 +18,45 @@ from homeassistant.const import (
 )
 from homeassistant.core import callback
 from homeassistant.data_entry_flow import FlowResult
-from homeassistant.helpers.aiohttp_client import async_create_clientsession
-
-from .const import CONF_CHECK_DEV_VERSION, CONF_NOTIFY, DEFAULT_PORT, DOMAIN
+from homeassistant.helpers import config_validation as cv
+
+from .connection import TruenasClient, async_websocket_options
+from .const import (
+    CONF_CHECK_DEV_VERSION,
+    CONF_EVENT_INTERVAL,
+    CONF_LIVE_COLLECTIONS,
+    CONF_NOTIFY,
+    CONF_SOCKET_PATH,
+    CONF_TRANSPORT,
+    DEFAULT_EVENT_INTERVAL,
+    DEFAULT_LIVE_COLLECTIONS,
+    DEFAULT_PORT,
+    DEFAULT_SOCKET_PATH,
+    DOMAIN,
+    TRANSPORT_TCP,
+    TRANSPORT_UNIX,
+    TRANSPORTS,
+)
+from .filters import FILTERED_COLLECTIONS, filter_option, row_filters
+from .live import LIVE_COLLECTIONS
 
 DATA_SCHEMA = vol.Schema(
     {
         vol.Required(CONF_NAME, default="Truenas", description="Unique Name"): str,
-        vol.Required(CONF_HOST): str,
+        vol.Optional(CONF_HOST): str,
         vol.Required(CONF_USERNAME): str,
-        vol.Required(CONF_PASSWORD): str,
-        vol.Required(CONF_PORT, default=DEFAULT_PORT): int,
-        # vol.Optional(CONF_API_KEY): str,
-        vol.Required(CONF_SSL, default=True): bool,
-        vol.Required(CONF_VERIFY_SSL, default=True): bool,
+        vol.Optional(CONF_PASSWORD): str,
+        vol.Optional(CONF_API_KEY): str,
+        # Only used by the TCP transport
+        vol.Optional(CONF_PORT, description={"suggested_value": DEFAULT_PORT}): int,
+        vol.Optional(CONF_SSL, description={"suggested_value": True}): bool,
+        vol.Optional(CONF_VERIFY_SSL, description={"suggested_value": True}): bool,
+        vol.Optional(
+            CONF_TRANSPORT, description={"suggested_value": TRANSPORT_TCP}
+        ): vol.In(TRANSPORTS),
+        vol.Optional(
+            CONF_SOCKET_PATH, description={"suggested_value": DEFAULT_SOCKET_PATH}
+        ): str,
     }
 )
 
@@ -43,6 +64,14 @@ OPTIONS_SCHEMA = vol.Schema(
     {
         vol.Required(CONF_NOTIFY, default=False): bool,
         vol.Optional(CONF_CHECK_DEV_VERSION, default=False): bool,
+        vol.Optional(
+            CONF_EVENT_INTERVAL, description={"suggested_value": DEFAULT_EVENT_INTERVAL}
+        ): vol.All(vol.Coerce(int), vol.Range(min=0, max=5000)),
+        vol.Optional(
+            CONF_LIVE_COLLECTIONS,
+            description={"suggested_value": DEFAULT_LIVE_COLLECTIONS},
+        ): cv.multi_select({method: method for method in LIVE_COLLECTIONS}),
+        **{vol.Optional(filter_option(key)): str for key in FILTERED_COLLECTIONS},
     }
 )
 
@@ -68,20 +97,27 @@ class TruenasFlowHandler(config_entries.ConfigFlow, domain=DOMAIN):
         """Handle a flow initialized by the user."""
         errors = {}
         websocket = None
-        if user_input:
+        if user_input and not (
+            user_input.get(CONF_PASSWORD) or user_input.get(CONF_API_KEY)
+        ):
+            errors["base"] = "missing_credentials"
+        elif (
+            user_input
+            and user_input.get(CONF_TRANSPORT) != TRANSPORT_UNIX
+            and not user_input.get(CONF_HOST)
+        ):
+            # Only the unix socket of middlewared goes without a host
+            errors["base"] = "missing_host"
+        elif user_input:
             try:
                 name = user_input[CONF_NAME]
                 await self.async_set_unique_id(name)
                 self._abort_if_unique_id_configured()
-                websocket = TruenasWebsocket(
-                    user_input[CONF_HOST],
-                    user_input[CONF_PORT],
-                    user_input[CONF_SSL],
-                    user_input[CONF_VERIFY_SSL],
-                    async_create_clientsession(self.hass),
+                websocket = TruenasClient(
+                    **async_websocket_options(self.hass, user_input)
                 )
                 await websocket.async_connect(
-                    user_input[CONF_USERNAME], user_input[CONF_PASSWORD]
+                    user_input[CONF_USERNAME], user_input.get(CONF_PASSWORD)
                 )
                 if websocket.is_connected is False:
                     errors["base"] = "cannot_connect"
@@ -107,17 +143,27 @@ class TruenasFlowHandler(config_entries.ConfigFlow, domain=DOMAIN):
         )
 
 
-class TruenasOptionsFlowHandler(config_entries.OptionsFlowWithReload):
-    """Handle option."""
+class TruenasOptionsFlowHandler(config_entries.OptionsFlow):
+    """Handle option.
+
+    The options are applied to the running entry by its update listener.
+    """
 
     async def async_step_init(self, user_input=None):
         """Handle a flow initialized by the user."""
+        errors = {}
         if user_input:
-            return self.async_create_entry(title="", data=user_input)
+            try:
+                row_filters(user_input)
+            except ValueError:
+                errors["base"] = "invalid_filter"
+            else:
+                return self.async_create_entry(title="", data=user_input)
 
         return self.async_show_form(
             step_id="init",
             data_schema=self.add_suggested_values_to_schema(
-                OPTIONS_SCHEMA, self.config_entry.options
+                OPTIONS_SCHEMA, user_input or self.config_entry.options
             ),
+            errors=errors,
         )
@@ -0,0 +1,361 @@
+"""Websocket connections shared across the reloads of the config entries."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections import Counter
+from collections.abc import Awaitable, Callable, Mapping
+from datetime import datetime
+from functools import partial
+from typing import TYPE_CHECKING, Any
+
+from aiohttp import ClientSession, UnixConnector
+from homeassistant.const import (
+    CONF_API_KEY,
+    CONF_HOST,
+    CONF_PASSWORD,
+    CONF_PORT,
+    CONF_SSL,
+    CONF_USERNAME,
+    CONF_VERIFY_SSL,
+    EVENT_HOMEASSISTANT_CLOSE,
+    EVENT_HOMEASSISTANT_STOP,
+)
+from homeassistant.core import CALLBACK_TYPE, Event, HassJob, HomeAssistant, callback
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from homeassistant.helpers.event import async_call_later
+from homeassistant.util.hass_dict import HassKey
+from truenaspy import (
+    AuthenticationFailed,
+    ExecutionFailed,
+    TimeoutExceededError,
+    TruenasException,
+    TruenasWebsocket,
+)
+
+from .const import (
+    CONF_SOCKET_PATH,
+    CONF_TRANSPORT,
+    DEFAULT_PORT,
+    DEFAULT_SOCKET_PATH,
+    DOMAIN,
+    TRANSPORT_UNIX,
+)
+
+if TYPE_CHECKING:
+    from homeassistant.config_entries import ConfigEntry
+
+_LOGGER = logging.getLogger(__name__)
+
+DATA_CONNECTIONS: HassKey[ConnectionManager] = HassKey(f"{DOMAIN}_connections")
+DATA_UNIX_SESSIONS: HassKey[dict[str, ClientSession]] = HassKey(
+    f"{DOMAIN}_unix_sessions"
+)
+# Seconds a released connection is kept open for the entry to be set up again
+CONNECTION_LINGER = 30
+# Seconds a session token stays valid once unused
+LOGIN_TOKEN_TTL = 600
+LOGIN_SUCCESS = "SUCCESS"
+
+CONNECTION_SETTINGS = (
+    CONF_TRANSPORT,
+    CONF_SOCKET_PATH,
+    CONF_HOST,
+    CONF_PORT,
+    CONF_SSL,
+    CONF_VERIFY_SSL,
+    CONF_USERNAME,
+    CONF_PASSWORD,
+    CONF_API_KEY,
+)
+
+
+@callback
+def async_get_unix_session(hass: HomeAssistant, path: str) -> ClientSession:
+    """Return the session connecting through a unix socket, closed with HA."""
+    sessions = hass.data.setdefault(DATA_UNIX_SESSIONS, {})
+    if (session := sessions.get(path)) is not None and not session.closed:
+        return session
+    session = sessions[path] = ClientSession(connector=UnixConnector(path=path))
+
+    async def _async_close(_: Event) -> None:
+        await session.close()
+
+    hass.bus.async_listen_once(EVENT_HOMEASSISTANT_CLOSE, _async_close)
+    return session
+
+
+@callback
+def async_websocket_options(
+    hass: HomeAssistant, data: Mapping[str, Any]
+) -> dict[str, Any]:
+    """Return the TruenasClient arguments for the connection settings.
+
+    Through the unix socket of middlewared, on the NAS itself, the websocket
+    skips TLS and the network stack; the host only names the request.
+    """
+    if data.get(CONF_TRANSPORT) == TRANSPORT_UNIX:
+        return {
+            "host": "localhost",
+            "use_tls": False,
+            "session": async_get_unix_session(
+                hass, data.get(CONF_SOCKET_PATH) or DEFAULT_SOCKET_PATH
+            ),
+            "api_key": data.get(CONF_API_KEY),
+        }
+    return {
+        "host": data[CONF_HOST],
+        "port": data.get(CONF_PORT, DEFAULT_PORT),
+        "use_tls": data.get(CONF_SSL, True),
+        "verify_ssl": data.get(CONF_VERIFY_SSL, True),
+        "session": async_get_clientsession(hass),
+        "api_key": data.get(CONF_API_KEY),
+    }
+
+
+class TruenasClient(TruenasWebsocket):
+    """A websocket logging in with the cheapest credentials it holds.
+
+    Once connected, the client asks middlewared for a session token and logs
+    in with it when connecting again: checking a token costs a lookup, where
+    an API key or a password is hashed and password logins are rate limited.
+    A rejected token, for instance after a restart of middlewared, is dropped
+    for the API key if one is configured, else the password.
+
+    The logins go through auth.login_ex with async_call; truenaspy only logs
+    in with a password, the login step of its async_connect is taken over
+    for the other mechanisms, hence the exact truenaspy requirement.
+    """
+
+    def __init__(self, *args: Any, api_key: str | None = None, **kwargs: Any) -> None:
+        """Initialize."""
+        super().__init__(*args, **kwargs)
+        self.api_key = api_key
+        self.token: str | None = None
+        # Mechanism of the current login
+        self.mechanism: str | None = None
+        self.logins: Counter[str] = Counter()
+
+    @property
+    def is_logged(self) -> bool:
+        """Return True if logged in."""
+        return self.mechanism is not None or super().is_logged
+
+    async def async_connect(
+        self, username: str, password: str | None
+    ) -> asyncio.Task[Any]:
+        """Connect, log in, then ask for a session token for the next login.
+
+        A token is generated after every login, a token login included, so the
+        next one never uses a token close to its expiry.
+        """
+        listener = await super().async_connect(username, password)
+        try:
+            self.token = await self.async_call(
+                method="auth.generate_token", params=[LOGIN_TOKEN_TTL]
+            )
+        except TruenasException as error:
+            _LOGGER.debug("No session token, credentials used again: %s", error)
+            self.token = None
+        return listener
+
+    async def async_close(self) -> None:
+        """Close the websocket."""
+        self.mechanism = None
+        await super().async_close()
+
+    async def async_login(self, payload: dict[str, Any]) -> bool:
+        """Log in with auth.login_ex and return whether it succeeded."""
+        try:
+            response = await self.async_call(method="auth.login_ex", params=payload)
+        except (TimeoutExceededError, ExecutionFailed) as error:
+            _LOGGER.debug("%s login failed: %s", payload["mechanism"], error)
+            return False
+        if response.get("response_type") != LOGIN_SUCCESS:
+            return False
+        self.mechanism = payload["mechanism"]
+        self.logins[self.mechanism] += 1
+        return True
+
+    async def _async_handle_login(self, username: str, password: str) -> None:
+        """Log in with the session token or the API key, else the password."""
+        self.mechanism = None
+        if self.token is not None:
+            if await self.async_login(
+                {"mechanism": "TOKEN_PLAIN", "token": self.token}
+            ):
+                return
+            _LOGGER.debug("Session token rejected, logging in with credentials")
+            self.token = None
+        if not self.api_key:
+            await super()._async_handle_login(username, password)
+            self.mechanism = "PASSWORD_PLAIN"
+            self.logins[self.mechanism] += 1
+            return
+        if not await self.async_login(
+            {
+                "mechanism": "API_KEY_PLAIN",
+                "username": username,
+                "api_key": self.api_key,
+            }
+        ):
+            raise AuthenticationFailed("Login failed")
+
+
+class TruenasConnection:
+    """A websocket and the collections subscribed on it.
+
+    Every collection is subscribed once on the websocket with a dispatcher
+    forwarding its events to the callback of the current coordinator, so a
+    coordinator set up again on the same connection only replaces the
+    callbacks and the middleware keeps a single subscription per collection.
+    """
+
+    def __init__(self, websocket: TruenasClient, settings: tuple) -> None:
+        """Initialize."""
+        self.websocket = websocket
+        self.settings = settings
+        self.handlers: dict[str, Callable[[dict], Awaitable[None]]] = {}
+        # Collections with a dispatcher on the websocket
+        self.registered: set[str] = set()
+        # Collections subscribed on the current socket of the websocket
+        self.subscribed: set[str] = set()
+        self._socket: Any = None
+        self.reuses = 0
+        self.unsub_close: CALLBACK_TYPE | None = None
+
+    async def async_subscribe(
+        self, collection: str, handler: Callable[[dict], Awaitable[None]]
+    ) -> None:
+        """Forward the events of a collection to a handler."""
+        self.handlers[collection] = handler
+        if self.websocket.ws is not self._socket:
+            # Connected again, the subscriptions of the previous socket are lost
+            self._socket = self.websocket.ws
+            self.subscribed.clear()
+        if collection in self.subscribed:
+            return
+        if collection in self.registered:
+            await self.websocket.async_call("core.subscribe", [collection])
+        else:
+            await self.websocket.async_subscribe(
+                collection, partial(self._async_dispatch, collection)
+            )
+            self.registered.add(collection)
+        self.subscribed.add(collection)
+
+    async def async_unsubscribe(self, collection: str) -> None:
+        """Stop forwarding the events of a collection and unsubscribe from it."""
+        self.handlers.pop(collection, None)
+        if collection not in self.registered or not self.websocket.is_connected:
+            # The dispatcher stays, subscribed again with the next handler
+            return
+        self.registered.discard(collection)
+        self.subscribed.discard(collection)
+        try:
+            await self.websocket.async_unsubscribe(collection)
+        except TruenasException as error:
+            _LOGGER.debug("Unsubscribing from %s failed: %s", collection, error)
+
+    async def _async_dispatch(self, collection: str, data: dict) -> None:
+        """Forward an event to the handler of its collection."""
+        if (handler := self.handlers.get(collection)) is not None:
+            await handler(data)
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the connection state as a dictionary."""
+        return {
+            "connected": self.websocket.is_connected,
+            "subscribed": sorted(self.subscribed),
+            "reuses": self.reuses,
+            "released": self.unsub_close is not None,
+        }
+
+
+class ConnectionManager:
+    """Own the websockets of the config entries.
+
+    A connection released by an unloaded entry unsubscribes from its
+    collections and is kept open for ``CONNECTION_LINGER`` seconds: a reload
+    of the entry, for instance after an options change, takes it back, logged
+    in, unless the connection settings changed, and subscribes again to the
+    collections its new coordinator follows. It is closed when
+    the delay expires, when the entry is removed and when Home Assistant
+    stops.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize."""
+        self.hass = hass
+        self.connections: dict[str, TruenasConnection] = {}
+        self.closed = 0
+        hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STOP, self._async_stop)
+
+    async def async_acquire(
+        self, entry: ConfigEntry, factory: Callable[[], TruenasClient]
+    ) -> TruenasConnection:
+        """Return the connection of an entry, the released one if still usable."""
+        settings = tuple(entry.data.get(key) for key in CONNECTION_SETTINGS)
+        if (connection := self.connections.get(entry.entry_id)) is not None:
+            self._async_cancel_close(connection)
+            if connection.settings == settings:
+                connection.reuses += 1
+                return connection
+            await self.async_close(entry.entry_id)
+        connection = self.connections[entry.entry_id] = TruenasConnection(
+            factory(), settings
+        )
+        return connection
+
+    async def async_release(self, entry_id: str) -> None:
+        """Stop the events of an entry and close its connection later."""
+        if (connection := self.connections.get(entry_id)) is None:
+            return
+        for collection in list(connection.registered):
+            await connection.async_unsubscribe(collection)
+        connection.handlers.clear()
+        self._async_cancel_close(connection)
+        connection.unsub_close = async_call_later(
+            self.hass,
+            CONNECTION_LINGER,
+            HassJob(partial(self._async_expired, entry_id), cancel_on_shutdown=True),
+        )
+
+    async def _async_expired(self, entry_id: str, _: datetime) -> None:
+        """Close a released connection not taken back."""
+        if (connection := self.connections.get(entry_id)) is not None:
+            connection.unsub_close = None
+            await self.async_close(entry_id)
+
+    async def async_close(self, entry_id: str) -> None:
+        """Close the connection of an entry."""
+        if (connection := self.connections.pop(entry_id, None)) is None:
+            return
+        self._async_cancel_close(connection)
+        connection.handlers.clear()
+        try:
+            await connection.websocket.async_close()
+        except TruenasException as error:
+            _LOGGER.debug("Closing the connection of %s failed: %s", entry_id, error)
+        self.closed += 1
+
+    @callback
+    def _async_cancel_close(self, connection: TruenasConnection) -> None:
+        """Cancel the delayed close of a connection."""
+        if connection.unsub_close is not None:
+            connection.unsub_close()
+            connection.unsub_close = None
+
+    async def _async_stop(self, _: Event) -> None:
+        """Close all the connections when Home Assistant stops."""
+        for entry_id in list(self.connections):
+            await self.async_close(entry_id)
+
+
+@callback
+def async_get_connections(hass: HomeAssistant) -> ConnectionManager:
+    """Return the connection manager shared by the config entries."""
+    if (manager := hass.data.get(DATA_CONNECTIONS)) is None:
+        manager = hass.data[DATA_CONNECTIONS] = ConnectionManager(hass)
+    return manager
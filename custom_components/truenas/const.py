@@ -4,7 +4,18 @@ from homeassistant.const import Platform
 
 CONF_NOTIFY = "notify"
 CONF_CHECK_DEV_VERSION = "check_dev_version"
+CONF_EVENT_INTERVAL = "event_interval"
+DEFAULT_EVENT_INTERVAL = 250
+CONF_LIVE_COLLECTIONS = "live_collections"
+DEFAULT_LIVE_COLLECTIONS = ["app.query"]
 DEFAULT_PORT = 443
+CONF_TRANSPORT = "transport"
+CONF_SOCKET_PATH = "socket_path"
+# Websocket over TCP, or through the middlewared unix socket of the NAS itself
+TRANSPORT_TCP = "tcp"
+TRANSPORT_UNIX = "unix"
+TRANSPORTS = [TRANSPORT_TCP, TRANSPORT_UNIX]
+DEFAULT_SOCKET_PATH = "/var/run/middleware/middlewared.sock"
 DOMAIN = "truenas"
 PLATFORMS = [
     Platform.BINARY_SENSOR,
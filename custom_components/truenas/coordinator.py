@@ -1,28 +1,44 @@
 """Coordinator platform."""
 
+import asyncio
+import contextlib
 import logging
+import time
 from collections import Counter
-from datetime import timedelta
+from collections.abc import Awaitable, Callable, Mapping
+from functools import partial
 from typing import TYPE_CHECKING, Any
 
 from aiohttp import WebSocketError
-from homeassistant.const import (
-    CONF_HOST,
-    CONF_PASSWORD,
-    CONF_PORT,
-    CONF_SSL,
-    CONF_USERNAME,
-    CONF_VERIFY_SSL,
-    EVENT_HOMEASSISTANT_STOP,
-)
-from homeassistant.core import CALLBACK_TYPE, Event, HomeAssistant, callback
-from homeassistant.helpers.aiohttp_client import async_create_clientsession
+from homeassistant.const import CONF_PASSWORD, CONF_USERNAME
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
 from packaging import version
-from truenaspy import TruenasException, TruenasWebsocket
-
-from .const import DOMAIN
+from truenaspy import TruenasException
+
+from .apps import AppUpdater
+from .capture import TrafficCapture
+from .connection import (
+    TruenasClient,
+    TruenasConnection,
+    async_get_connections,
+    async_websocket_options,
+)
+from .const import (
+    CONF_EVENT_INTERVAL,
+    CONF_LIVE_COLLECTIONS,
+    DEFAULT_EVENT_INTERVAL,
+    DEFAULT_LIVE_COLLECTIONS,
+    DOMAIN,
+)
+from .events import EventQueue
+from .filters import FILTERED_METHODS, FilteredMethod, RowFilter, row_filters
 from .helpers import finditem
+from .jobs import JobTracker, is_job_id
+from .live import LIVE_COLLECTIONS, LiveCollection
+from .metrics import TruenasMetrics
+from .planner import async_get_planner
+from .tasks import TASK_QUERIES, TaskMonitor
 
 if TYPE_CHECKING:
     from . import TruenasConfigEntry
@@ -30,6 +46,38 @@ if TYPE_CHECKING:
 
 _LOGGER = logging.getLogger(__name__)
 SCAN_INTERVAL = 60
+# Maximum wait (seconds) for the job started by an action before its refresh
+ACTION_JOB_TIMEOUT = 120
+# Coordinator data keys fetched for the entities reading them, see FetchPlanner
+PLANNED_COLLECTIONS = (
+    "interfaces",
+    "snapshots",
+    "disks",
+    "disks_temperatures",
+    "update_available",
+    "update_infos",
+    "smartdisks",
+    "virtualmachines",
+    "apps",
+    "datasets",
+    "pools",
+    "services",
+    *TASK_QUERIES.values(),
+)
+
+
+def _event_interval(options: Mapping[str, Any]) -> float:
+    """Return the event notification interval (seconds) of the options."""
+    return options.get(CONF_EVENT_INTERVAL, DEFAULT_EVENT_INTERVAL) / 1000
+
+
+def _live_methods(options: Mapping[str, Any]) -> list[str]:
+    """Return the methods of the live collections of the options."""
+    return [
+        method
+        for method in options.get(CONF_LIVE_COLLECTIONS, DEFAULT_LIVE_COLLECTIONS)
+        if method in LIVE_COLLECTIONS
+    ]
 
 
 class TruenasDataUpdateCoordinator(DataUpdateCoordinator):
@@ -44,63 +92,102 @@ class TruenasDataUpdateCoordinator(DataUpdateCoordinator):
             _LOGGER,
             name=DOMAIN,
             config_entry=config_entry,
-            update_interval=timedelta(seconds=SCAN_INTERVAL),
+            # Refreshes are started by the fleet scheduler, every SCAN_INTERVAL
+            update_interval=None,
         )
-        self.unsub: CALLBACK_TYPE | None = None
         self._events = {}
-        self.websocket: TruenasWebsocket
+        self.metrics = TruenasMetrics()
+        self.subscriptions: dict[str, str] = {}
+        self.capture: TrafficCapture | None = None
+        self.event_queue = EventQueue(
+            hass,
+            _event_interval(config_entry.options),
+            self._async_publish_events,
+            self.metrics.fanout,
+        )
+        self.jobs = JobTracker()
+        self.tasks = TaskMonitor(self)
+        self.tasks.async_start()
+        self.app_updates = AppUpdater(self)
+        self.filters = row_filters(config_entry.options)
+        self.live: dict[str, LiveCollection] = {
+            method: LiveCollection(
+                method, LIVE_COLLECTIONS[method], accept=self._row_accept(method)
+            )
+            for method in _live_methods(config_entry.options)
+        }
+        self.connection: TruenasConnection
+        self.websocket: TruenasClient
+        # The connection was taken back logged in, without our subscriptions
+        self._resubscribe = False
 
     async def _async_setup(self) -> None:
         """Start Truenas connection."""
-
-        self.websocket = TruenasWebsocket(
-            self.config_entry.data[CONF_HOST],
-            self.config_entry.data[CONF_PORT],
-            use_tls=self.config_entry.data[CONF_SSL],
-            verify_ssl=self.config_entry.data[CONF_VERIFY_SSL],
-            session=async_create_clientsession(self.hass),
+        self.connection = await async_get_connections(self.hass).async_acquire(
+            self.config_entry, self._create_websocket
         )
+        self.websocket = self.connection.websocket
+        self._resubscribe = self.websocket.is_connected
 
-        self._setup_websocket_monitoring()
+    def _create_websocket(self) -> TruenasClient:
+        """Return a new websocket to the host of the config entry."""
+        return TruenasClient(
+            **async_websocket_options(self.hass, self.config_entry.data)
+        )
 
     async def _ensure_connection(self) -> None:
         """Ensure websocket is connected."""
         if self.websocket.is_connected:
+            if self._resubscribe:
+                self._resubscribe = False
+                await self._websockets_events_subscribers()
+            elif self.subscriptions.get("core.get_jobs") != "subscribed":
+                # Without the job events, the tracked jobs are polled
+                await self.async_poll_jobs()
             return
 
+        # Live collections need a new snapshot once subscribed again and the
+        # task runs finished while disconnected were not followed
+        for live in self.live.values():
+            live.reset()
+        self.tasks.invalidate()
+
         try:
             await self.websocket.async_connect(
                 self.config_entry.data[CONF_USERNAME],
-                self.config_entry.data[CONF_PASSWORD],
+                self.config_entry.data.get(CONF_PASSWORD),
             )
         except WebSocketError as error:
+            self.metrics.record_connect(False)
             self.logger.error("Error connecting to WebSocket: %s", error)
             raise UpdateFailed(f"WebSocket connection failed: {error}") from error
         else:
+            self.metrics.record_connect(True)
             await self._websockets_events_subscribers()
 
-    @callback
-    def _setup_websocket_monitoring(self) -> None:
-        """Setup WebSocket monitoring and cleanup."""
-
-        async def close_websocket(_: Event) -> None:
-            """Close WebSocket on HA shutdown."""
-            if self.unsub:
-                self.unsub()
-                self.unsub = None
-            await self.websocket.async_close()
-
-        # Cleanup sur shutdown
-        self.unsub = self.hass.bus.async_listen_once(
-            EVENT_HOMEASSISTANT_STOP, close_websocket
-        )
+    async def async_call(self, method: str, params: Any | None = None) -> Any:
+        """Call a method on the websocket and record its metrics."""
+        start = time.perf_counter()
+        try:
+            result = await self.websocket.async_call(method=method, params=params)
+        except TruenasException as error:
+            elapsed = time.perf_counter() - start
+            self.metrics.record_call(method, elapsed, error=True)
+            if self.capture is not None:
+                self.capture.record_call(method, params, elapsed, error=str(error))
+            raise
+        elapsed = time.perf_counter() - start
+        self.metrics.record_call(method, elapsed, result)
+        if self.capture is not None:
+            self.capture.record_call(method, params, elapsed, result)
+        return result
 
     async def _async_call(
         self, method: str, params: list | None = None, critical: bool = True
     ) -> Any:
         """Call a method on the websocket."""
         try:
-            return await self.websocket.async_call(method=method, params=params)
+            return await self.async_call(method=method, params=params)
         except TruenasException as error:
             if critical:
                 raise UpdateFailed(
@@ -110,27 +197,197 @@ class TruenasDataUpdateCoordinator(DataUpdateCoordinator):
             self.logger.warning("Non-critical call %s failed, continuing", method)
             return {}
 
-    async def _async_update_data(self) -> dict:
-        """Update data."""
-        await self._ensure_connection()
+    @callback
+    def async_apply_options(self) -> bool:
+        """Apply the options of the config entry to the running coordinator.
+
+        The entities read the other options when their state is written, so
+        they are written again. Return False when the live collections or the
+        filters changed: their subscriptions, or the entities, need the entry
+        to be reloaded.
+        """
+        options = self.config_entry.options
+        if (
+            set(_live_methods(options)) != set(self.live)
+            or row_filters(options) != self.filters
+        ):
+            return False
+        self.event_queue.interval = _event_interval(options)
+        self.async_update_listeners()
+        return True
+
+    async def async_shutdown(self) -> None:
+        """Cancel the pending event notification."""
+        self.event_queue.async_cancel()
+        await super().async_shutdown()
+
+    async def async_refresh_item(
+        self,
+        method: str,
+        key: str,
+        field: str | None = None,
+        uid: Any | None = None,
+    ) -> None:
+        """Refetch a collection, or a single object of it, and merge it in.
+
+        With a field and a uid, the query is filtered on the matching object
+        and only this object is replaced in the collection.
+        """
+        if uid is None:
+            result = self._filter_rows(
+                method, await self.async_call(method, self._query_params(method))
+            )
+            if (live := self.live.get(method)) is not None and isinstance(result, list):
+                result = live.snapshot(result)
+            if self.data is not None:
+                self.data[key] = result
+                self.async_update_listeners()
+            return
+
+        result = await self.async_call(method, [[[field, "=", uid]]])
+        rows = [row for row in result or [] if row.get(field) == uid]
+        if (live := self.live.get(method)) is not None:
+            live.merge(field, uid, rows)
+        if self.data is None:
+            return
+
+        merged: list[dict[str, Any]] = []
+        replaced = False
+        for row in self.data.get(key) or []:
+            if row.get(field) != uid:
+                merged.append(row)
+            elif not replaced:
+                merged.extend(rows)
+                replaced = True
+        if not replaced:
+            merged.extend(rows)
+        self.data[key] = merged
+        self.async_update_listeners()
+
+    @callback
+    def async_schedule_item_refresh(
+        self, result: Any, method: str, key: str, field: str, uid: Any
+    ) -> asyncio.Task[None]:
+        """Refresh an object once the action which returned result is done.
+
+        Actions running as a job return its id: the refresh then waits for the
+        job to finish, in the background. Return the refresh task.
+        """
+        return self.config_entry.async_create_background_task(
+            self.hass,
+            self._async_refresh_after_job(result, method, key, field, uid),
+            f"truenas refresh {key} {uid}",
+        )
 
+    async def _async_refresh_after_job(
+        self, result: Any, method: str, key: str, field: str, uid: Any
+    ) -> None:
+        """Wait for the job of an action and refresh the object it changed."""
+        if is_job_id(result):
+            with contextlib.suppress(TimeoutError):
+                await self.jobs.track(result).async_wait(ACTION_JOB_TIMEOUT)
         try:
-            return await self._fetch_data()
+            await self.async_refresh_item(method, key, field, uid)
         except TruenasException as error:
-            raise UpdateFailed(error) from error
+            self.logger.warning("Refresh of %s %s failed: %s", key, uid, error)
+
+    async def _async_query(self, method: str, critical: bool = True) -> Any:
+        """Query a collection, served from its live copy when it is healthy."""
+        if (live := self.live.get(method)) is not None and live.healthy:
+            return live.serve()
+        result = self._filter_rows(
+            method,
+            await self._async_call(
+                method, self._query_params(method), critical=critical
+            ),
+        )
+        if live is not None and isinstance(result, list):
+            return live.snapshot(result)
+        return result
+
+    def _row_filter(self, method: str) -> tuple[FilteredMethod, RowFilter] | None:
+        """Return the collection of a method and its rules, if any."""
+        if (filtered := FILTERED_METHODS.get(method)) is None:
+            return None
+        if (row_filter := self.filters.get(filtered.key)) is None:
+            return None
+        return filtered, row_filter
+
+    def _query_params(self, method: str) -> list | None:
+        """Return the query-filters of the rules on the rows of a method."""
+        if (rules := self._row_filter(method)) is None or not rules[0].query_filters:
+            return None
+        filtered, row_filter = rules
+        return [row_filter.query_filters(filtered.field)]
+
+    def _filter_rows(self, method: str, rows: Any) -> Any:
+        """Apply the rules on the rows of a method taking no query-filters."""
+        if (rules := self._row_filter(method)) is None or rules[0].query_filters:
+            return rows
+        filtered, row_filter = rules
+        return row_filter.apply(filtered.field, rows)
+
+    def _row_accept(self, method: str) -> Callable[[Mapping[str, Any]], bool] | None:
+        """Return the test of the rows kept by the rules of a method."""
+        if (rules := self._row_filter(method)) is None:
+            return None
+        filtered, row_filter = rules
+        return partial(row_filter.match, filtered.field)
+
+    @callback
+    def _async_publish_events(self) -> None:
+        """Publish the changed live collections and notify the listeners."""
+        if self.data is not None:
+            for live in self.live.values():
+                if live.dirty:
+                    self.data[live.key] = live.as_list()
+                    live.dirty = False
+        self.async_update_listeners()
+
+    async def _async_update_data(self) -> dict:
+        """Update data."""
+        self.metrics.start_refresh()
+        success = False
+        try:
+            await self._ensure_connection()
+            try:
+                data = await self._fetch_data()
+            except TruenasException as error:
+                raise UpdateFailed(error) from error
+            success = True
+        finally:
+            self.metrics.finish_refresh(success)
+
+        data["metrics"] = self.metrics.summary()
+        return data
 
     async def _fetch_data(self) -> dict[str, Any]:
-        """Fetch data."""
+        """Fetch data.
+
+        The collections no enabled entity reads are only fetched when the
+        planner tells so and keep their previous rows in between.
+        """
+        previous = self.data or {}
+        due = self._async_plan()
 
         # FETCH system infos to check version
         system_infos = await self._async_call("system.info")
         data: dict[str, Any] = {"system_infos": system_infos}
+        # The collections not due this time, as they were last fetched
+        data.update(
+            {
+                key: previous[key]
+                for key in PLANNED_COLLECTIONS
+                if key not in due and key in previous
+            }
+        )
 
         # Fetch network interfaces
-        interfaces = await self._async_call("interface.query")
-        data["interfaces"] = list(
-            filter(lambda x: "mac" not in x.get("name", ""), interfaces)
-        )
+        if "interfaces" in due:
+            interfaces = await self._async_call("interface.query")
+            data["interfaces"] = list(
+                filter(lambda x: "mac" not in x.get("name", ""), interfaces)
+            )
 
         # Fetch network statistics
         net_stats = finditem(self._events, "reporting_realtime.interfaces", {})
@@ -139,12 +396,12 @@ class TruenasDataUpdateCoordinator(DataUpdateCoordinator):
                 "name": iface.get("name"),
                 "statistics": net_stats.get(iface.get("name"), {}),
             }
-            for iface in data["interfaces"]
+            for iface in data.get("interfaces", [])
         ]
 
         # Fetch snapshots
-        snapshots = (
-            await self._async_call(
+        if "snapshots" in due:
+            snapshots = await self._async_call(
                 method="zfs.snapshot.query",
                 params=[
                     [
@@ -153,17 +410,15 @@ class TruenasDataUpdateCoordinator(DataUpdateCoordinator):
                     ],
                     {"select": ["dataset", "snapshot_name", "pool"]},
                 ],
-            ),
-        )
-        data["snapshots"] = [
-            {"name": k, "count": v}
-            for k, v in Counter(
-                s.get("pool") for s in snapshots[0] if len(snapshots) > 0
-            ).items()
-        ]
+            )
+            data["snapshots"] = [
+                {"name": k, "count": v}
+                for k, v in Counter(s.get("pool") for s in snapshots).items()
+            ]
 
         # Fetch disks data
-        data["disks"] = await self._async_call("disk.details")
+        if "disks" in due:
+            data["disks"] = await self._async_call("disk.details")
 
         if version.parse(system_infos["version"]) <= version.parse("25.10.0"):
 
@@ -171,10 +426,10 @@ class TruenasDataUpdateCoordinator(DataUpdateCoordinator):
                 """Fetch disks data for versions < 25.10.0."""
                 disktemps = []
 
+                disks = data.get("disks", {})
                 all_disks = {
                     disk.get("identifier"): disk
-                    for disk in data["disks"].get("used", [])
-                    + data["disks"].get("unused", [])
+                    for disk in disks.get("used", []) + disks.get("unused", [])
                 }
 
                 netdata = await self._async_call(
@@ -200,61 +455,157 @@ class TruenasDataUpdateCoordinator(DataUpdateCoordinator):
                             )
                 return disktemps
 
-            data["update_available"] = await self._async_call("update.check_available")
-            data["update_infos"] = await self._async_call("update.get_pending")
-            data["smartdisks"] = await self._async_call("smart.test.results")
-            data["disks_temperatures"] = await disktemps()
-            data["virtualmachines"] = await self._async_call("virt.instance.query")
+            if "update_available" in due:
+                data["update_available"] = await self._async_call(
+                    "update.check_available"
+                )
+            if "update_infos" in due:
+                data["update_infos"] = await self._async_call("update.get_pending")
+            if "smartdisks" in due:
+                data["smartdisks"] = await self._async_call("smart.test.results")
+            if "disks_temperatures" in due:
+                data["disks_temperatures"] = await disktemps()
+            if "virtualmachines" in due:
+                data["virtualmachines"] = await self._async_query("virt.instance.query")
 
         if version.parse(system_infos["version"]) >= version.parse("25.10.0"):
-            data["update_available"] = await self._async_call(
-                "update.available_versions"
-            )
-            data["update_infos"] = await self._async_call("update.status")
-            data["disks_temperatures"] = [
-                {"name": k, "temperature": v}
-                for k, v in (await self._async_call("disk.temperatures")).items()
-            ]
-            data["virtualmachines"] = await self._async_call("vm.query")
-
-        other_data = {
-            "apps": await self._async_call("app.query", critical=False),
-            "datasets": await self._async_call("pool.dataset.details", critical=False),
-            "pools": await self._async_call("pool.query", critical=False),
-            "services": await self._async_call("service.query", critical=False),
-            "replications": await self._async_call("replication.query", critical=False),
-            "cloudsync": await self._async_call("cloudsync.query", critical=False),
-            "snapshottasks": await self._async_call(
-                "pool.snapshottask.query", critical=False
-            ),
-            "rsynctasks": await self._async_call("rsynctask.query", critical=False),
-            "events": self._events,
-        }
-
-        data.update(other_data)
-        _LOGGER.debug("Truenas Data: %s", data)
+            if "update_available" in due:
+                data["update_available"] = await self._async_call(
+                    "update.available_versions"
+                )
+            if "update_infos" in due:
+                data["update_infos"] = await self._async_call("update.status")
+            if "disks_temperatures" in due:
+                data["disks_temperatures"] = [
+                    {"name": k, "temperature": v}
+                    for k, v in (await self._async_call("disk.temperatures")).items()
+                ]
+            if "virtualmachines" in due:
+                data["virtualmachines"] = await self._async_query("vm.query")
+
+        for method, key in (
+            ("app.query", "apps"),
+            ("pool.dataset.details", "datasets"),
+            ("pool.query", "pools"),
+            ("service.query", "services"),
+        ):
+            if key in due:
+                data[key] = await self._async_query(method, critical=False)
+        data.update(await self.tasks.async_fetch(due))
+        data["events"] = self._events
+
+        # Only log the collection sizes, the full payload is hundreds of KB
+        _LOGGER.debug(
+            "Truenas data: %s",
+            {
+                key: len(value) if isinstance(value, (list, dict)) else 1
+                for key, value in data.items()
+            },
+        )
 
         return data
 
+    @callback
+    def _async_plan(self) -> set[str]:
+        """Return the collections to fetch at this refresh.
+
+        All of them until a refresh succeeded, the entities are created from
+        it, and while a capture is running, so it holds every polled method.
+        The live collections are served from their events at no cost, they
+        are always taken.
+        """
+        planner = async_get_planner(self.hass)
+        if self.data is None or self.capture is not None:
+            # Nothing is skipped, every collection is fetched
+            planner.async_fetched(self.config_entry.entry_id, PLANNED_COLLECTIONS)
+            return set(PLANNED_COLLECTIONS)
+        live = {live.key for live in self.live.values()}
+        return live | planner.async_plan(
+            self.config_entry.entry_id,
+            [key for key in PLANNED_COLLECTIONS if key not in live],
+        )
+
     async def _websockets_events_subscribers(self) -> None:
         """Subscribe to WebSocket events."""
-        await self.websocket.async_subscribe(
+        await self._async_subscribe(
             "reporting.realtime", self._make_event_callback(scalar=True, notify=True)
         )
-        await self.websocket.async_subscribe("alert.list", self._make_event_callback())
-        await self.websocket.async_subscribe(
+        await self._async_subscribe("alert.list", self._make_event_callback())
+        await self._async_subscribe(
             "update.status", self._make_event_callback(scalar=True, notify=True)
         )
-        await self.websocket.async_subscribe(
-            "app.query", self._make_event_callback(scalar=False, notify=True)
-        )
+        if "app.query" not in self.live:
+            await self._async_subscribe(
+                "app.query", self._make_event_callback(scalar=False, notify=True)
+            )
+        for method, live in self.live.items():
+            await self._async_subscribe(method, self._make_live_callback(live))
+            live.subscribed = self.subscriptions[method] == "subscribed"
+        await self._async_subscribe("core.get_jobs", self._async_job_event)
+        # The jobs may have finished while their events could not be received
+        await self.async_poll_jobs()
+
+    async def _async_subscribe(
+        self, collection: str, callback: Callable[[dict], Awaitable[None]]
+    ) -> None:
+        """Subscribe to a collection and keep track of the subscription state."""
+        try:
+            await self.connection.async_subscribe(collection, callback)
+        except TruenasException as error:
+            self.subscriptions[collection] = "failed"
+            self.logger.warning("Subscription to %s failed: %s", collection, error)
+        else:
+            self.subscriptions[collection] = "subscribed"
+
+    async def async_poll_jobs(self) -> None:
+        """Query the tracked jobs not finished yet and apply their state.
+
+        Their events are missed while disconnected, or all along when the
+        core.get_jobs subscription failed.
+        """
+        if not (job_ids := self.jobs.pending):
+            return
+        try:
+            jobs = await self.async_call("core.get_jobs", [[["id", "in", job_ids]]])
+        except TruenasException as error:
+            self.logger.debug("Polling of the jobs %s failed: %s", job_ids, error)
+            return
+        for fields in jobs or []:
+            self.jobs.async_apply({"fields": fields})
+
+    async def _async_job_event(self, data: dict) -> None:
+        """Handle a core.get_jobs event."""
+        if self.capture is not None:
+            self.capture.record_event(data)
+        if data.get("collection"):
+            self.metrics.record_event(data["collection"])
+        self.jobs.async_apply(data)
+
+    def _make_live_callback(
+        self, live: LiveCollection
+    ) -> Callable[[dict], Awaitable[None]]:
+        """Return a WebSocket event callback updating a live collection."""
+
+        async def _callback(data: dict) -> None:
+            if self.capture is not None:
+                self.capture.record_event(data)
+            if not (name := data.get("collection")) or not data.get("msg"):
+                return
+            self.metrics.record_event(name)
+            if live.apply(data) and self.data is not None:
+                self.event_queue.async_schedule()
+
+        return _callback
 
     def _make_event_callback(self, scalar: bool = False, notify: bool = False):
         """Return a WebSocket event callback configured for the given storage mode."""
 
         async def _callback(data: dict) -> None:
+            if self.capture is not None:
+                self.capture.record_event(data)
             if not (name := data.get("collection")) or not (msg := data.get("msg")):
                 return
+            self.metrics.record_event(name)
             name = name.replace(".", "_")
             msg = msg.upper()
             fields = data.get("fields", {})
@@ -284,6 +635,6 @@ class TruenasDataUpdateCoordinator(DataUpdateCoordinator):
                                 break
 
             if notify and self.data is not None:
-                self.async_set_updated_data(self.data)
+                self.event_queue.async_schedule()
 
         return _callback
@@ -0,0 +1,67 @@
+"""Diagnostics support for TrueNAS."""
+
+from __future__ import annotations
+
+from typing import Any
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.core import HomeAssistant
+
+from . import TruenasConfigEntry
+from .aggregate import async_get_aggregator
+from .const import TO_REDACT
+from .fleet import async_get_fleet
+from .metrics import collection_sizes
+from .planner import async_get_planner
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: TruenasConfigEntry
+) -> dict[str, Any]:
+    """Return diagnostics for a config entry."""
+    coordinator = entry.runtime_data
+    metrics = coordinator.metrics
+    websocket = coordinator.websocket
+    data = coordinator.data or {}
+
+    return {
+        "entry": {
+            "data": async_redact_data(entry.data, TO_REDACT),
+            "options": async_redact_data(entry.options, TO_REDACT),
+        },
+        "collections": collection_sizes(data),
+        "performance": {
+            "summary": metrics.summary(),
+            "refreshes": list(metrics.history),
+            "methods": metrics.as_dict()["methods"],
+        },
+        "events": {
+            collection: stats.as_dict()
+            for collection, stats in sorted(metrics.events.items())
+        },
+        "event_queue": {
+            "interval": coordinator.event_queue.interval,
+            **metrics.fanout.as_dict(),
+        },
+        "schedule": {
+            **metrics.schedule.as_dict(),
+            "fleet": async_get_fleet(hass).as_dict(),
+        },
+        "aggregate": async_get_aggregator(hass).as_dict(),
+        "planner": async_get_planner(hass).as_dict(entry.entry_id),
+        "subscriptions": dict(coordinator.subscriptions),
+        "jobs": {
+            "indexed": len(coordinator.jobs.jobs),
+            "running": len(coordinator.jobs.running),
+        },
+        "live": {method: live.as_dict() for method, live in coordinator.live.items()},
+        "connection": {
+            "connected": websocket.is_connected,
+            "logged": websocket.is_logged,
+            "connects": metrics.connects,
+            "connect_errors": metrics.connect_errors,
+            "last_connect": metrics.last_connect,
+            "reuses": coordinator.connection.reuses,
+        },
+        "data": async_redact_data(data, TO_REDACT),
+    }
@@ -13,6 +13,7 @@ from homeassistant.helpers.update_coordinator import CoordinatorEntity
 from .const import DOMAIN
 from .coordinator import TruenasDataUpdateCoordinator
 from .helpers import finditem
+from .planner import async_get_planner
 
 
 @dataclass(frozen=True, kw_only=True)
@@ -51,7 +52,7 @@ class TruenasEntity(CoordinatorEntity[TruenasDataUpdateCoordinator], Entity):
             self._attr_name = (
                 f"{uid} {self.name}".capitalize()
                 if self.name not in {UNDEFINED, None}
-                else uid.capitalize()
+                else str(uid).capitalize()
             )
 
         # Device info
@@ -81,6 +82,11 @@ class TruenasEntity(CoordinatorEntity[TruenasDataUpdateCoordinator], Entity):
             if uid
             else f"{device_name}-{entity_description.key}"
         )
+        async_get_planner(coordinator.hass).async_track(
+            coordinator.config_entry.entry_id,
+            self._attr_unique_id,
+            entity_description.api,
+        )
 
         # Data for device
         self.device_data = self._handle_data_finder()
@@ -0,0 +1,74 @@
+"""Coalescing of the websocket event notifications."""
+
+from __future__ import annotations
+
+import time
+from collections.abc import Callable
+from datetime import datetime
+
+from homeassistant.core import CALLBACK_TYPE, HassJob, HomeAssistant, callback
+from homeassistant.helpers.event import async_call_later
+
+from .metrics import FanoutStats
+
+
+class EventQueue:
+    """Coalesce event notifications into at most one fan-out per interval.
+
+    Events are applied to the coordinator state as soon as they are received;
+    only the notification of the listeners is deferred, so a burst of events
+    costs a single entity fan-out instead of one per event.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        interval: float,
+        notify: Callable[[], None],
+        stats: FanoutStats,
+    ) -> None:
+        """Initialize."""
+        self.hass = hass
+        self.interval = interval
+        self.stats = stats
+        self._notify = notify
+        self._unsub: CALLBACK_TYPE | None = None
+        self._since: float | None = None
+        self._job = HassJob(self._async_fire, cancel_on_shutdown=True)
+
+    @callback
+    def async_schedule(self) -> None:
+        """Request a notification for an applied event."""
+        self.stats.record_event()
+        if self._since is None:
+            self._since = time.monotonic()
+        if self.interval <= 0:
+            self._async_fire()
+        elif self._unsub is None:
+            self._unsub = async_call_later(self.hass, self.interval, self._job)
+
+    @callback
+    def async_flush(self) -> None:
+        """Notify the listeners of the pending events now."""
+        if self._since is not None:
+            self.async_cancel()
+            self._async_fire()
+
+    @callback
+    def async_cancel(self) -> None:
+        """Cancel the scheduled notification."""
+        if self._unsub is not None:
+            self._unsub()
+            self._unsub = None
+
+    @callback
+    def _async_fire(self, _: datetime | None = None) -> None:
+        """Notify the listeners of the pending events."""
+        self._unsub = None
+        if self._since is None:
+            return
+        start = time.monotonic()
+        lag = start - self._since
+        self._since = None
+        self._notify()
+        self.stats.record_fanout(lag, time.monotonic() - start)
@@ -0,0 +1,129 @@
+"""Include and exclude rules on the rows of the collections."""
+
+from __future__ import annotations
+
+import fnmatch
+import re
+from collections.abc import Mapping
+from dataclasses import dataclass
+from functools import cached_property
+from typing import Any
+
+# Coordinator data keys whose rows can be filtered
+FILTERED_COLLECTIONS = ["apps", "datasets", "pools", "services", "virtualmachines"]
+REGEX_PREFIX = "re:"
+EXCLUDE_PREFIX = "!"
+
+
+@dataclass(frozen=True, slots=True)
+class FilteredMethod:
+    """A method returning the rows of a filtered collection."""
+
+    key: str
+    # Field of the rows the rules match, the one their entities are named after
+    field: str
+    # The method takes query-filters, else its result is filtered locally
+    query_filters: bool = True
+
+
+FILTERED_METHODS: dict[str, FilteredMethod] = {
+    "app.query": FilteredMethod("apps", "id"),
+    # The details of the datasets take no query-filters
+    "pool.dataset.details": FilteredMethod("datasets", "id", query_filters=False),
+    "pool.query": FilteredMethod("pools", "name"),
+    "service.query": FilteredMethod("services", "service"),
+    "vm.query": FilteredMethod("virtualmachines", "name"),
+    "virt.instance.query": FilteredMethod("virtualmachines", "name"),
+}
+
+
+def filter_option(key: str) -> str:
+    """Return the option holding the rules of a collection."""
+    return f"filter_{key}"
+
+
+def _pattern_regex(pattern: str) -> str:
+    """Return the regular expression matching a whole id for a pattern."""
+    if pattern.startswith(REGEX_PREFIX):
+        regex = f"(?:{pattern.removeprefix(REGEX_PREFIX)})"
+    else:
+        # Recent Pythons end the translation with \z, unknown to older ones
+        regex = fnmatch.translate(pattern).removesuffix("\\z").removesuffix("\\Z")
+    re.compile(regex)
+    return f"{regex}\\Z"
+
+
+@dataclass(frozen=True)
+class RowFilter:
+    """Include and exclude rules on the ids of the rows of a collection.
+
+    The rules are a list of glob patterns, ``re:`` prefixed regular
+    expressions, separated by commas or lines; a ``!`` prefixed rule excludes
+    the ids it matches. A row is kept when its id matches an include rule, if
+    any, and no exclude rule. Both translate to a single regular expression
+    each, so middlewared applies the very same rules with its ``~``
+    query-filter operator, which matches from the start of the id.
+    """
+
+    include: tuple[str, ...] = ()
+    exclude: tuple[str, ...] = ()
+
+    @classmethod
+    def parse(cls, rules: str) -> RowFilter:
+        """Return the filter of the rules, raise ValueError if one is invalid."""
+        include: list[str] = []
+        exclude: list[str] = []
+        for rule in re.split(r"[,\n]", rules):
+            if not (rule := rule.strip()):
+                continue
+            target = include
+            if rule.startswith(EXCLUDE_PREFIX):
+                target = exclude
+                rule = rule.removeprefix(EXCLUDE_PREFIX).strip()
+            try:
+                target.append(_pattern_regex(rule))
+            except re.error as error:
+                raise ValueError(f"Invalid rule {rule}: {error}") from error
+        return cls(tuple(include), tuple(exclude))
+
+    @cached_property
+    def regexes(self) -> list[str]:
+        """Return the regular expressions an id must match from its start."""
+        regexes = []
+        if self.include:
+            regexes.append(f"(?:{'|'.join(self.include)})")
+        if self.exclude:
+            regexes.append(f"(?!{'|'.join(self.exclude)})")
+        return regexes
+
+    @cached_property
+    def _compiled(self) -> list[re.Pattern[str]]:
+        """Return the compiled regular expressions."""
+        return [re.compile(regex) for regex in self.regexes]
+
+    def query_filters(self, field: str) -> list[list[Any]]:
+        """Return the query-filters applying the rules on a field."""
+        return [[field, "~", regex] for regex in self.regexes]
+
+    def match(self, field: str, row: Mapping[str, Any]) -> bool:
+        """Return True if the rules keep a row."""
+        if (value := row.get(field)) is None:
+            return not self.regexes
+        return all(pattern.match(str(value)) for pattern in self._compiled)
+
+    def apply(self, field: str, rows: Any) -> Any:
+        """Return the rows kept by the rules, other results unchanged."""
+        if not self.regexes or not isinstance(rows, list):
+            return rows
+        return [row for row in rows if self.match(field, row)]
+
+
+def row_filters(options: Mapping[str, Any]) -> dict[str, RowFilter]:
+    """Return the filters of the collections with rules in the options."""
+    filters = {}
+    for key in FILTERED_COLLECTIONS:
+        if rules := options.get(filter_option(key)):
+            row_filter = RowFilter.parse(rules)
+            if row_filter.regexes:
+                filters[key] = row_filter
+    return filters
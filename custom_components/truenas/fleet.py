@@ -0,0 +1,158 @@
+"""Refresh scheduling shared by the TrueNAS hosts."""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from functools import partial
+from typing import TYPE_CHECKING, Any
+
+from homeassistant.core import CALLBACK_TYPE, HassJob, HomeAssistant, callback
+from homeassistant.helpers.event import async_call_later
+from homeassistant.util.hass_dict import HassKey
+
+from .const import DOMAIN
+from .coordinator import SCAN_INTERVAL
+
+if TYPE_CHECKING:
+    from .coordinator import TruenasDataUpdateCoordinator
+
+DATA_FLEET: HassKey[FleetScheduler] = HassKey(f"{DOMAIN}_fleet")
+# Hosts refreshed at the same time
+FLEET_MAX_CONCURRENT = 4
+
+
+@dataclass
+class FleetMember:
+    """A host of the fleet and its next refresh."""
+
+    coordinator: TruenasDataUpdateCoordinator
+    due: float = 0.0
+    unsub: CALLBACK_TYPE | None = None
+    task: asyncio.Task[None] | None = None
+
+
+class FleetScheduler:
+    """Refresh the coordinators of all the config entries, staggered.
+
+    The hosts are spread evenly over the refresh interval, so that their
+    refreshes do not all start at once, and at most ``max_concurrent`` of them
+    refresh at the same time. A refresh waiting for a free slot starts late,
+    the lateness and the share of the interval spent refreshing (the load)
+    are recorded in the metrics of each host.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        interval: float = SCAN_INTERVAL,
+        max_concurrent: int = FLEET_MAX_CONCURRENT,
+    ) -> None:
+        """Initialize."""
+        self.hass = hass
+        self.interval = interval
+        self.max_concurrent = max_concurrent
+        self.members: dict[str, FleetMember] = {}
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self._epoch = time.monotonic()
+
+    @callback
+    def async_add(self, coordinator: TruenasDataUpdateCoordinator) -> CALLBACK_TYPE:
+        """Schedule the refreshes of a host and return a callback removing it."""
+        entry_id = coordinator.config_entry.entry_id
+        self.members[entry_id] = FleetMember(coordinator)
+        self._async_rebalance()
+        return partial(self._async_remove, entry_id)
+
+    @callback
+    def _async_remove(self, entry_id: str) -> None:
+        """Stop refreshing a host."""
+        if (member := self.members.pop(entry_id, None)) is None:
+            return
+        if member.unsub is not None:
+            member.unsub()
+        self._async_rebalance()
+
+    @callback
+    def _async_rebalance(self) -> None:
+        """Spread the hosts evenly over the interval."""
+        now = time.monotonic()
+        for index, (entry_id, member) in enumerate(sorted(self.members.items())):
+            offset = index * self.interval / len(self.members)
+            stats = member.coordinator.metrics.schedule
+            stats.interval = self.interval
+            stats.offset = offset
+            # Next time at this offset of the interval
+            phase = self._epoch + offset
+            member.due = phase + ((now - phase) // self.interval + 1) * self.interval
+            self._async_schedule(entry_id, member, now)
+
+    @callback
+    def _async_schedule(self, entry_id: str, member: FleetMember, now: float) -> None:
+        """Arm the timer of the next refresh of a host."""
+        if member.unsub is not None:
+            member.unsub()
+        member.unsub = async_call_later(
+            self.hass,
+            max(member.due - now, 0),
+            HassJob(partial(self._async_due, entry_id), cancel_on_shutdown=True),
+        )
+
+    @callback
+    def _async_due(self, entry_id: str, _: datetime) -> None:
+        """Start the refresh of a host and arm the next one."""
+        if (member := self.members.get(entry_id)) is None:
+            return
+        member.unsub = None
+        due = member.due
+        now = time.monotonic()
+        member.due += self.interval
+        while member.due <= now:
+            member.due += self.interval
+        self._async_schedule(entry_id, member, now)
+
+        if member.task is not None and not member.task.done():
+            # The previous refresh is still running or waiting for a slot
+            member.coordinator.metrics.schedule.skipped += 1
+            return
+        member.task = member.coordinator.config_entry.async_create_background_task(
+            self.hass,
+            self._async_refresh(member, due),
+            f"truenas fleet refresh {entry_id}",
+        )
+
+    async def _async_refresh(self, member: FleetMember, due: float) -> None:
+        """Refresh a host once a slot is free."""
+        async with self._semaphore:
+            start = time.monotonic()
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            try:
+                await member.coordinator.async_refresh()
+            finally:
+                self.in_flight -= 1
+                member.coordinator.metrics.schedule.record(
+                    max(start - due, 0.0), time.monotonic() - start
+                )
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the scheduler state as a dictionary."""
+        return {
+            "hosts": len(self.members),
+            "interval": self.interval,
+            "max_concurrent": self.max_concurrent,
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+        }
+
+
+@callback
+def async_get_fleet(hass: HomeAssistant) -> FleetScheduler:
+    """Return the scheduler shared by the config entries."""
+    if (fleet := hass.data.get(DATA_FLEET)) is None:
+        fleet = hass.data[DATA_FLEET] = FleetScheduler(hass)
+    return fleet
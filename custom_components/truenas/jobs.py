@@ -0,0 +1,179 @@
+"""Tracking of TrueNAS jobs from the core.get_jobs event stream."""
+
+from __future__ import annotations
+
+import asyncio
+from collections import OrderedDict
+from collections.abc import Callable
+from typing import Any
+
+from homeassistant.core import CALLBACK_TYPE, callback
+
+from .helpers import finditem
+
+JOB_DONE_STATES = frozenset({"SUCCESS", "FAILED", "ABORTED"})
+# Jobs kept in the index, the oldest finished or untracked ones are dropped
+MAX_JOBS = 500
+
+
+def is_job_id(result: Any) -> bool:
+    """Return True if a method result is the id of the job it started."""
+    return isinstance(result, int) and not isinstance(result, bool)
+
+
+class Job:
+    """State of a TrueNAS job, awaitable until it finishes."""
+
+    def __init__(self, job_id: int) -> None:
+        """Initialize."""
+        self.id = job_id
+        self.fields: dict[str, Any] = {}
+        self.tracked = False
+        self._done = asyncio.Event()
+        self._listeners: list[Callable[[Job], None]] = []
+
+    @property
+    def method(self) -> str | None:
+        """Return the method which started the job."""
+        return self.fields.get("method")
+
+    @property
+    def arguments(self) -> list[Any]:
+        """Return the arguments of the method which started the job."""
+        return self.fields.get("arguments") or []
+
+    @property
+    def state(self) -> str | None:
+        """Return the job state."""
+        return self.fields.get("state")
+
+    @property
+    def percent(self) -> int | None:
+        """Return the job progress percentage."""
+        percent = finditem(self.fields, "progress.percent")
+        return int(percent) if isinstance(percent, (int, float)) else None
+
+    @property
+    def description(self) -> str | None:
+        """Return the job progress description."""
+        return finditem(self.fields, "progress.description")
+
+    @property
+    def done(self) -> bool:
+        """Return True if the job is finished."""
+        return self._done.is_set()
+
+    @property
+    def success(self) -> bool:
+        """Return True if the job finished successfully."""
+        return self.state == "SUCCESS"
+
+    @property
+    def result(self) -> Any:
+        """Return the job result."""
+        return self.fields.get("result")
+
+    @property
+    def error(self) -> str | None:
+        """Return the job error."""
+        return self.fields.get("error")
+
+    @callback
+    def async_add_listener(self, listener: Callable[[Job], None]) -> CALLBACK_TYPE:
+        """Call a listener on every update of the job."""
+        self._listeners.append(listener)
+
+        @callback
+        def _remove() -> None:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+        return _remove
+
+    async def async_wait(self, timeout: float | None = None) -> Job:
+        """Wait for the job to finish.
+
+        Raises TimeoutError if the job is still running after timeout seconds.
+        """
+        async with asyncio.timeout(timeout):
+            await self._done.wait()
+        return self
+
+    @callback
+    def async_update(self, fields: dict[str, Any]) -> None:
+        """Update the job from an event."""
+        self.fields.update(fields)
+        if self.state in JOB_DONE_STATES:
+            self._done.set()
+        for listener in list(self._listeners):
+            listener(self)
+
+
+class JobTracker:
+    """Index the jobs of a single persistent core.get_jobs subscription.
+
+    Entities and services get a handle with ``track`` right after starting a
+    job; events received before that are kept so a job finishing before its
+    handle is requested is still reported as done.
+    """
+
+    def __init__(self) -> None:
+        """Initialize."""
+        self.jobs: OrderedDict[int, Job] = OrderedDict()
+        self._listeners: list[Callable[[Job], None]] = []
+
+    @callback
+    def track(self, job_id: int) -> Job:
+        """Return the handle of a job."""
+        if (job := self.jobs.get(job_id)) is None:
+            job = self.jobs[job_id] = Job(job_id)
+            job.tracked = True
+            self._prune()
+        job.tracked = True
+        return job
+
+    @callback
+    def async_add_listener(self, listener: Callable[[Job], None]) -> CALLBACK_TYPE:
+        """Call a listener on every job update."""
+        self._listeners.append(listener)
+
+        @callback
+        def _remove() -> None:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+        return _remove
+
+    @callback
+    def async_apply(self, event: dict[str, Any]) -> Job | None:
+        """Apply a core.get_jobs event and return the updated job."""
+        fields = event.get("fields") or {}
+        if (job_id := fields.get("id", event.get("id"))) is None:
+            return None
+        if (job := self.jobs.get(job_id)) is None:
+            job = self.jobs[job_id] = Job(job_id)
+            self._prune()
+        job.async_update(fields)
+        for listener in list(self._listeners):
+            listener(job)
+        return job
+
+    @property
+    def running(self) -> list[Job]:
+        """Return the jobs not finished yet."""
+        return [job for job in self.jobs.values() if not job.done]
+
+    @property
+    def pending(self) -> list[int]:
+        """Return the ids of the tracked jobs not finished yet."""
+        return [job.id for job in self.running if job.tracked]
+
+    def _prune(self) -> None:
+        """Drop the oldest finished or untracked jobs above the index size."""
+        excess = len(self.jobs) - MAX_JOBS
+        if excess <= 0:
+            return
+        for job_id in [
+            job_id for job_id, job in self.jobs.items() if job.done or not job.tracked
+        ][:excess]:
+            del self.jobs[job_id]
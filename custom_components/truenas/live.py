@@ -0,0 +1,144 @@
+"""Collections kept current from their subscription events."""
+
+from __future__ import annotations
+
+import time
+from collections.abc import Callable, Mapping
+from typing import Any
+
+# Subscribable query methods -> key of the coordinator data they fill
+LIVE_COLLECTIONS = {
+    "app.query": "apps",
+    "pool.query": "pools",
+    "service.query": "services",
+    "vm.query": "virtualmachines",
+}
+# A fresh snapshot is taken at this interval (seconds) to bound any drift
+LIVE_RESYNC_INTERVAL = 3600
+# Events buffered while the snapshot is not taken yet
+LIVE_PENDING_EVENTS = 1000
+
+
+class LiveCollection:
+    """Keep a queried collection current from its subscription events.
+
+    The collection is queried once (the snapshot), then only updated from the
+    ADDED, CHANGED and REMOVED events of its subscription. Events received
+    before the snapshot are buffered and applied on top of it. While the
+    subscription is down or the snapshot is missing or too old, the
+    coordinator falls back to polling the method.
+    """
+
+    def __init__(
+        self,
+        method: str,
+        key: str,
+        id_field: str = "id",
+        accept: Callable[[Mapping[str, Any]], bool] | None = None,
+    ) -> None:
+        """Initialize.
+
+        ``accept`` tells the rows the query is filtered on, the events of the
+        rows it rejects are ignored.
+        """
+        self.method = method
+        self.key = key
+        self.id_field = id_field
+        self.accept = accept
+        self.rows: dict[Any, dict[str, Any]] = {}
+        self.subscribed = False
+        self.dirty = False
+        self.snapshots = 0
+        self.served = 0
+        self.events = 0
+        self._synced_at: float | None = None
+        self._pending: list[dict[str, Any]] = []
+
+    @property
+    def healthy(self) -> bool:
+        """Return True if the collection can be served without polling."""
+        return (
+            self.subscribed
+            and self._synced_at is not None
+            and time.monotonic() - self._synced_at < LIVE_RESYNC_INTERVAL
+        )
+
+    def reset(self) -> None:
+        """Forget the subscription state after a disconnection."""
+        self.subscribed = False
+        self._synced_at = None
+        self._pending.clear()
+
+    def snapshot(self, rows: list[dict[str, Any]]) -> list[dict[str, Any]]:
+        """Replace the collection with a query result and return it."""
+        self.rows = {row.get(self.id_field): row for row in rows}
+        self.snapshots += 1
+        self._synced_at = time.monotonic()
+        for event in self._pending:
+            self._apply(event)
+        self._pending.clear()
+        self.dirty = False
+        return self.as_list()
+
+    def serve(self) -> list[dict[str, Any]]:
+        """Return the collection in place of a poll."""
+        self.served += 1
+        self.dirty = False
+        return self.as_list()
+
+    def merge(self, field: str, uid: Any, rows: list[dict[str, Any]]) -> None:
+        """Replace the rows matching a filtered query with its result."""
+        if self._synced_at is None:
+            return
+        for id_, row in list(self.rows.items()):
+            if row.get(field) == uid:
+                del self.rows[id_]
+        for row in rows:
+            self.rows[row.get(self.id_field)] = row
+
+    def apply(self, event: dict[str, Any]) -> bool:
+        """Apply an event and return True if the collection changed."""
+        self.events += 1
+        if self._synced_at is None:
+            if len(self._pending) < LIVE_PENDING_EVENTS:
+                self._pending.append(event)
+            return False
+        if changed := self._apply(event):
+            self.dirty = True
+        return changed
+
+    def _apply(self, event: dict[str, Any]) -> bool:
+        """Apply an event to the rows."""
+        msg = (event.get("msg") or "").upper()
+        id_ = event.get("id", (event.get("fields") or {}).get(self.id_field))
+        if id_ is None:
+            return False
+        if msg == "REMOVED":
+            return self.rows.pop(id_, None) is not None
+        if msg in ("ADDED", "CHANGED"):
+            fields = event.get("fields", {})
+            if (
+                id_ not in self.rows
+                and self.accept is not None
+                and not self.accept(fields)
+            ):
+                return False
+            self.rows[id_] = {**self.rows.get(id_, {}), **fields}
+            return True
+        return False
+
+    def as_list(self) -> list[dict[str, Any]]:
+        """Return the rows as a query result."""
+        return list(self.rows.values())
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the collection state as a dictionary."""
+        return {
+            "healthy": self.healthy,
+            "subscribed": self.subscribed,
+            "rows": len(self.rows),
+            "snapshots": self.snapshots,
+            "served": self.served,
+            "events": self.events,
+            "pending": len(self._pending),
+        }
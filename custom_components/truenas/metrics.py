@@ -0,0 +1,341 @@
+"""Runtime metrics for TrueNAS API calls."""
+
+from __future__ import annotations
+
+import time
+from bisect import bisect_left
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any
+
+from homeassistant.helpers.json import json_bytes
+from homeassistant.util import dt as dt_util
+
+# Upper bounds (seconds) of the latency histogram buckets, the last bucket
+# collects everything above the highest bound.
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+REFRESH_HISTORY = 20
+EVENT_RATE_WINDOW = 60
+# The encoded size of the results of a method is measured every so many calls,
+# encoding every result again costs as much as decoding it.
+PAYLOAD_SAMPLE_INTERVAL = 20
+
+
+def payload_count(result: Any) -> int:
+    """Return the number of decoded objects."""
+    return len(result) if isinstance(result, (list, dict)) else 1
+
+
+def payload_size(result: Any) -> tuple[int, int]:
+    """Return the encoded size in bytes and the number of decoded objects."""
+    try:
+        size = len(json_bytes(result))
+    except (TypeError, ValueError):
+        size = 0
+    return size, payload_count(result)
+
+
+def collection_sizes(data: dict[str, Any]) -> dict[str, dict[str, int]]:
+    """Return the number of objects and the estimated footprint of collections."""
+    sizes = {}
+    for key, value in data.items():
+        size, count = payload_size(value)
+        sizes[key] = {"objects": count, "bytes": size}
+    return sizes
+
+
+@dataclass
+class MethodStats:
+    """Statistics of a single API method."""
+
+    calls: int = 0
+    errors: int = 0
+    total_time: float = 0.0
+    max_time: float = 0.0
+    last_time: float = 0.0
+    total_bytes: int = 0
+    sampled: int = 0
+    last_bytes: int = 0
+    last_objects: int = 0
+    histogram: list[int] = field(
+        default_factory=lambda: [0] * (len(LATENCY_BUCKETS) + 1)
+    )
+
+    def record(self, elapsed: float, size: int | None = None, objects: int = 0) -> None:
+        """Record a successful call, size None when it was not measured."""
+        self.calls += 1
+        self.total_time += elapsed
+        self.last_time = elapsed
+        self.max_time = max(self.max_time, elapsed)
+        if size is not None:
+            self.sampled += 1
+            self.total_bytes += size
+            self.last_bytes = size
+        self.last_objects = objects
+        self.histogram[bisect_left(LATENCY_BUCKETS, elapsed)] += 1
+
+    @property
+    def sample_due(self) -> bool:
+        """Return True if the size of the next result should be measured."""
+        return self.calls % PAYLOAD_SAMPLE_INTERVAL == 0
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the statistics as a dictionary."""
+        calls = self.calls or 1
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "avg_time": round(self.total_time / calls, 4),
+            "max_time": round(self.max_time, 4),
+            "last_time": round(self.last_time, 4),
+            "avg_bytes": self.total_bytes // (self.sampled or 1),
+            "last_bytes": self.last_bytes,
+            "last_objects": self.last_objects,
+            "histogram": dict(
+                zip(
+                    [f"<={bound}s" for bound in LATENCY_BUCKETS] + ["+Inf"],
+                    self.histogram,
+                    strict=True,
+                )
+            ),
+        }
+
+
+@dataclass
+class EventStats:
+    """Statistics of a subscribed event stream."""
+
+    count: int = 0
+    last_seen: str | None = None
+    timestamps: deque[float] = field(default_factory=lambda: deque(maxlen=1024))
+
+    def record(self) -> None:
+        """Record an event."""
+        self.count += 1
+        self.last_seen = dt_util.utcnow().isoformat()
+        self.timestamps.append(time.monotonic())
+
+    @property
+    def rate(self) -> float:
+        """Return the number of events per second over the rate window."""
+        horizon = time.monotonic() - EVENT_RATE_WINDOW
+        recent = sum(1 for stamp in self.timestamps if stamp >= horizon)
+        return round(recent / EVENT_RATE_WINDOW, 3)
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the statistics as a dictionary."""
+        return {"count": self.count, "rate": self.rate, "last_seen": self.last_seen}
+
+
+@dataclass
+class FanoutStats:
+    """Statistics of the coalesced event notifications."""
+
+    received: int = 0
+    fanouts: int = 0
+    pending: int = 0
+    last_batch: int = 0
+    max_batch: int = 0
+    last_lag: float = 0.0
+    max_lag: float = 0.0
+    last_duration: float = 0.0
+    max_duration: float = 0.0
+
+    def record_event(self) -> None:
+        """Record an event waiting for the next fan-out."""
+        self.received += 1
+        self.pending += 1
+
+    def record_fanout(self, lag: float, duration: float) -> None:
+        """Record a fan-out of the pending events."""
+        self.fanouts += 1
+        self.last_batch = self.pending
+        self.max_batch = max(self.max_batch, self.pending)
+        self.pending = 0
+        self.last_lag = lag
+        self.max_lag = max(self.max_lag, lag)
+        self.last_duration = duration
+        self.max_duration = max(self.max_duration, duration)
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the statistics as a dictionary."""
+        return {
+            "received": self.received,
+            "fanouts": self.fanouts,
+            "coalesced": self.received - self.pending - self.fanouts,
+            "pending": self.pending,
+            "last_batch": self.last_batch,
+            "max_batch": self.max_batch,
+            "last_lag": round(self.last_lag, 4),
+            "max_lag": round(self.max_lag, 4),
+            "last_duration": round(self.last_duration, 4),
+            "max_duration": round(self.max_duration, 4),
+        }
+
+
+@dataclass
+class ScheduleStats:
+    """Statistics of the refreshes started by the fleet scheduler."""
+
+    interval: float = 0.0
+    offset: float = 0.0
+    refreshes: int = 0
+    skipped: int = 0
+    last_lateness: float = 0.0
+    max_lateness: float = 0.0
+    last_duration: float = 0.0
+    total_duration: float = 0.0
+
+    def record(self, lateness: float, duration: float) -> None:
+        """Record a refresh started lateness seconds after its due time."""
+        self.refreshes += 1
+        self.last_lateness = lateness
+        self.max_lateness = max(self.max_lateness, lateness)
+        self.last_duration = duration
+        self.total_duration += duration
+
+    @property
+    def load(self) -> float:
+        """Return the share of the interval spent refreshing."""
+        if not self.refreshes or not self.interval:
+            return 0.0
+        return self.total_duration / self.refreshes / self.interval
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the statistics as a dictionary."""
+        return {
+            "interval": self.interval,
+            "offset": round(self.offset, 3),
+            "refreshes": self.refreshes,
+            "skipped": self.skipped,
+            "last_lateness": round(self.last_lateness, 4),
+            "max_lateness": round(self.max_lateness, 4),
+            "last_duration": round(self.last_duration, 4),
+            "load": round(self.load, 4),
+        }
+
+
+class TruenasMetrics:
+    """Collect per-method and per-refresh metrics."""
+
+    def __init__(self) -> None:
+        """Initialize."""
+        self.methods: dict[str, MethodStats] = {}
+        self.refresh_count = 0
+        self.refresh_duration: float | None = None
+        self.refresh_calls: dict[str, float] = {}
+        self.history: deque[dict[str, Any]] = deque(maxlen=REFRESH_HISTORY)
+        self.events: dict[str, EventStats] = {}
+        self.fanout = FanoutStats()
+        self.schedule = ScheduleStats()
+        self.connects = 0
+        self.connect_errors = 0
+        self.last_connect: str | None = None
+        self._refresh_start: float | None = None
+        self._refresh_started_at: str | None = None
+        self._current_calls: dict[str, float] = {}
+
+    def record_call(
+        self,
+        method: str,
+        elapsed: float,
+        result: Any = None,
+        error: bool = False,
+    ) -> None:
+        """Record an API call."""
+        stats = self.methods.setdefault(method, MethodStats())
+        if error:
+            stats.errors += 1
+        elif stats.sample_due:
+            stats.record(elapsed, *payload_size(result))
+        else:
+            stats.record(elapsed, objects=payload_count(result))
+        if self._refresh_start is not None:
+            self._current_calls[method] = self._current_calls.get(method, 0.0) + elapsed
+
+    def record_event(self, collection: str) -> None:
+        """Record an event received on a subscribed collection."""
+        self.events.setdefault(collection, EventStats()).record()
+
+    def record_connect(self, success: bool) -> None:
+        """Record a websocket connection attempt."""
+        if success:
+            self.connects += 1
+            self.last_connect = dt_util.utcnow().isoformat()
+        else:
+            self.connect_errors += 1
+
+    def start_refresh(self) -> None:
+        """Mark the beginning of a coordinator refresh."""
+        self._refresh_start = time.perf_counter()
+        self._refresh_started_at = dt_util.utcnow().isoformat()
+        self._current_calls = {}
+
+    def finish_refresh(self, success: bool = True) -> None:
+        """Mark the end of a coordinator refresh."""
+        if self._refresh_start is None:
+            return
+        self.refresh_count += 1
+        self.refresh_duration = time.perf_counter() - self._refresh_start
+        self.refresh_calls = self._current_calls
+        self.history.append(
+            {
+                "started": self._refresh_started_at,
+                "duration": round(self.refresh_duration, 4),
+                "success": success,
+                "calls": {
+                    method: round(elapsed, 4)
+                    for method, elapsed in self.refresh_calls.items()
+                },
+            }
+        )
+        self._refresh_start = None
+        self._current_calls = {}
+
+    @property
+    def slowest_method(self) -> tuple[str, float] | None:
+        """Return the slowest method of the last refresh."""
+        if not self.refresh_calls:
+            return None
+        return max(self.refresh_calls.items(), key=lambda item: item[1])
+
+    def summary(self) -> dict[str, Any]:
+        """Return a compact summary usable by entities."""
+        slowest = self.slowest_method
+        return {
+            "refresh_duration": (
+                round(self.refresh_duration, 3)
+                if self.refresh_duration is not None
+                else None
+            ),
+            "refresh_calls": len(self.refresh_calls),
+            "slowest_method": slowest[0] if slowest else None,
+            "slowest_method_duration": round(slowest[1], 3) if slowest else None,
+            "errors": sum(stats.errors for stats in self.methods.values()),
+            "refresh_lateness": round(self.schedule.last_lateness, 3),
+            "refresh_load": round(self.schedule.load, 4),
+        }
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return all metrics as a dictionary."""
+        return {
+            "refresh_count": self.refresh_count,
+            "last_refresh": {
+                method: round(elapsed, 4)
+                for method, elapsed in sorted(
+                    self.refresh_calls.items(), key=lambda item: -item[1]
+                )
+            },
+            "summary": self.summary(),
+            "history": list(self.history),
+            "events": {
+                collection: stats.as_dict()
+                for collection, stats in sorted(self.events.items())
+            },
+            "fanout": self.fanout.as_dict(),
+            "schedule": self.schedule.as_dict(),
+            "methods": {
+                method: stats.as_dict()
+                for method, stats in sorted(self.methods.items())
+            },
+        }
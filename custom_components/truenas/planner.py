@@ -0,0 +1,157 @@
+"""Collections fetched for the enabled entities only."""
+
+from __future__ import annotations
+
+import time
+from collections.abc import Iterable
+
+from homeassistant.core import CALLBACK_TYPE, Event, HomeAssistant, callback
+from homeassistant.helpers import entity_registry as er
+from homeassistant.util.hass_dict import HassKey
+
+from .const import DOMAIN
+
+DATA_PLANNER: HassKey[FetchPlanner] = HassKey(f"{DOMAIN}_planner")
+# Collections no enabled entity needs are fetched at this interval (seconds)
+PLANNER_DISCOVERY_INTERVAL = 3600
+# Collections an entity reads through another one
+PLANNER_DEPENDENCIES = {
+    "netstats": ("interfaces",),
+    "disks_temperatures": ("disks",),
+}
+
+
+class FetchPlanner:
+    """Tell the coordinators which collections their enabled entities read.
+
+    The entities declare the collection they read when they are created,
+    disabled ones included, and the entity registry tells which ones are
+    disabled: a collection is fetched at every refresh while one enabled
+    entity reads it. The other collections are fetched at the first refresh,
+    the entities are created from it, then every
+    ``PLANNER_DISCOVERY_INTERVAL`` to keep the rows of the collection, for
+    the diagnostics and the services, roughly current. A fleet sensor reads
+    the collections of every host.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize."""
+        self.hass = hass
+        # Unique id -> config entry id, None for every host, and collection
+        self.consumers: dict[str, tuple[str | None, str]] = {}
+        self.skipped: dict[str, int] = {}
+        self._needed: dict[str, set[str]] = {}
+        self._fetched_at: dict[str, dict[str, float]] = {}
+        self._unsub_registry: CALLBACK_TYPE | None = None
+
+    @callback
+    def async_track(self, entry_id: str | None, unique_id: str, api: str) -> None:
+        """Record the collection an entity reads."""
+        if self._unsub_registry is None:
+            self._unsub_registry = self.hass.bus.async_listen(
+                er.EVENT_ENTITY_REGISTRY_UPDATED,
+                self._async_registry_updated,
+                event_filter=self._async_filter_registry,
+            )
+        self.consumers[unique_id] = (entry_id, api.split(".")[0])
+        self._needed.clear()
+
+    @callback
+    def async_untrack(self, entry_id: str | None) -> None:
+        """Forget the entities of a config entry, the fleet sensors for None."""
+        self.consumers = {
+            unique_id: consumer
+            for unique_id, consumer in self.consumers.items()
+            if consumer[0] != entry_id
+        }
+        self._fetched_at.pop(entry_id, None)
+        self.skipped.pop(entry_id, None)
+        self._needed.clear()
+        if any(owner is not None for owner, _ in self.consumers.values()):
+            return
+        # The fleet sensors are created again with the next hosts
+        self.consumers.clear()
+        if self._unsub_registry is not None:
+            self._unsub_registry()
+            self._unsub_registry = None
+
+    @callback
+    def _async_filter_registry(
+        self, event_data: er.EventEntityRegistryUpdatedData
+    ) -> bool:
+        """Return True for the entities created, removed, enabled or disabled."""
+        return event_data["action"] != "update" or "disabled_by" in event_data.get(
+            "changes", {}
+        )
+
+    @callback
+    def _async_registry_updated(
+        self, event: Event[er.EventEntityRegistryUpdatedData]
+    ) -> None:
+        """Compute the needed collections again."""
+        self._needed.clear()
+
+    @callback
+    def async_needed(self, entry_id: str) -> set[str]:
+        """Return the collections the enabled entities of a host read."""
+        if (needed := self._needed.get(entry_id)) is not None:
+            return needed
+        registry = er.async_get(self.hass)
+        disabled = {
+            entity.unique_id
+            for owner in {consumer[0] for consumer in self.consumers.values()}
+            if owner is not None
+            for entity in er.async_entries_for_config_entry(registry, owner)
+            if entity.disabled
+        }
+        needed = self._needed[entry_id] = set()
+        for unique_id, (owner, api) in self.consumers.items():
+            if owner in (entry_id, None) and unique_id not in disabled:
+                needed.add(api)
+                needed.update(PLANNER_DEPENDENCIES.get(api, ()))
+        return needed
+
+    @callback
+    def async_plan(self, entry_id: str, keys: Iterable[str]) -> set[str]:
+        """Return the collections of a host to fetch at this refresh."""
+        needed = self.async_needed(entry_id)
+        fetched_at = self._fetched_at.setdefault(entry_id, {})
+        now = time.monotonic()
+        due = set()
+        for key in keys:
+            if (
+                key not in needed
+                and key in fetched_at
+                and now - fetched_at[key] < PLANNER_DISCOVERY_INTERVAL
+            ):
+                self.skipped[entry_id] = self.skipped.get(entry_id, 0) + 1
+                continue
+            due.add(key)
+        self.async_fetched(entry_id, due)
+        return due
+
+    @callback
+    def async_fetched(self, entry_id: str, keys: Iterable[str]) -> None:
+        """Record the collections of a host fetched at this refresh."""
+        fetched_at = self._fetched_at.setdefault(entry_id, {})
+        now = time.monotonic()
+        for key in keys:
+            fetched_at[key] = now
+
+    def as_dict(self, entry_id: str) -> dict[str, object]:
+        """Return the plan of a host as a dictionary."""
+        return {
+            "consumers": sum(
+                1 for owner, _ in self.consumers.values() if owner == entry_id
+            ),
+            "needed": sorted(self.async_needed(entry_id)),
+            "skipped": self.skipped.get(entry_id, 0),
+        }
+
+
+@callback
+def async_get_planner(hass: HomeAssistant) -> FetchPlanner:
+    """Return the planner shared by the config entries."""
+    if (planner := hass.data.get(DATA_PLANNER)) is None:
+        planner = hass.data[DATA_PLANNER] = FetchPlanner(hass)
+    return planner
@@ -0,0 +1,125 @@
+"""On-demand profiling of the coordinator refresh cycle."""
+
+from __future__ import annotations
+
+import asyncio
+import cProfile
+import io
+import logging
+import pstats
+import time
+from typing import TYPE_CHECKING, Any
+
+from homeassistant.core import HomeAssistant
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.util import dt as dt_util
+
+if TYPE_CHECKING:
+    from .coordinator import TruenasDataUpdateCoordinator
+
+_LOGGER = logging.getLogger(__name__)
+
+# Functions reported individually in the profile report
+PROFILED_FUNCTIONS = (
+    "_fetch_data",
+    "finditem",
+    "_handle_data_finder",
+    "async_write_ha_state",
+)
+REPORT_LINES = 40
+
+_PROFILE_LOCK = asyncio.Lock()
+
+
+def _function_totals(stats: pstats.Stats) -> dict[str, dict[str, Any]]:
+    """Return the call count and timings of the watched functions."""
+    totals: dict[str, dict[str, Any]] = {
+        name: {"calls": 0, "own_time": 0.0, "cumulative_time": 0.0}
+        for name in PROFILED_FUNCTIONS
+    }
+    for (_, _, name), (_, calls, own, cumulative, _) in stats.stats.items():
+        if name in totals:
+            totals[name]["calls"] += calls
+            totals[name]["own_time"] += own
+            totals[name]["cumulative_time"] += cumulative
+    for values in totals.values():
+        values["own_time"] = round(values["own_time"], 4)
+        values["cumulative_time"] = round(values["cumulative_time"], 4)
+    return totals
+
+
+def _write_report(
+    profiler: cProfile.Profile, path: str, header: dict[str, Any]
+) -> dict[str, dict[str, Any]]:
+    """Write the profile report and return the watched function totals."""
+    stream = io.StringIO()
+    stats = pstats.Stats(profiler, stream=stream)
+    totals = _function_totals(stats)
+
+    stream.write("TrueNAS refresh profile\n")
+    for key, value in header.items():
+        stream.write(f"{key}: {value}\n")
+    stream.write("\nWatched functions\n")
+    for name, values in totals.items():
+        stream.write(
+            f"{name}: calls={values['calls']} own={values['own_time']}s "
+            f"cumulative={values['cumulative_time']}s\n"
+        )
+    stream.write("\nHot functions by own time\n")
+    stats.sort_stats(pstats.SortKey.TIME).print_stats(REPORT_LINES)
+    stream.write("\nHot functions by cumulative time\n")
+    stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(REPORT_LINES)
+    stream.write("\nCallers of the watched functions\n")
+    stats.print_callers("|".join(rf"\({name}\)" for name in PROFILED_FUNCTIONS))
+
+    with open(path, "w", encoding="utf-8") as file:
+        file.write(stream.getvalue())
+    return totals
+
+
+async def async_profile_refreshes(
+    hass: HomeAssistant,
+    coordinator: TruenasDataUpdateCoordinator,
+    refreshes: int,
+    timeout: float,
+) -> dict[str, Any]:
+    """Profile coordinator refreshes and write a report to the config dir."""
+    if _PROFILE_LOCK.locked():
+        raise HomeAssistantError("A TrueNAS profile is already running")
+
+    async with _PROFILE_LOCK:
+        profiler = cProfile.Profile()
+        completed = 0
+        start = time.perf_counter()
+        try:
+            profiler.enable()
+        except ValueError as error:
+            raise HomeAssistantError(f"Unable to start profiler: {error}") from error
+        try:
+            for _ in range(refreshes):
+                # Stopped between refreshes, never in the middle of one, so the
+                # data is not left partly updated
+                if time.perf_counter() - start >= timeout:
+                    _LOGGER.warning("Profiling stopped after %s seconds", timeout)
+                    break
+                # async_refresh also fans out to the entities listeners
+                await coordinator.async_refresh()
+                completed += 1
+        finally:
+            profiler.disable()
+
+        header = {
+            "host": coordinator.config_entry.title,
+            "date": dt_util.utcnow().isoformat(),
+            "refreshes": completed,
+            "duration": round(time.perf_counter() - start, 3),
+            "listeners": sum(1 for _ in coordinator.async_contexts()),
+        }
+        path = hass.config.path(
+            f"truenas_profile_{dt_util.utcnow().strftime('%Y%m%d_%H%M%S')}.txt"
+        )
+        totals = await hass.async_add_executor_job(
+            _write_report, profiler, path, header
+        )
+
+    return {**header, "file": path, "functions": totals}
@@ -0,0 +1,161 @@
+"""Pruning of ZFS snapshots."""
+
+from __future__ import annotations
+
+import logging
+import re
+import time
+from datetime import timedelta
+from typing import TYPE_CHECKING, Any
+
+from .bulk import BULK_CONCURRENCY, async_call_bulk
+from .helpers import finditem
+
+if TYPE_CHECKING:
+    from .coordinator import TruenasDataUpdateCoordinator
+
+_LOGGER = logging.getLogger(__name__)
+
+# Snapshots queried, then deleted, at a time
+PRUNE_PAGE_SIZE = 100
+# Errors kept in the report
+PRUNE_MAX_ERRORS = 20
+
+
+def _prune_filters(
+    dataset: str | None,
+    recursive: bool,
+    pattern: str | None,
+    cutoff: float | None,
+) -> list[list[Any]]:
+    """Return the zfs.snapshot.query filters selecting the snapshots."""
+    filters: list[list[Any]] = [
+        ["pool", "!=", "boot-pool"],
+        ["pool", "!=", "freenas-boot"],
+    ]
+    if dataset is not None:
+        if recursive:
+            filters.append(
+                ["OR", [["dataset", "=", dataset], ["dataset", "^", f"{dataset}/"]]]
+            )
+        else:
+            filters.append(["dataset", "=", dataset])
+    if pattern is not None:
+        # The ~ operator matches from the start of the name, the pattern
+        # may match anywhere in it
+        filters.append(["snapshot_name", "~", f".*(?:{pattern})"])
+    if cutoff is not None:
+        filters.append(
+            ["properties.creation.parsed", "<", {"$date": int(cutoff * 1000)}]
+        )
+    return filters
+
+
+def _created(snapshot: dict[str, Any]) -> float | None:
+    """Return the creation time of a snapshot (seconds since epoch)."""
+    value = finditem(snapshot, "properties.creation.rawvalue")
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _in_dataset(snapshot: dict[str, Any], dataset: str, recursive: bool) -> bool:
+    """Return True if a snapshot is of the dataset or, if recursive, a child."""
+    name = snapshot.get("dataset") or ""
+    return name == dataset or (recursive and name.startswith(f"{dataset}/"))
+
+
+def _used(snapshot: dict[str, Any]) -> int:
+    """Return the space used by a snapshot (bytes)."""
+    used = finditem(snapshot, "properties.used.parsed")
+    return used if isinstance(used, int) else 0
+
+
+async def async_prune_snapshots(
+    coordinator: TruenasDataUpdateCoordinator,
+    dataset: str | None = None,
+    recursive: bool = False,
+    pattern: str | None = None,
+    older_than: timedelta | None = None,
+    dry_run: bool = False,
+    page_size: int = PRUNE_PAGE_SIZE,
+    concurrency: int = BULK_CONCURRENCY,
+) -> dict[str, Any]:
+    """Delete the snapshots matching the selection and return a report.
+
+    The selection is filtered server side and read page by page, in the order
+    of the names, each page starting after the last name of the previous one;
+    each page is checked again locally, so a filter the server does not apply
+    never widens it, then deleted with at most ``concurrency`` deletions in
+    flight.
+    ``bytes`` is the space used by the deleted snapshots, the space expected
+    to be reclaimed.
+    """
+    cutoff = time.time() - older_than.total_seconds() if older_than else None
+    regex = re.compile(pattern) if pattern is not None else None
+    filters = _prune_filters(dataset, recursive, pattern, cutoff)
+
+    def _matches(snapshot: dict[str, Any]) -> bool:
+        """Return True if a snapshot of a page is in the selection."""
+        if dataset is not None and not _in_dataset(snapshot, dataset, recursive):
+            return False
+        if regex is not None and not regex.search(snapshot.get("snapshot_name") or ""):
+            return False
+        created = _created(snapshot)
+        return cutoff is None or (created is not None and created < cutoff)
+
+    report: dict[str, Any] = {
+        "dry_run": dry_run,
+        "matched": 0,
+        "deleted": 0,
+        "failed": 0,
+        "bytes": 0,
+        "errors": [],
+    }
+
+    # The pages do not move with the deletions, whether confirmed or not
+    after: str | None = None
+    while True:
+        page = await coordinator.async_call(
+            "zfs.snapshot.query",
+            [
+                filters if after is None else [*filters, ["name", ">", after]],
+                {
+                    "select": ["name", "dataset", "snapshot_name", "properties"],
+                    "extra": {"properties": ["creation", "used"]},
+                    "order_by": ["name"],
+                    "limit": page_size,
+                },
+            ],
+        )
+        if not page:
+            break
+        after = page[-1]["name"]
+        selected = [snapshot for snapshot in page if _matches(snapshot)]
+        report["matched"] += len(selected)
+
+        if dry_run:
+            report["bytes"] += sum(_used(snapshot) for snapshot in selected)
+        else:
+            statuses = await async_call_bulk(
+                coordinator,
+                "zfs.snapshot.delete",
+                [[snapshot["name"]] for snapshot in selected],
+                concurrency,
+            )
+            deleted = 0
+            for snapshot, status in zip(selected, statuses, strict=True):
+                if status["error"] is None:
+                    deleted += 1
+                    report["bytes"] += _used(snapshot)
+                elif len(report["errors"]) < PRUNE_MAX_ERRORS:
+                    report["errors"].append(f"{snapshot['name']}: {status['error']}")
+            report["deleted"] += deleted
+            report["failed"] += len(selected) - deleted
+
+        if len(page) < page_size:
+            break
+
+    _LOGGER.debug("Snapshots pruning: %s", report)
+    return report
@@ -0,0 +1,127 @@
+"""Routing of the service calls to the TrueNAS hosts."""
+
+from __future__ import annotations
+
+from functools import partial
+from typing import TYPE_CHECKING
+
+from homeassistant.const import CONF_NAME
+from homeassistant.core import CALLBACK_TYPE, Event, HomeAssistant, callback
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers import entity_registry as er
+from homeassistant.util.hass_dict import HassKey
+
+from .const import DOMAIN
+
+if TYPE_CHECKING:
+    from .coordinator import TruenasDataUpdateCoordinator
+
+DATA_ROUTER: HassKey[ServiceRouter] = HassKey(f"{DOMAIN}_router")
+
+
+class ServiceRouter:
+    """Route the service calls to the coordinator of their config entry.
+
+    An entity id is resolved to its config entry through the entity registry
+    once, then served from a cache dropped when its registry entry changes.
+    A config entry is added once set up and removed, with its routes, when it
+    is unloaded.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize."""
+        self.hass = hass
+        self.coordinators: dict[str, TruenasDataUpdateCoordinator] = {}
+        # Entity id -> config entry id and unique id
+        self._routes: dict[str, tuple[str, str]] = {}
+        self._unsub_registry: CALLBACK_TYPE | None = None
+
+    @callback
+    def async_add(self, coordinator: TruenasDataUpdateCoordinator) -> CALLBACK_TYPE:
+        """Route the calls to a host and return a callback removing it."""
+        if self._unsub_registry is None:
+            self._unsub_registry = self.hass.bus.async_listen(
+                er.EVENT_ENTITY_REGISTRY_UPDATED, self._async_registry_updated
+            )
+        entry_id = coordinator.config_entry.entry_id
+        self.coordinators[entry_id] = coordinator
+        return partial(self._async_remove, entry_id)
+
+    @callback
+    def _async_remove(self, entry_id: str) -> None:
+        """Stop routing the calls to a host."""
+        self.coordinators.pop(entry_id, None)
+        self._routes = {
+            entity_id: route
+            for entity_id, route in self._routes.items()
+            if route[0] != entry_id
+        }
+        if not self.coordinators and self._unsub_registry is not None:
+            self._unsub_registry()
+            self._unsub_registry = None
+
+    @callback
+    def _async_registry_updated(
+        self, event: Event[er.EventEntityRegistryUpdatedData]
+    ) -> None:
+        """Forget the route of an updated entity."""
+        self._routes.pop(event.data["entity_id"], None)
+        if old_entity_id := event.data.get("old_entity_id"):
+            self._routes.pop(old_entity_id, None)
+
+    @callback
+    def async_route(self, entity_id: str) -> tuple[TruenasDataUpdateCoordinator, str]:
+        """Return the coordinator and the unique id of an entity."""
+        if (route := self._routes.get(entity_id)) is None:
+            entry = er.async_get(self.hass).async_get(entity_id)
+            if (
+                entry is None
+                or entry.platform != DOMAIN
+                or entry.config_entry_id not in self.coordinators
+            ):
+                raise HomeAssistantError(
+                    f"{entity_id} is not an entity of a loaded TrueNAS host"
+                )
+            route = self._routes[entity_id] = (entry.config_entry_id, entry.unique_id)
+        return self.coordinators[route[0]], route[1]
+
+    @callback
+    def async_uid(
+        self, entity_id: str, key: str
+    ) -> tuple[TruenasDataUpdateCoordinator, str]:
+        """Return the coordinator of an entity and the TrueNAS uid it is for."""
+        coordinator, unique_id = self.async_route(entity_id)
+        device_name = coordinator.config_entry.data[CONF_NAME].capitalize()
+        prefix = f"{device_name}-{key}-"
+        if not unique_id.startswith(prefix):
+            raise HomeAssistantError(f"{entity_id} is not a TrueNAS {key} entity")
+        return coordinator, unique_id[len(prefix) :]
+
+    @callback
+    def async_coordinator(
+        self, entry_id: str | None = None
+    ) -> TruenasDataUpdateCoordinator:
+        """Return the coordinator of a config entry, the only one by default."""
+        if entry_id is not None:
+            if (coordinator := self.coordinators.get(entry_id)) is None:
+                raise HomeAssistantError(f"{entry_id} is not a loaded TrueNAS host")
+            return coordinator
+        if len(self.coordinators) != 1:
+            raise HomeAssistantError(
+                "No TrueNAS host is loaded"
+                if not self.coordinators
+                else "Several TrueNAS hosts are loaded, select one with config_entry_id"
+            )
+        return next(iter(self.coordinators.values()))
+
+    def as_dict(self) -> dict[str, int]:
+        """Return the router state as a dictionary."""
+        return {"hosts": len(self.coordinators), "routes": len(self._routes)}
+
+
+@callback
+def async_get_router(hass: HomeAssistant) -> ServiceRouter:
+    """Return the router shared by the config entries."""
+    if (router := hass.data.get(DATA_ROUTER)) is None:
+        router = hass.data[DATA_ROUTER] = ServiceRouter(hass)
+    return router
@@ -1,10 +1,11 @@
 """Sensors for TrueNAS integration."""
 
-from collections.abc import Callable
+from collections.abc import Callable, Mapping
 from dataclasses import dataclass
 from datetime import UTC, date, datetime, timedelta
 from decimal import Decimal
-from typing import Final
+from functools import partial
+from typing import Any, Final
 
 from homeassistant.components.sensor import (
     EntityCategory,
@@ -18,13 +19,18 @@ from homeassistant.const import (
     UnitOfDataRate,
     UnitOfInformation,
     UnitOfTemperature,
+    UnitOfTime,
 )
-from homeassistant.core import HomeAssistant
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.helpers.device_registry import DeviceInfo
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 from homeassistant.helpers.typing import StateType
 
 from . import TruenasConfigEntry
+from .aggregate import FleetAggregator, async_get_aggregator
+from .apps import app_update_call
 from .const import (
+    DOMAIN,
     EXTRA_ATTRS_CLOUDSYNC,
     EXTRA_ATTRS_DATASET,
     EXTRA_ATTRS_DISK,
@@ -33,15 +39,36 @@ from .const import (
     EXTRA_ATTRS_RSYNCTASK,
     EXTRA_ATTRS_SNAPSHOTTASK,
 )
+from .coordinator import TruenasDataUpdateCoordinator
 from .entity import TruenasEntity, TruenasEntityDescription
 from .helpers import finditem
+from .planner import async_get_planner
 
 
 @dataclass(frozen=True, kw_only=True)
 class TruenasSensorEntityDescription(SensorEntityDescription, TruenasEntityDescription):
     """Class describing entities."""
 
+    # Without attribute, the value is computed from the whole data of the object
+    attribute: str | None = None
     value_fn: Callable | None = None
+    attributes_fn: (
+        Callable[[TruenasDataUpdateCoordinator, Any], dict[str, Any]] | None
+    ) = None
+
+
+def _outdated_apps(apps: Any) -> list[str]:
+    """Return the ids of the apps with an update available."""
+    return [app["id"] for app in apps or [] if app_update_call(app) is not None]
+
+
+@dataclass(frozen=True, kw_only=True)
+class FleetSensorEntityDescription(SensorEntityDescription):
+    """Class describing fleet entities."""
+
+    # Collection of the coordinator data the total is computed from
+    api: str
+    value_fn: Callable[[int], StateType] = lambda x: x
 
 
 RESOURCE_LIST: Final[tuple[TruenasSensorEntityDescription, ...]] = (
@@ -294,6 +321,109 @@ RESOURCE_LIST: Final[tuple[TruenasSensorEntityDescription, ...]] = (
         extra_attributes=EXTRA_ATTRS_RSYNCTASK,
         id="path",
     ),
+    TruenasSensorEntityDescription(
+        key="refresh_duration",
+        name="Refresh duration",
+        icon="mdi:timer-outline",
+        native_unit_of_measurement=UnitOfTime.SECONDS,
+        device_class=SensorDeviceClass.DURATION,
+        state_class=SensorStateClass.MEASUREMENT,
+        entity_category=EntityCategory.DIAGNOSTIC,
+        entity_registry_enabled_default=False,
+        device="System",
+        api="metrics",
+        attribute="refresh_duration",
+        extra_attributes=["refresh_calls", "errors"],
+    ),
+    TruenasSensorEntityDescription(
+        key="refresh_slowest_method",
+        name="Slowest method",
+        icon="mdi:timer-sand",
+        entity_category=EntityCategory.DIAGNOSTIC,
+        entity_registry_enabled_default=False,
+        device="System",
+        api="metrics",
+        attribute="slowest_method",
+        extra_attributes=["slowest_method_duration"],
+    ),
+    TruenasSensorEntityDescription(
+        key="refresh_lateness",
+        name="Refresh lateness",
+        icon="mdi:timer-alert-outline",
+        native_unit_of_measurement=UnitOfTime.SECONDS,
+        device_class=SensorDeviceClass.DURATION,
+        state_class=SensorStateClass.MEASUREMENT,
+        entity_category=EntityCategory.DIAGNOSTIC,
+        entity_registry_enabled_default=False,
+        device="System",
+        api="metrics",
+        attribute="refresh_lateness",
+        extra_attributes=["refresh_load"],
+    ),
+    TruenasSensorEntityDescription(
+        key="apps_outdated",
+        name="Apps to update",
+        icon="mdi:package-up",
+        state_class=SensorStateClass.MEASUREMENT,
+        device="Apps",
+        api="apps",
+        value_fn=lambda apps: len(_outdated_apps(apps)),
+        attributes_fn=lambda coordinator, apps: {
+            "total": len(apps or []),
+            "apps": _outdated_apps(apps),
+            # Progress of the running update of all the apps
+            "progress": coordinator.app_updates.progress,
+        },
+    ),
+)
+
+FLEET_RESOURCE_LIST: Final[tuple[FleetSensorEntityDescription, ...]] = (
+    FleetSensorEntityDescription(
+        key="pool_free",
+        api="pools",
+        name="Pools free",
+        icon="mdi:database-settings",
+        native_unit_of_measurement=UnitOfInformation.GIBIBYTES,
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda x: round(x / 1024 / 1024 / 1024, 2),
+    ),
+    FleetSensorEntityDescription(
+        key="pool_used",
+        api="pools",
+        name="Pools used",
+        icon="mdi:database",
+        native_unit_of_measurement=UnitOfInformation.GIBIBYTES,
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda x: round(x / 1024 / 1024 / 1024, 2),
+    ),
+    FleetSensorEntityDescription(
+        key="pools_unhealthy",
+        api="pools",
+        name="Unhealthy pools",
+        icon="mdi:database-alert",
+        state_class=SensorStateClass.MEASUREMENT,
+    ),
+    FleetSensorEntityDescription(
+        key="datasets",
+        api="datasets",
+        name="Datasets",
+        icon="mdi:database-outline",
+        state_class=SensorStateClass.MEASUREMENT,
+    ),
+    FleetSensorEntityDescription(
+        key="alerts",
+        api="events",
+        name="Active alerts",
+        icon="mdi:bell",
+        state_class=SensorStateClass.MEASUREMENT,
+    ),
+    FleetSensorEntityDescription(
+        key="apps_outdated",
+        api="apps",
+        name="Apps to update",
+        icon="mdi:package-up",
+        state_class=SensorStateClass.MEASUREMENT,
+    ),
 )
 
 
@@ -317,6 +447,38 @@ async def async_setup_entry(
 
     async_add_entities(entities)
 
+    aggregator = async_get_aggregator(hass)
+    planner = async_get_planner(hass)
+
+    @callback
+    def _async_add_fleet_entities() -> CALLBACK_TYPE:
+        """Add the sensors of the fleet totals and return their remover."""
+        for description in FLEET_RESOURCE_LIST:
+            # The totals read the collections of every host
+            planner.async_track(None, f"fleet-{description.key}", description.api)
+        fleet = [
+            FleetSensor(aggregator, description) for description in FLEET_RESOURCE_LIST
+        ]
+        async_add_entities(fleet)
+        return partial(_async_remove_fleet_entities, hass, fleet)
+
+    entry.async_on_unload(aggregator.async_add(coordinator, _async_add_fleet_entities))
+
+
+@callback
+def _async_remove_fleet_entities(
+    hass: HomeAssistant, fleet: list[SensorEntity]
+) -> None:
+    """Remove the sensors of the fleet totals.
+
+    Their registry entries are kept for the reload of a host, they are removed
+    with the config entry (see async_remove_fleet_device).
+    """
+    async_get_planner(hass).async_untrack(None)
+    for entity in fleet:
+        if entity.hass is not None:
+            hass.async_create_task(entity.async_remove())
+
 
 class Sensor(TruenasEntity, SensorEntity):
     """Define an Truenas Sensor."""
@@ -326,7 +488,55 @@ class Sensor(TruenasEntity, SensorEntity):
     @property
     def native_value(self) -> StateType | date | datetime | Decimal:
         """Return the value reported by the sensor."""
-        value = finditem(self.device_data, self.entity_description.attribute)
+        if (attribute := self.entity_description.attribute) is None:
+            value = self.device_data
+        else:
+            value = finditem(self.device_data, attribute)
         if self.entity_description.value_fn:
             return self.entity_description.value_fn(value)
         return value
+
+    @property
+    def extra_state_attributes(self) -> Mapping[str, Any] | None:
+        """Return the state attributes."""
+        if self.entity_description.attributes_fn:
+            return self.entity_description.attributes_fn(
+                self.coordinator, self.device_data
+            )
+        return super().extra_state_attributes
+
+
+class FleetSensor(SensorEntity):
+    """Define a sensor of a total over all the Truenas hosts."""
+
+    _attr_has_entity_name = True
+    _attr_should_poll = False
+    entity_description: FleetSensorEntityDescription
+
+    def __init__(
+        self, aggregator: FleetAggregator, description: FleetSensorEntityDescription
+    ) -> None:
+        """Initialize."""
+        self.aggregator = aggregator
+        self.entity_description = description
+        self._attr_unique_id = f"fleet-{description.key}"
+        self._attr_device_info = DeviceInfo(
+            identifiers={(DOMAIN, "fleet")}, name="Truenas fleet"
+        )
+
+    @property
+    def native_value(self) -> StateType:
+        """Return the total over all the hosts."""
+        key = self.entity_description.key
+        return self.entity_description.value_fn(self.aggregator.totals[key])
+
+    @property
+    def extra_state_attributes(self) -> dict[str, int]:
+        """Return the number of hosts in the total."""
+        return {"hosts": len(self.aggregator.hosts)}
+
+    async def async_added_to_hass(self) -> None:
+        """Follow the changes of the totals."""
+        self.async_on_remove(
+            self.aggregator.async_add_listener(self.async_write_ha_state)
+        )
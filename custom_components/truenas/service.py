@@ -1,67 +1,440 @@
 """Service for TrueNAS integration."""
 
+import asyncio
+import logging
+from collections.abc import Callable
+from typing import Any
+
+import voluptuous as vol
+from homeassistant.components import persistent_notification
 from homeassistant.const import CONF_ENTITY_ID, CONF_NAME
-from homeassistant.core import HomeAssistant, ServiceCall
-from homeassistant.helpers import entity_registry as er
+from homeassistant.core import (
+    HomeAssistant,
+    ServiceCall,
+    ServiceResponse,
+    SupportsResponse,
+)
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers import config_validation as cv
+from homeassistant.helpers.entity_platform import async_get_platforms
+from homeassistant.helpers.service import async_register_admin_service
+from truenaspy import TruenasException
 
+from .apps import APP_UPDATE_PARALLELISM
+from .bulk import BULK_CONCURRENCY, async_call_bulk
+from .capture import async_start_capture, async_stop_capture
 from .const import DOMAIN
 from .coordinator import TruenasDataUpdateCoordinator
+from .entity import TruenasEntity
+from .profiler import async_profile_refreshes
+from .prune import PRUNE_PAGE_SIZE, async_prune_snapshots
+from .router import async_get_router
+
+_LOGGER = logging.getLogger(__name__)
+
+ATTR_CONCURRENCY = "concurrency"
+ATTR_CONFIG_ENTRY_ID = "config_entry_id"
+ATTR_NAME = "name"
+ATTR_WAIT = "wait"
+SCHEMA_TARGETS = {
+    vol.Required(CONF_ENTITY_ID): cv.entity_ids,
+    vol.Optional(ATTR_CONCURRENCY, default=BULK_CONCURRENCY): vol.All(
+        vol.Coerce(int), vol.Range(min=1, max=20)
+    ),
+    vol.Optional(ATTR_WAIT, default=False): cv.boolean,
+}
 
 SERVICE_CLOUDSYNC_RUN = "cloudsync_run"
-SCHEMA_SERVICE_CLOUDSYNC_RUN = {}
+SCHEMA_SERVICE_CLOUDSYNC_RUN = vol.Schema(SCHEMA_TARGETS)
 
 SERVICE_DATASET_SNAPSHOT = "dataset_snapshot"
-SCHEMA_SERVICE_DATASET_SNAPSHOT = {}
+SCHEMA_SERVICE_DATASET_SNAPSHOT = vol.Schema(
+    {**SCHEMA_TARGETS, vol.Optional(ATTR_NAME, default="manual"): cv.string}
+)
+
+SERVICE_PRUNE_SNAPSHOTS = "prune_snapshots"
+ATTR_DATASET = "dataset"
+ATTR_RECURSIVE = "recursive"
+ATTR_PATTERN = "pattern"
+ATTR_OLDER_THAN = "older_than"
+ATTR_DRY_RUN = "dry_run"
+ATTR_PAGE_SIZE = "page_size"
+SCHEMA_SERVICE_PRUNE_SNAPSHOTS = vol.All(
+    vol.Schema(
+        {
+            vol.Optional(ATTR_CONFIG_ENTRY_ID): cv.string,
+            vol.Optional(ATTR_DATASET): cv.string,
+            vol.Optional(ATTR_RECURSIVE, default=False): cv.boolean,
+            vol.Optional(ATTR_PATTERN): cv.is_regex,
+            vol.Optional(ATTR_OLDER_THAN): cv.time_period,
+            vol.Optional(ATTR_DRY_RUN, default=False): cv.boolean,
+            vol.Optional(ATTR_PAGE_SIZE, default=PRUNE_PAGE_SIZE): vol.All(
+                vol.Coerce(int), vol.Range(min=1, max=1000)
+            ),
+            vol.Optional(ATTR_CONCURRENCY, default=BULK_CONCURRENCY): vol.All(
+                vol.Coerce(int), vol.Range(min=1, max=20)
+            ),
+        }
+    ),
+    cv.has_at_least_one_key(ATTR_DATASET, ATTR_OLDER_THAN),
+)
 
 SERVICE_SERVICE_RELOAD = "service_reload"
-SCHEMA_SERVICE_SERVICE_RELOAD = {}
+SCHEMA_SERVICE_SERVICE_RELOAD = vol.Schema(SCHEMA_TARGETS)
+
+SERVICE_PROFILE = "profile"
+ATTR_REFRESHES = "refreshes"
+ATTR_TIMEOUT = "timeout"
+SCHEMA_SERVICE_PROFILE = vol.Schema(
+    {
+        vol.Optional(ATTR_CONFIG_ENTRY_ID): cv.string,
+        vol.Optional(ATTR_REFRESHES, default=1): vol.All(
+            vol.Coerce(int), vol.Range(min=1, max=20)
+        ),
+        vol.Optional(ATTR_TIMEOUT, default=120): vol.All(
+            vol.Coerce(int), vol.Range(min=5, max=900)
+        ),
+    }
+)
+
+SERVICE_CAPTURE = "capture"
+ATTR_DURATION = "duration"
+SCHEMA_SERVICE_CAPTURE = vol.Schema(
+    {
+        vol.Optional(ATTR_CONFIG_ENTRY_ID): cv.string,
+        vol.Optional(ATTR_DURATION, default=60): vol.All(
+            vol.Coerce(int), vol.Range(min=1, max=3600)
+        ),
+    }
+)
+
+SERVICE_CAPTURE_STOP = "capture_stop"
+SCHEMA_SERVICE_CAPTURE_STOP = vol.Schema(
+    {vol.Optional(ATTR_CONFIG_ENTRY_ID): cv.string}
+)
+
+SERVICE_BULK_ACTION = "bulk_action"
+ATTR_ACTION = "action"
+BULK_ACTIONS = ["start", "stop"]
+SCHEMA_SERVICE_BULK_ACTION = vol.Schema(
+    {**SCHEMA_TARGETS, vol.Required(ATTR_ACTION): vol.In(BULK_ACTIONS)}
+)
+
+SERVICE_UPDATE_APPS = "update_apps"
+ATTR_PARALLELISM = "parallelism"
+SCHEMA_SERVICE_UPDATE_APPS = vol.Schema(
+    {
+        vol.Optional(CONF_ENTITY_ID): cv.entity_ids,
+        vol.Optional(ATTR_PARALLELISM, default=APP_UPDATE_PARALLELISM): vol.All(
+            vol.Coerce(int), vol.Range(min=1, max=10)
+        ),
+    }
+)
 
-ATTR_NAME = "name"
 ATTR_ID = "id"
 
 
 async def async_setup_services(
     hass: HomeAssistant, coordinator: TruenasDataUpdateCoordinator
 ):
-    """Register services."""
-
-    def _extract_uid(entity_id: str, key: str) -> str:
-        """Extract the TrueNAS uid from an entity unique_id."""
-        entry = er.async_get(hass).async_get(entity_id)
-        device_name = coordinator.config_entry.data[CONF_NAME].capitalize()
-        prefix = f"{device_name}-{key}-"
-        return entry.unique_id[len(prefix):]
-
-    async def take_snapshot(call: ServiceCall) -> None:
-        """Take a snapshot of a dataset."""
-        dataset = _extract_uid(call.data.get(CONF_ENTITY_ID), "snapshottask")
-        await coordinator.websocket.async_call(
-            method="zfs.snapshot.create",
-            params=[{"dataset": dataset, "name": "manual"}],
+    """Route the service calls to a host and register the services once."""
+    router = async_get_router(hass)
+    coordinator.config_entry.async_on_unload(router.async_add(coordinator))
+    if hass.services.has_service(DOMAIN, SERVICE_DATASET_SNAPSHOT):
+        return
+
+    def _target_result(entity_id: str, uid: Any, status: dict) -> dict[str, Any]:
+        """Return the outcome of the call on a target."""
+        return {
+            "entity_id": entity_id,
+            "uid": uid,
+            "success": status["error"] is None,
+            "error": status["error"],
+            "job_id": status["job_id"],
+        }
+
+    async def _async_call_targets(
+        call: ServiceCall,
+        key: str,
+        method: str,
+        params: Callable[[str], list[Any]],
+        refresh: tuple[str, str, str] | None = None,
+    ) -> list[tuple[dict[str, Any], dict[str, Any]]]:
+        """Call a method on every target and return their outcomes and statuses.
+
+        The targets are grouped by host, the hosts are called concurrently.
+        With ``refresh``, the query method, data key and id field of the
+        objects, each target is refetched once its job is done.
+        """
+        targets = [
+            (entity_id, *router.async_uid(entity_id, key))
+            for entity_id in call.data[CONF_ENTITY_ID]
+        ]
+        hosts: dict[TruenasDataUpdateCoordinator, list[int]] = {}
+        for index, (_, host, _) in enumerate(targets):
+            hosts.setdefault(host, []).append(index)
+        statuses: list[dict[str, Any]] = [{}] * len(targets)
+
+        async def _async_call_host(
+            host: TruenasDataUpdateCoordinator, indexes: list[int]
+        ) -> None:
+            host_statuses = await async_call_bulk(
+                host,
+                method,
+                [params(targets[index][2]) for index in indexes],
+                call.data[ATTR_CONCURRENCY],
+                wait=call.data[ATTR_WAIT],
+            )
+            for index, status in zip(indexes, host_statuses, strict=True):
+                statuses[index] = status
+
+        await asyncio.gather(*(_async_call_host(*item) for item in hosts.items()))
+        if refresh is not None:
+            for (_, host, uid), status in zip(targets, statuses, strict=True):
+                if status["error"] is None:
+                    host.async_schedule_item_refresh(status["job_id"], *refresh, uid)
+        return [
+            (_target_result(entity_id, uid, status), status)
+            for (entity_id, _, uid), status in zip(targets, statuses, strict=True)
+        ]
+
+    async def take_snapshot(call: ServiceCall) -> ServiceResponse:
+        """Take a snapshot of datasets."""
+        name = call.data[ATTR_NAME]
+        outcomes = await _async_call_targets(
+            call,
+            "snapshottask",
+            "zfs.snapshot.create",
+            lambda dataset: [{"dataset": dataset, "name": name}],
+        )
+
+        def _snapshot(result: dict[str, Any], status: dict[str, Any]) -> str | None:
+            """Return the name of the snapshot taken on a target."""
+            if isinstance(status["result"], dict):
+                return status["result"].get("name")
+            return f"{result['uid']}@{name}" if result["success"] else None
+
+        return {
+            "results": [
+                {**result, "snapshot": _snapshot(result, status)}
+                for result, status in outcomes
+            ]
+        }
+
+    async def start_cloudsync(call: ServiceCall) -> ServiceResponse:
+        """Start cloudsync tasks."""
+        outcomes = await _async_call_targets(
+            call, "cloudsync", "cloudsync.sync", lambda task_id: [int(task_id)]
+        )
+        return {"results": [result for result, _ in outcomes]}
+
+    async def service_reload(call: ServiceCall) -> ServiceResponse:
+        """Reload services."""
+        outcomes = await _async_call_targets(
+            call,
+            "service",
+            "service.reload",
+            lambda service: [service],
+            ("service.query", "services", "service"),
+        )
+        return {"results": [result for result, _ in outcomes]}
+
+    async def prune_snapshots(call: ServiceCall) -> ServiceResponse:
+        """Delete the snapshots matching a selection."""
+        pattern = call.data.get(ATTR_PATTERN)
+        return await async_prune_snapshots(
+            router.async_coordinator(call.data.get(ATTR_CONFIG_ENTRY_ID)),
+            dataset=call.data.get(ATTR_DATASET),
+            recursive=call.data[ATTR_RECURSIVE],
+            pattern=pattern.pattern if pattern is not None else None,
+            older_than=call.data.get(ATTR_OLDER_THAN),
+            dry_run=call.data[ATTR_DRY_RUN],
+            page_size=call.data[ATTR_PAGE_SIZE],
+            concurrency=call.data[ATTR_CONCURRENCY],
+        )
+
+    def _platform_entity(entity_id: str, domain: str) -> TruenasEntity:
+        """Return the TrueNAS entity of an entity id on a platform."""
+        host, _ = router.async_route(entity_id)
+        for platform in async_get_platforms(hass, DOMAIN):
+            if (
+                platform.domain != domain
+                or platform.config_entry is not host.config_entry
+            ):
+                continue
+            if isinstance(entity := platform.entities.get(entity_id), TruenasEntity):
+                return entity
+        raise HomeAssistantError(f"{entity_id} is not a TrueNAS {domain}")
+
+    async def bulk_action(call: ServiceCall) -> ServiceResponse:
+        """Start or stop many apps, VMs and services at once."""
+        action = call.data[ATTR_ACTION]
+        # Host and switch kind -> entities
+        groups: dict[tuple[str, str], list[TruenasEntity]] = {}
+        for entity_id in call.data[CONF_ENTITY_ID]:
+            entity = _platform_entity(entity_id, "switch")
+            group = (
+                entity.coordinator.config_entry.entry_id,
+                entity.entity_description.key,
+            )
+            groups.setdefault(group, []).append(entity)
+
+        async def _async_run_group(entities: list[TruenasEntity]) -> list[dict]:
+            description = entities[0].entity_description
+            method, extra = (
+                (description.turn_on, description.params_on)
+                if action == "start"
+                else (description.turn_off, description.params_off)
+            )
+            statuses = await async_call_bulk(
+                entities[0].coordinator,
+                method,
+                [[e.uid] if extra is None else [e.uid, extra] for e in entities],
+                call.data[ATTR_CONCURRENCY],
+                wait=call.data[ATTR_WAIT],
+            )
+            # The targets with a job are refetched once it is done, the others
+            # with one refresh of the collection of the host
+            refresh = False
+            for entity, status in zip(entities, statuses, strict=True):
+                if status["job_id"] is None:
+                    refresh = True
+                    continue
+                entity.coordinator.async_schedule_item_refresh(
+                    status["job_id"],
+                    description.query,
+                    description.api,
+                    description.id,
+                    entity.uid,
+                )
+            if refresh:
+                try:
+                    await entities[0].coordinator.async_refresh_item(
+                        description.query, description.api
+                    )
+                except TruenasException as error:
+                    _LOGGER.warning("Refresh of %s failed: %s", description.api, error)
+            return [
+                _target_result(entity.entity_id, entity.uid, status)
+                for entity, status in zip(entities, statuses, strict=True)
+            ]
+
+        results = [
+            result
+            for group in await asyncio.gather(*map(_async_run_group, groups.values()))
+            for result in group
+        ]
+        return {"action": action, "results": results}
+
+    async def update_apps(call: ServiceCall) -> ServiceResponse:
+        """Update the apps of the targets, or all the outdated apps of all hosts."""
+        # Coordinator -> app ids to update, None for all its outdated apps
+        targets: dict[TruenasDataUpdateCoordinator, list[str] | None] = {}
+        if CONF_ENTITY_ID in call.data:
+            for entity_id in call.data[CONF_ENTITY_ID]:
+                entity = _platform_entity(entity_id, "update")
+                if entity.entity_description.api != "apps":
+                    raise HomeAssistantError(f"{entity_id} is not a TrueNAS app")
+                targets.setdefault(entity.coordinator, []).append(entity.uid)
+        else:
+            targets = dict.fromkeys(router.coordinators.values())
+
+        async def _async_update_host(
+            host: TruenasDataUpdateCoordinator, app_ids: list[str] | None
+        ) -> list[dict]:
+            results = await host.app_updates.async_update(
+                app_ids, call.data[ATTR_PARALLELISM]
+            )
+            name = host.config_entry.data[CONF_NAME]
+            return [{"host": name, **result} for result in results]
+
+        results = [
+            result
+            for host_results in await asyncio.gather(
+                *(_async_update_host(host, ids) for host, ids in targets.items())
+            )
+            for result in host_results
+        ]
+        return {"results": results}
+
+    async def profile(call: ServiceCall) -> None:
+        """Profile the next coordinator refreshes."""
+        report = await async_profile_refreshes(
+            hass,
+            router.async_coordinator(call.data.get(ATTR_CONFIG_ENTRY_ID)),
+            call.data[ATTR_REFRESHES],
+            call.data[ATTR_TIMEOUT],
+        )
+        persistent_notification.async_create(
+            hass,
+            f"{report['refreshes']} refresh(es) profiled in {report['duration']}s, "
+            f"report written to {report['file']}",
+            title="TrueNAS profile",
+            notification_id=f"{DOMAIN}_profile",
         )
 
-    async def start_cloudsync(call: ServiceCall) -> None:
-        """Start cloudsync."""
-        task_id = int(_extract_uid(call.data.get(CONF_ENTITY_ID), "cloudsync"))
-        await coordinator.websocket.async_call(
-            method="cloudsync.sync",
-            params=[task_id],
+    async def capture(call: ServiceCall) -> None:
+        """Start capturing the websocket traffic to a file."""
+        await async_start_capture(
+            hass,
+            router.async_coordinator(call.data.get(ATTR_CONFIG_ENTRY_ID)),
+            call.data[ATTR_DURATION],
         )
 
-    async def service_reload(call: ServiceCall) -> None:
-        """Reload a service."""
-        service_name = _extract_uid(call.data.get(CONF_ENTITY_ID), "service")
-        await coordinator.websocket.async_call(
-            method="service.reload",
-            params=[service_name],
+    async def capture_stop(call: ServiceCall) -> None:
+        """Stop the running capture and write its file."""
+        async_stop_capture(
+            router.async_coordinator(call.data.get(ATTR_CONFIG_ENTRY_ID))
         )
 
     hass.services.async_register(
-        DOMAIN, SERVICE_DATASET_SNAPSHOT, take_snapshot, SCHEMA_SERVICE_DATASET_SNAPSHOT
+        DOMAIN,
+        SERVICE_DATASET_SNAPSHOT,
+        take_snapshot,
+        SCHEMA_SERVICE_DATASET_SNAPSHOT,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_CLOUDSYNC_RUN,
+        start_cloudsync,
+        SCHEMA_SERVICE_CLOUDSYNC_RUN,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_PRUNE_SNAPSHOTS,
+        prune_snapshots,
+        SCHEMA_SERVICE_PRUNE_SNAPSHOTS,
+        supports_response=SupportsResponse.OPTIONAL,
     )
     hass.services.async_register(
-        DOMAIN, SERVICE_CLOUDSYNC_RUN, start_cloudsync, SCHEMA_SERVICE_DATASET_SNAPSHOT
+        DOMAIN,
+        SERVICE_SERVICE_RELOAD,
+        service_reload,
+        SCHEMA_SERVICE_SERVICE_RELOAD,
+        supports_response=SupportsResponse.OPTIONAL,
     )
     hass.services.async_register(
-        DOMAIN, SERVICE_SERVICE_RELOAD, service_reload, SCHEMA_SERVICE_SERVICE_RELOAD
+        DOMAIN,
+        SERVICE_BULK_ACTION,
+        bulk_action,
+        SCHEMA_SERVICE_BULK_ACTION,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_UPDATE_APPS,
+        update_apps,
+        SCHEMA_SERVICE_UPDATE_APPS,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+    async_register_admin_service(
+        hass, DOMAIN, SERVICE_PROFILE, profile, SCHEMA_SERVICE_PROFILE
+    )
+    async_register_admin_service(
+        hass, DOMAIN, SERVICE_CAPTURE, capture, SCHEMA_SERVICE_CAPTURE
+    )
+    async_register_admin_service(
+        hass, DOMAIN, SERVICE_CAPTURE_STOP, capture_stop, SCHEMA_SERVICE_CAPTURE_STOP
     )
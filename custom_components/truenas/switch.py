@@ -1,16 +1,19 @@
 """Switch for TrueNAS integration."""
 
 import logging
+import time
 from collections.abc import Callable
 from dataclasses import dataclass
+from datetime import datetime
 from typing import Any, Final
 
 from packaging import version
 from truenaspy import TruenasException
 
 from homeassistant.components.switch import SwitchEntity, SwitchEntityDescription
-from homeassistant.core import HomeAssistant
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
+from homeassistant.helpers.event import async_call_later
 
 from . import TruenasConfigEntry
 from .const import EXTRA_ATTRS_SERVICE, EXTRA_ATTRS_VM
@@ -24,6 +27,7 @@ class TruenasSwitchEntityDescription(SwitchEntityDescription, TruenasEntityDescr
 
     turn_on: str
     turn_off: str
+    query: str
     value_fn: Callable
     params_on: dict[str, Any] | None = None
     params_off: dict[str, Any] | None = None
@@ -38,6 +42,7 @@ SWITCH_LIST: Final[list[TruenasSwitchEntityDescription]] = [
         id="id",
         turn_on="app.start",
         turn_off="app.stop",
+        query="app.query",
         value_fn=lambda x: x != "STOPPED",
     ),
     TruenasSwitchEntityDescription(
@@ -49,6 +54,7 @@ SWITCH_LIST: Final[list[TruenasSwitchEntityDescription]] = [
         extra_attributes=EXTRA_ATTRS_SERVICE,
         turn_on="service.start",
         turn_off="service.stop",
+        query="service.query",
         params_off={"silent": False},
         value_fn=lambda x: x != "STOPPED",
     ),
@@ -65,6 +71,7 @@ SWITCH_LIST_25_04: Final[list[TruenasSwitchEntityDescription]] = [
         extra_attributes=EXTRA_ATTRS_VM,
         turn_on="virt.instance.start",
         turn_off="virt.instance.stop",
+        query="virt.instance.query",
         params_off={"force": True},
         value_fn=lambda x: x == "RUNNING",
     ),
@@ -80,12 +87,16 @@ SWITCH_LIST_25_10: Final[list[TruenasSwitchEntityDescription]] = [
         extra_attributes=EXTRA_ATTRS_VM,
         turn_on="vm.start",
         turn_off="vm.stop",
+        query="vm.query",
         params_off={"force": True},
         value_fn=lambda x: x == "RUNNING",
     ),
 ]
 
 _LOGGER = logging.getLogger(__name__)
+# Maximum time (seconds) a toggled state is shown without confirmation, longer
+# than the wait for the job of the action before the object is refreshed
+SWITCH_PENDING_TIMEOUT = 150
 
 
 async def async_setup_entry(
@@ -115,14 +126,40 @@ async def async_setup_entry(
     async_add_entities(entities)
 
 
+@dataclass(slots=True)
+class PendingState:
+    """Optimistic state of a switch waiting for its confirmation."""
+
+    target: bool
+    deadline: float
+
+    @property
+    def expired(self) -> bool:
+        """Return True if the state was not confirmed in time."""
+        return time.monotonic() >= self.deadline
+
+
 class SwitchSensor(TruenasEntity, SwitchEntity):
-    """Switch."""
+    """Switch.
+
+    A toggle is shown at once: the requested state is kept pending until an
+    event or the refresh of the object confirms it, and reverted to the
+    actual state when the refresh does not or the deadline is reached.
+    """
 
     entity_description: TruenasSwitchEntityDescription
+    _pending: PendingState | None = None
+    _pending_unsub: CALLBACK_TYPE | None = None
 
     @property
     def is_on(self) -> bool:
         """Return state."""
+        if self._pending is not None:
+            return self._pending.target
+        return self._actual_state()
+
+    def _actual_state(self) -> bool:
+        """Return the state reported by TrueNAS."""
         value = finditem(self.device_data, self.entity_description.attribute)
         if self.entity_description.value_fn:
             return bool(self.entity_description.value_fn(value))
@@ -130,32 +167,87 @@ class SwitchSensor(TruenasEntity, SwitchEntity):
 
     async def async_turn_on(self) -> None:
         """Turn the entity on."""
-        try:
-            params = (
-                [self.uid]
-                if self.entity_description.params_on is None
-                else [self.uid, self.entity_description.params_on]
-            )
-            await self.coordinator.websocket.async_call(
-                method=self.entity_description.turn_on, params=params
-            )
-        except TruenasException as error:
-            _LOGGER.error(error)
-        else:
-            await self.coordinator.async_request_refresh()
+        params = (
+            [self.uid]
+            if self.entity_description.params_on is None
+            else [self.uid, self.entity_description.params_on]
+        )
+        await self._async_switch(self.entity_description.turn_on, params, True)
 
     async def async_turn_off(self) -> None:
         """Turn the entity off."""
+        params = (
+            [self.uid]
+            if self.entity_description.params_off is None
+            else [self.uid, self.entity_description.params_off]
+        )
+        await self._async_switch(self.entity_description.turn_off, params, False)
+
+    async def async_will_remove_from_hass(self) -> None:
+        """Drop the pending state."""
+        self._async_cancel_pending()
+        await super().async_will_remove_from_hass()
+
+    async def _async_switch(self, method: str, params: list, target: bool) -> None:
+        """Call the action and show its state until it is confirmed."""
+        pending = self._async_set_pending(target)
         try:
-            params = (
-                [self.uid]
-                if self.entity_description.params_off is None
-                else [self.uid, self.entity_description.params_off]
-            )
-            await self.coordinator.websocket.async_call(
-                method=self.entity_description.turn_off, params=params
-            )
+            result = await self.coordinator.async_call(method=method, params=params)
         except TruenasException as error:
             _LOGGER.error(error)
-        else:
-            await self.coordinator.async_request_refresh()
+            self._async_settle(pending)
+            return
+        # The refetched object is the actual state, whether it confirms or not
+        task = self.coordinator.async_schedule_item_refresh(
+            result,
+            self.entity_description.query,
+            self.entity_description.api,
+            self.entity_description.id,
+            self.uid,
+        )
+        task.add_done_callback(lambda _: self._async_settle(pending))
+
+    @callback
+    def _async_set_pending(self, target: bool) -> PendingState:
+        """Show the requested state until its confirmation."""
+        self._async_cancel_pending()
+        self._pending = PendingState(target, time.monotonic() + SWITCH_PENDING_TIMEOUT)
+        self._pending_unsub = async_call_later(
+            self.hass, SWITCH_PENDING_TIMEOUT, self._async_pending_expired
+        )
+        self.async_write_ha_state()
+        return self._pending
+
+    @callback
+    def _async_cancel_pending(self) -> None:
+        """Forget the pending state."""
+        if self._pending_unsub is not None:
+            self._pending_unsub()
+            self._pending_unsub = None
+        self._pending = None
+
+    @callback
+    def _async_settle(self, pending: PendingState) -> None:
+        """Show the actual state in place of a pending one."""
+        if self._pending is not pending:
+            return
+        self._async_cancel_pending()
+        self.async_write_ha_state()
+
+    @callback
+    def _async_pending_expired(self, _: datetime) -> None:
+        """Revert a state not confirmed before its deadline."""
+        self._pending_unsub = None
+        if self._pending is not None:
+            _LOGGER.debug("%s: state not confirmed, reverted", self.entity_id)
+            self._async_settle(self._pending)
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Confirm the pending state when the data matches it."""
+        self.device_data = self._handle_data_finder()
+        if self._pending is not None and (
+            self._actual_state() == self._pending.target or self._pending.expired
+        ):
+            self._async_cancel_pending()
+        super()._handle_coordinator_update()
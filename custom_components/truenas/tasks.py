@@ -0,0 +1,141 @@
+"""Data protection tasks kept current from their jobs."""
+
+from __future__ import annotations
+
+import logging
+import time
+from collections.abc import Container
+from typing import TYPE_CHECKING, Any
+
+from homeassistant.core import CALLBACK_TYPE, callback
+from truenaspy import TruenasException
+
+from .jobs import Job
+
+if TYPE_CHECKING:
+    from .coordinator import TruenasDataUpdateCoordinator
+
+_LOGGER = logging.getLogger(__name__)
+
+# Task query methods -> key of the coordinator data they fill
+TASK_QUERIES = {
+    "cloudsync.query": "cloudsync",
+    "replication.query": "replications",
+    "pool.snapshottask.query": "snapshottasks",
+    "rsynctask.query": "rsynctasks",
+}
+# Job methods running a task -> task query method
+TASK_JOBS = {
+    "cloudsync.sync": "cloudsync.query",
+    "replication.run": "replication.query",
+    "pool.snapshottask.run": "pool.snapshottask.query",
+    "rsynctask.run": "rsynctask.query",
+}
+# Full task queries interval (seconds), runs are followed through their jobs
+TASKS_POLL_INTERVAL = 1800
+
+
+class TaskMonitor:
+    """Follow the task runs from the job tracker.
+
+    The task collections are fully queried at setup, after a reconnection and
+    then every ``TASKS_POLL_INTERVAL``. In between, the job of a running task
+    updates its ``job``, ``job_percent``, ``job_description`` and ``state``
+    fields live, and the task alone is queried again when its job finishes.
+    """
+
+    def __init__(self, coordinator: TruenasDataUpdateCoordinator) -> None:
+        """Initialize."""
+        self.coordinator = coordinator
+        self.refetches = 0
+        self._polled_at: float | None = None
+
+    @property
+    def poll_due(self) -> bool:
+        """Return True if the task collections must be fully queried."""
+        return (
+            self._polled_at is None
+            or time.monotonic() - self._polled_at >= TASKS_POLL_INTERVAL
+        )
+
+    def invalidate(self) -> None:
+        """Query the task collections at the next refresh."""
+        self._polled_at = None
+
+    @callback
+    def async_start(self) -> CALLBACK_TYPE:
+        """Start following the jobs."""
+        return self.coordinator.jobs.async_add_listener(self._async_job_update)
+
+    async def async_fetch(
+        self, keys: Container[str] = frozenset(TASK_QUERIES.values())
+    ) -> dict[str, Any]:
+        """Return the task collections, queried only when due.
+
+        The collections not in keys keep their previous rows.
+        """
+        previous = self.coordinator.data or {}
+        if not self.poll_due:
+            return {key: previous.get(key, []) for key in TASK_QUERIES.values()}
+        tasks: dict[str, Any] = {}
+        complete = True
+        for method, key in TASK_QUERIES.items():
+            if key not in keys:
+                tasks[key] = previous.get(key, [])
+                continue
+            try:
+                tasks[key] = await self.coordinator.async_call(method)
+            except TruenasException:
+                _LOGGER.warning("Non-critical call %s failed, continuing", method)
+                tasks[key] = previous.get(key, [])
+                complete = False
+        if complete:
+            self._polled_at = time.monotonic()
+        return tasks
+
+    def _find(self, key: str, task_id: Any) -> tuple[list[dict], int | None]:
+        """Return a task collection and the index of a task in it."""
+        rows = (self.coordinator.data or {}).get(key)
+        if not isinstance(rows, list):
+            return [], None
+        index = next(
+            (i for i, row in enumerate(rows) if row.get("id") == task_id), None
+        )
+        return rows, index
+
+    @callback
+    def _async_job_update(self, job: Job) -> None:
+        """Update the task run by a job."""
+        if (method := TASK_JOBS.get(job.method or "")) is None or not job.arguments:
+            return
+        key = TASK_QUERIES[method]
+        task_id = job.arguments[0]
+        rows, index = self._find(key, task_id)
+        if index is None:
+            return
+
+        row = rows[index]
+        row["job"] = {**(row.get("job") or {}), **job.fields}
+        row["job_percent"] = job.percent
+        row["job_description"] = job.description
+        if isinstance(row.get("state"), dict):
+            row["state"] = {**row["state"], "state": job.state}
+        else:
+            row["state"] = job.state
+        self.coordinator.event_queue.async_schedule()
+
+        if job.done:
+            self.coordinator.config_entry.async_create_background_task(
+                self.coordinator.hass,
+                self._async_refetch(method, key, task_id),
+                f"truenas refetch {key} {task_id}",
+            )
+
+    async def _async_refetch(self, method: str, key: str, task_id: Any) -> None:
+        """Query a single task again once its job is finished."""
+        try:
+            await self.coordinator.async_refresh_item(method, key, "id", task_id)
+        except TruenasException as error:
+            _LOGGER.debug("Refetch of %s %s failed: %s", key, task_id, error)
+            return
+        self.refetches += 1
@@ -20,10 +20,12 @@ from packaging import version
 from truenaspy import TruenasException
 
 from . import TruenasConfigEntry
+from .apps import app_update_call
 from .const import CONF_CHECK_DEV_VERSION
 from .coordinator import TruenasDataUpdateCoordinator
 from .entity import TruenasEntity, TruenasEntityDescription
 from .helpers import finditem
+from .jobs import Job
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -80,13 +82,22 @@ class UpdateSensor(TruenasEntity, UpdateEntity):
     ) -> None:
         """Install an update."""
         try:
-            await self.coordinator.websocket.async_call(
+            await self.coordinator.async_call(
                 method="update.run", params=[{"reboot": True}]
             )
         except TruenasException as error:
             _LOGGER.error(error)
-        else:
-            await self.coordinator.async_refresh()
+            return
+        # Only the update status changed
+        method = (
+            "update.status"
+            if version.parse(self.installed_version) >= version.parse("25.10.0")
+            else "update.get_pending"
+        )
+        try:
+            await self.coordinator.async_refresh_item(method, "update_infos")
+        except TruenasException as error:
+            _LOGGER.error(error)
 
     @property
     def in_progress(self) -> int | bool:
@@ -112,7 +123,6 @@ class UpdateAppSensor(TruenasEntity, UpdateEntity):
         UpdateEntityFeature.INSTALL | UpdateEntityFeature.PROGRESS
     )
 
-    _JOB_DONE_STATES = frozenset({"SUCCESS", "FAILED", "ABORTED"})
     _DEPLOY_DONE_STATES = frozenset({"RUNNING", "STOPPED", "CRASHED"})
     _JOB_TIMEOUT = 3600
     _DEPLOY_TIMEOUT = 600
@@ -137,7 +147,8 @@ class UpdateAppSensor(TruenasEntity, UpdateEntity):
         transition (STOPPING/STOPPED/DEPLOYING/RUNNING, version bumps,
         ``upgrade_available`` flips) in real time. Reading from it lets the
         entity reflect those changes instantly instead of waiting for the
-        next full poll.
+        next full poll. When ``app.query`` is a live collection, the ``apps``
+        list is itself kept current from the stream and is used directly.
         """
         live = finditem(self.coordinator.data, "events.app_query")
         if isinstance(live, list):
@@ -179,46 +190,34 @@ class UpdateAppSensor(TruenasEntity, UpdateEntity):
 
     @property
     def in_progress(self) -> int | bool:
-        """Update installation progress."""
-        return self._install_progress
+        """Update installation progress, from this entity or an update of all."""
+        if self._install_progress is not False:
+            return self._install_progress
+        percent = self.coordinator.app_updates.percents.get(self.uid)
+        if percent is None or percent == 100:
+            return False
+        return percent or True
 
     async def async_install(
         self, version: str | None, backup: bool, **kwargs: Any
     ) -> None:
         """Install an update."""
-        id_app = self.device_data.get("id")
-        if self.device_data.get("upgrade_available"):
-            method, params = "app.upgrade", [id_app]
-        elif self.device_data.get("image_updates_available"):
-            method, params = "app.pull_images", [id_app, {"redeploy": True}]
-        else:
+        if (call := app_update_call(self.device_data)) is None:
             return
+        method, params = call
 
         # The job's `progress.percent` is the only source for the install
         # percentage (`app.query` does not carry it), so it is tracked through
-        # the underlying job via the `core.get_jobs` events.
+        # the coordinator job tracker fed by the `core.get_jobs` events.
         self._install_progress = True
         self.async_write_ha_state()
 
-        job_id: int | None = None
-        job_done = asyncio.Event()
-        websocket = self.coordinator.websocket
-
-        async def _on_job(event: dict[str, Any]) -> None:
-            fields = event.get("fields", {})
-            if job_id is None or fields.get("id") != job_id:
-                return
-            percent = finditem(fields, "progress.percent")
-            if isinstance(percent, (int, float)) and 0 < percent < 100:
-                self._install_progress = int(percent)
-                self.async_write_ha_state()
-            if fields.get("state") in self._JOB_DONE_STATES:
-                job_done.set()
-
-        await websocket.async_subscribe("core.get_jobs", _on_job)
+        remove_listener: Callable[[], None] | None = None
         try:
-            job_id = await websocket.async_call(method=method, params=params)
-            await asyncio.wait_for(job_done.wait(), timeout=self._JOB_TIMEOUT)
+            job_id = await self.coordinator.async_call(method=method, params=params)
+            job = self.coordinator.jobs.track(job_id)
+            remove_listener = job.async_add_listener(self._async_job_progress)
+            await job.async_wait(self._JOB_TIMEOUT)
             # The job is done but the app then redeploys (STOPPING -> STOPPED
             # -> DEPLOYING -> RUNNING). Keep progress on until the live
             # `app.query` state pushed by the coordinator settles back to a
@@ -228,13 +227,26 @@ class UpdateAppSensor(TruenasEntity, UpdateEntity):
                 await asyncio.wait_for(
                     self._deploy_done.wait(), timeout=self._DEPLOY_TIMEOUT
                 )
-        except (TruenasException, asyncio.TimeoutError) as error:
+        except (TruenasException, TimeoutError) as error:
             _LOGGER.error(error)
         finally:
-            await websocket.async_unsubscribe("core.get_jobs")
+            if remove_listener is not None:
+                remove_listener()
             self._install_progress = False
             self._deploy_done = None
-            await self.coordinator.async_refresh()
+            try:
+                await self.coordinator.async_refresh_item(
+                    "app.query", "apps", "id", self.uid
+                )
+            except TruenasException as error:
+                _LOGGER.error(error)
+
+    @callback
+    def _async_job_progress(self, job: Job) -> None:
+        """Report the progress of the install job."""
+        if (percent := job.percent) is not None and 0 < percent < 100:
+            self._install_progress = percent
+            self.async_write_ha_state()
 
 
 @dataclass(frozen=True, kw_only=True)
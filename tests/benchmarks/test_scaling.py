@@ -0,0 +1,157 @@
+"""Scaling benchmarks of the TrueNAS integration.
+
+The benchmarks are skipped unless ``TRUENAS_BENCHMARK`` is set. Results are
+written as JSON to ``TRUENAS_BENCHMARK_JSON`` (default ``bench_output.json``)::
+
+    TRUENAS_BENCHMARK=1 pytest tests/benchmarks --no-cov -p no:logging
+"""
+
+import json
+import os
+import time
+import tracemalloc
+from collections.abc import Callable
+from contextlib import ExitStack
+from pathlib import Path
+from statistics import median
+from typing import Any
+from unittest.mock import patch
+
+import pytest
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers import entity_registry as er
+
+from custom_components.truenas import binary_sensor, button, sensor, switch, update
+
+from ..synthetic import configure_websocket_mock, generate_for_entities
+
+pytestmark = pytest.mark.skipif(
+    not os.environ.get("TRUENAS_BENCHMARK"), reason="TRUENAS_BENCHMARK is not set"
+)
+
+SIZES = (10, 1_000, 10_000)
+ROUNDS = 5
+PLATFORM_MODULES = {
+    "binary_sensor": binary_sensor,
+    "button": button,
+    "sensor": sensor,
+    "switch": switch,
+    "update": update,
+}
+
+RESULTS: dict[str, dict[str, Any]] = {}
+
+
+@pytest.fixture(autouse=True, scope="module")
+def write_results():
+    """Write the collected results once the module has run."""
+    yield
+    if RESULTS:
+        path = Path(os.environ.get("TRUENAS_BENCHMARK_JSON", "bench_output.json"))
+        path.write_text(json.dumps(RESULTS, indent=2, sort_keys=True))
+
+
+def _timed(func: Callable, timings: dict[str, float], name: str) -> Callable:
+    """Wrap a platform setup to record its duration."""
+
+    async def _wrapper(*args: Any, **kwargs: Any) -> Any:
+        start = time.perf_counter()
+        try:
+            return await func(*args, **kwargs)
+        finally:
+            timings[name] = round(time.perf_counter() - start, 4)
+
+    return _wrapper
+
+
+async def _async_setup(
+    hass: HomeAssistant,
+    config_entry: ConfigEntry,
+    data: dict[str, Any],
+    stack: ExitStack,
+) -> dict[str, float]:
+    """Set up the entry against a synthetic payload, return platform timings."""
+    timings: dict[str, float] = {}
+    mock_cls = stack.enter_context(
+        patch("custom_components.truenas.coordinator.TruenasClient")
+    )
+    configure_websocket_mock(mock_cls.return_value, data)
+    for name, module in PLATFORM_MODULES.items():
+        stack.enter_context(
+            patch.object(
+                module,
+                "async_setup_entry",
+                _timed(module.async_setup_entry, timings, name),
+            )
+        )
+    await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
+    return timings
+
+
+@pytest.mark.parametrize("size", SIZES)
+async def test_scaling_timings(
+    hass: HomeAssistant, config_entry: ConfigEntry, size: int
+) -> None:
+    """Measure setup, refresh and fan-out times."""
+    data = generate_for_entities(size)
+
+    with ExitStack() as stack:
+        start = time.perf_counter()
+        platforms = await _async_setup(hass, config_entry, data, stack)
+        setup = time.perf_counter() - start
+        coordinator = config_entry.runtime_data
+
+        fetch, refresh, fanout = [], [], []
+        for _ in range(ROUNDS):
+            start = time.perf_counter()
+            await coordinator._async_update_data()
+            fetch.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            await coordinator.async_refresh()
+            await hass.async_block_till_done()
+            refresh.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            coordinator.async_set_updated_data(coordinator.data)
+            await hass.async_block_till_done()
+            fanout.append(time.perf_counter() - start)
+
+    entities = len(
+        er.async_entries_for_config_entry(er.async_get(hass), config_entry.entry_id)
+    )
+    RESULTS.setdefault(str(size), {}).update(
+        {
+            "entities": entities,
+            "setup": round(setup, 4),
+            "platform_setup": platforms,
+            "fetch": round(median(fetch), 4),
+            "refresh": round(median(refresh), 4),
+            "fanout": round(median(fanout), 4),
+            "fanout_per_entity_us": round(median(fanout) / entities * 1e6, 2),
+        }
+    )
+    assert entities >= size
+
+
+@pytest.mark.parametrize("size", SIZES)
+async def test_scaling_memory(
+    hass: HomeAssistant, config_entry: ConfigEntry, size: int
+) -> None:
+    """Measure the memory allocated by the setup and held by the data."""
+    data = generate_for_entities(size)
+
+    with ExitStack() as stack:
+        tracemalloc.start()
+        try:
+            await _async_setup(hass, config_entry, data, stack)
+            current, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+    RESULTS.setdefault(str(size), {}).update(
+        {"memory_current": current, "memory_peak": peak}
+    )
+    assert current > 0
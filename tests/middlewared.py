@@ -0,0 +1,409 @@
+"""Local stand-in for the TrueNAS middlewared websocket.
+
+The server speaks the JSON-RPC 2.0 protocol used by ``truenaspy``: login,
+method calls and collection subscriptions. Responses are served from
+fixture-shaped data (``fixtures/truenas.json`` or a synthetic payload), with
+configurable per-method latency, error injection and event rates so the
+coordinator, the event pipeline and the entities can be exercised end to end
+without a NAS::
+
+    python -m tests.middlewared --port 8080 --entities 1000 --latency 0.05
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import contextlib
+import itertools
+import json
+import logging
+import random
+import re
+from collections import Counter
+from collections.abc import Callable
+from typing import Any
+
+from aiohttp import WSMsgType, web
+
+from .synthetic import (
+    EVENTS_DATA,
+    FIXTURE_DATA,
+    async_call_result,
+    generate_for_entities,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+ENDPOINT = "/api/current"
+JSONRPC = "2.0"
+
+
+def _ordered(operator: Callable[[Any, Any], bool]) -> Callable[[Any, Any], bool]:
+    """Return a comparison failing on a missing value, like middlewared."""
+    return lambda value, operand: value is not None and operator(value, operand)
+
+
+FILTER_OPERATORS: dict[str, Callable[[Any, Any], bool]] = {
+    "=": lambda value, operand: value == operand,
+    "!=": lambda value, operand: value != operand,
+    "<": _ordered(lambda value, operand: value < operand),
+    "<=": _ordered(lambda value, operand: value <= operand),
+    ">": _ordered(lambda value, operand: value > operand),
+    ">=": _ordered(lambda value, operand: value >= operand),
+    "in": lambda value, operand: value in operand,
+    "nin": lambda value, operand: value not in operand,
+    "~": _ordered(lambda value, operand: re.match(operand, value) is not None),
+    "^": _ordered(lambda value, operand: value.startswith(operand)),
+    "$": _ordered(lambda value, operand: value.endswith(operand)),
+}
+
+
+def _value(row: dict[str, Any], field: str) -> Any:
+    """Return the value of a dotted field of a row, dates as milliseconds."""
+    value: Any = row
+    for part in field.split("."):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(part)
+    return _plain(value)
+
+
+def _plain(value: Any) -> Any:
+    """Return a JSON date (``{"$date": ms}``) as its milliseconds."""
+    if isinstance(value, dict) and "$date" in value:
+        return value["$date"]
+    return value
+
+
+def _match_filter(row: dict[str, Any], query_filter: list[Any]) -> bool:
+    """Return True if a row matches a filter, or an OR of filters."""
+    if query_filter[0] == "OR":
+        # A branch is a filter or a list of filters all matching
+        return any(
+            _match_filters(row, branch if isinstance(branch[0], list) else [branch])
+            for branch in query_filter[1]
+        )
+    field, operator, operand = query_filter
+    return FILTER_OPERATORS[operator](_value(row, field), _plain(operand))
+
+
+def _match_filters(row: dict[str, Any], filters: list[list[Any]]) -> bool:
+    """Return True if a row matches query-filters, like middlewared."""
+    return all(_match_filter(row, query_filter) for query_filter in filters)
+
+
+def _query(rows: list[Any], filters: list[list[Any]], options: dict[str, Any]) -> Any:
+    """Apply query-filters and query-options to the rows of a collection."""
+    rows = [row for row in rows if _match_filters(row, filters)]
+    for field in reversed(options.get("order_by") or []):
+        name = field.removeprefix("-")
+        # Missing values sort last
+        present = [row for row in rows if _value(row, name) is not None]
+        present.sort(
+            key=lambda row, name=name: _value(row, name),
+            reverse=field.startswith("-"),
+        )
+        rows = present + [row for row in rows if _value(row, name) is None]
+    offset = options.get("offset") or 0
+    rows = rows[offset:]
+    if limit := options.get("limit"):
+        rows = rows[:limit]
+    if options.get("count"):
+        return len(rows)
+    if options.get("get"):
+        if not rows:
+            raise RpcError(22, "Object not found")
+        return rows[0]
+    return rows
+
+
+class MiddlewaredStandIn:
+    """Serve a fake middlewared websocket."""
+
+    def __init__(
+        self,
+        data: dict[str, Any] | None = None,
+        events: dict[str, list[dict[str, Any]]] | None = None,
+        *,
+        entities: int | None = None,
+        latency: float | dict[str, float] = 0.0,
+        errors: dict[str, float] | None = None,
+        event_rates: dict[str, float] | None = None,
+        username: str = "admin",
+        password: str = "secret",
+        api_key: str = "1-apikey",
+        seed: int = 0,
+    ) -> None:
+        """Initialize the stand-in.
+
+        latency is a delay in seconds for every method, or a per-method mapping
+        (the ``*`` key is the default). errors maps methods to the probability
+        of an injected error. event_rates maps collections to the number of
+        events per second pushed to subscribers.
+        """
+        if data is None:
+            data = FIXTURE_DATA if entities is None else generate_for_entities(entities)
+        self.data = data
+        self.events = EVENTS_DATA["events"] if events is None else events
+        self.latency = latency
+        self.errors = errors or {}
+        self.event_rates = event_rates or {}
+        self.username = username
+        self.password = password
+        self.api_key = api_key
+        # Session tokens generated since the start, lost on a restart
+        self.tokens: set[str] = set()
+        self.logins: Counter[str] = Counter()
+        self._token_ids = itertools.count()
+        self.handlers: dict[str, Callable[[list[Any]], Any]] = {}
+        self.calls: Counter[str] = Counter()
+        self.sent_events: Counter[str] = Counter()
+        self.clients: set[web.WebSocketResponse] = set()
+        self._subscriptions: dict[web.WebSocketResponse, set[str]] = {}
+        self._emitters: dict[str, asyncio.Task[None]] = {}
+        self._tasks: set[asyncio.Task[Any]] = set()
+        self._random = random.Random(seed)
+        self._runner: web.AppRunner | None = None
+        self.port: int | None = None
+        self.path: str | None = None
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> int:
+        """Start listening and return the TCP port."""
+        await self._async_start(lambda runner: web.TCPSite(runner, host, port))
+        self.port = self._runner.addresses[0][1]
+        return self.port
+
+    async def start_unix(self, path: str) -> str:
+        """Start listening on a unix socket, like middlewared on the NAS."""
+        await self._async_start(lambda runner: web.UnixSite(runner, path))
+        self.path = path
+        return path
+
+    async def _async_start(
+        self, site_factory: Callable[[web.AppRunner], web.BaseSite]
+    ) -> None:
+        """Start the application on the site of the factory."""
+        app = web.Application()
+        app.router.add_get(ENDPOINT, self._handle_websocket)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        await site_factory(self._runner).start()
+
+    async def stop(self) -> None:
+        """Close the clients and stop the server."""
+        for task in [*self._emitters.values(), *self._tasks]:
+            task.cancel()
+        for task in [*self._emitters.values(), *self._tasks]:
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+        self._emitters.clear()
+        for client in list(self.clients):
+            await client.close()
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def push(self, collection: str, event: dict[str, Any]) -> None:
+        """Send an event to the clients subscribed to a collection."""
+        message = json.dumps(
+            {
+                "jsonrpc": JSONRPC,
+                "method": "collection_update",
+                "params": {"collection": collection, **event},
+            }
+        )
+        for client, collections in list(self._subscriptions.items()):
+            if collection in collections and not client.closed:
+                await client.send_str(message)
+                self.sent_events[collection] += 1
+
+    def subscribed(self) -> set[str]:
+        """Return the collections the connected clients are subscribed to."""
+        return {
+            collection
+            for client, collections in self._subscriptions.items()
+            if not client.closed
+            for collection in collections
+        }
+
+    def _latency(self, method: str) -> float:
+        """Return the latency of a method."""
+        if isinstance(self.latency, dict):
+            return self.latency.get(method, self.latency.get("*", 0.0))
+        return self.latency
+
+    async def _handle_websocket(self, request: web.Request) -> web.WebSocketResponse:
+        """Handle a client connection."""
+        client = web.WebSocketResponse()
+        await client.prepare(request)
+        self.clients.add(client)
+        self._subscriptions[client] = set()
+        state = {"logged": False}
+        try:
+            async for msg in client:
+                if msg.type != WSMsgType.TEXT:
+                    continue
+                task = asyncio.create_task(
+                    self._handle_message(client, state, json.loads(msg.data))
+                )
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+        finally:
+            self.clients.discard(client)
+            self._subscriptions.pop(client, None)
+        return client
+
+    async def _handle_message(
+        self, client: web.WebSocketResponse, state: dict[str, Any], message: dict
+    ) -> None:
+        """Answer a JSON-RPC request."""
+        method = message.get("method", "")
+        params = message.get("params") or []
+        self.calls[method] += 1
+
+        if delay := self._latency(method):
+            await asyncio.sleep(delay)
+
+        response: dict[str, Any] = {"jsonrpc": JSONRPC, "id": message.get("id")}
+        try:
+            response["result"] = self._dispatch(client, state, method, params)
+        except RpcError as error:
+            response["error"] = {"code": error.code, "message": str(error)}
+        if not client.closed:
+            await client.send_str(json.dumps(response))
+
+    def _check_login(self, credentials: dict[str, Any]) -> bool:
+        """Return whether login_ex credentials are valid."""
+        mechanism = credentials.get("mechanism")
+        if mechanism == "TOKEN_PLAIN":
+            return credentials.get("token") in self.tokens
+        if credentials.get("username") != self.username:
+            return False
+        if mechanism == "API_KEY_PLAIN":
+            return credentials.get("api_key") == self.api_key
+        if mechanism == "PASSWORD_PLAIN":
+            return credentials.get("password") == self.password
+        return False
+
+    def _dispatch(
+        self,
+        client: web.WebSocketResponse,
+        state: dict[str, Any],
+        method: str,
+        params: list[Any],
+    ) -> Any:
+        """Return the result of a method."""
+        if method == "auth.login_ex":
+            credentials = params[0] if params else {}
+            state["logged"] = self._check_login(credentials)
+            if state["logged"]:
+                self.logins[credentials.get("mechanism")] += 1
+            return {"response_type": "SUCCESS" if state["logged"] else "AUTH_ERR"}
+        if not state["logged"]:
+            raise RpcError(13, "Not authenticated")
+        if self._random.random() < self.errors.get(method, 0.0):
+            raise RpcError(14, f"Injected error on {method}")
+        if method == "auth.generate_token":
+            token = f"token-{next(self._token_ids)}"
+            self.tokens.add(token)
+            return token
+        if method == "core.ping":
+            return "pong"
+        if method == "core.subscribe":
+            self._subscribe(client, params[0])
+            return params[0]
+        if method == "core.unsubscribe":
+            if params[0] == "*":
+                self._subscriptions[client].clear()
+            else:
+                self._subscriptions[client].discard(params[0])
+            return None
+        if method in self.handlers:
+            return self.handlers[method](params)
+        result = async_call_result(self.data, method)
+        if method.endswith(".query") and params and isinstance(result, list):
+            options = params[1] if len(params) > 1 else {}
+            return _query(result, params[0] or [], options or {})
+        return result
+
+    def _subscribe(self, client: web.WebSocketResponse, collection: str) -> None:
+        """Subscribe a client and start the event emitter of the collection."""
+        self._subscriptions[client].add(collection)
+        if (rate := self.event_rates.get(collection)) and collection not in (
+            self._emitters
+        ):
+            self._emitters[collection] = asyncio.create_task(
+                self._async_emit(collection, rate)
+            )
+
+    async def _async_emit(self, collection: str, rate: float) -> None:
+        """Push the template events of a collection at the given rate."""
+        templates = self.events.get(collection) or [{"msg": "CHANGED", "fields": {}}]
+        for template in itertools.cycle(templates):
+            await asyncio.sleep(1 / rate)
+            event = {k: v for k, v in template.items() if k != "collection"}
+            await self.push(collection, event)
+
+
+class RpcError(Exception):
+    """Error returned to the client."""
+
+    def __init__(self, code: int, message: str) -> None:
+        """Initialize."""
+        super().__init__(message)
+        self.code = code
+
+
+def main() -> None:
+    """Run the stand-in until interrupted."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--socket", help="listen on a unix socket instead")
+    parser.add_argument("--entities", type=int, help="serve a synthetic payload")
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument(
+        "--event-rate",
+        action="append",
+        default=[],
+        metavar="COLLECTION=RATE",
+        help="events per second pushed on a collection",
+    )
+    parser.add_argument(
+        "--error-rate",
+        action="append",
+        default=[],
+        metavar="METHOD=PROBABILITY",
+        help="probability of an injected error on a method",
+    )
+    args = parser.parse_args()
+
+    def _pairs(values: list[str]) -> dict[str, float]:
+        return {k: float(v) for k, v in (value.split("=", 1) for value in values)}
+
+    async def _run() -> None:
+        server = MiddlewaredStandIn(
+            entities=args.entities,
+            latency=args.latency,
+            errors=_pairs(args.error_rate),
+            event_rates=_pairs(args.event_rate),
+        )
+        if args.socket:
+            await server.start_unix(args.socket)
+            _LOGGER.warning("Middlewared stand-in listening on %s", args.socket)
+        else:
+            port = await server.start(args.host, args.port)
+            _LOGGER.warning("Middlewared stand-in listening on %s:%s", args.host, port)
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await server.stop()
+
+    logging.basicConfig(level=logging.INFO)
+    with contextlib.suppress(KeyboardInterrupt):
+        asyncio.run(_run())
+
+
+if __name__ == "__main__":
+    main()
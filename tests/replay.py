@@ -0,0 +1,125 @@
+"""Replay of a websocket traffic capture.
+
+A capture written by the ``truenas.capture`` service is loaded and fed back
+into a mocked ``TruenasWebsocket``: calls are answered with the recorded
+responses (in order, per method and parameters) and events are dispatched to
+the subscribed callbacks following the recorded timeline, at real speed or
+accelerated::
+
+    replay = TrafficReplay.load("truenas_capture_20250101_120000.jsonl.gz")
+    replay.configure_websocket_mock(mock_websocket)
+    await replay.async_play(speed=10)
+"""
+
+from __future__ import annotations
+
+import asyncio
+import gzip
+import json
+from collections import defaultdict, deque
+from collections.abc import Awaitable, Callable
+from pathlib import Path
+from typing import Any
+from unittest.mock import AsyncMock, MagicMock
+
+from truenaspy import TruenasException
+
+
+def _call_key(method: str, params: Any) -> str:
+    """Return the lookup key of a call."""
+    return f"{method} {json.dumps(params, sort_keys=True)}"
+
+
+class TrafficReplay:
+    """Replay recorded calls and events."""
+
+    def __init__(self, header: dict[str, Any], records: list[dict[str, Any]]) -> None:
+        """Initialize."""
+        self.header = header
+        self.records = records
+        self.events = [record for record in records if record["type"] == "event"]
+        self.callbacks: dict[str, list[Callable[[dict], Awaitable[None]]]] = (
+            defaultdict(list)
+        )
+        self.missed: list[str] = []
+        self._responses: dict[str, deque[dict[str, Any]]] = defaultdict(deque)
+        self._last: dict[str, dict[str, Any]] = {}
+        self._fallback: dict[str, dict[str, Any]] = {}
+        for record in records:
+            if record["type"] == "call":
+                key = _call_key(record["method"], record["params"])
+                self._responses[key].append(record)
+                self._fallback.setdefault(record["method"], record)
+
+    @classmethod
+    def load(cls, path: str | Path) -> TrafficReplay:
+        """Load a capture file."""
+        with gzip.open(path, "rt", encoding="utf-8") as file:
+            header = json.loads(file.readline())
+            records = [json.loads(line) for line in file if line.strip()]
+        return cls(header, records)
+
+    def response(self, method: str, params: Any = None) -> Any:
+        """Return the next recorded response of a call.
+
+        Responses are matched on method and parameters and served in the
+        recorded order, the last one being repeated once exhausted. Calls
+        with unrecorded parameters get the first response of the method.
+        """
+        key = _call_key(method, params)
+        if queue := self._responses.get(key):
+            record = self._last[key] = queue.popleft()
+        elif (record := self._last.get(key) or self._fallback.get(method)) is None:
+            self.missed.append(method)
+            return []
+        if "error" in record:
+            raise TruenasException(record["error"])
+        return record["result"]
+
+    def configure_websocket_mock(self, instance: MagicMock) -> MagicMock:
+        """Make a mocked TruenasWebsocket serve the capture."""
+        instance.is_connected = False
+        instance.is_logged = False
+        instance.async_close = AsyncMock()
+
+        async def _mock_async_call(**kwargs: Any) -> Any:
+            return self.response(kwargs.get("method", ""), kwargs.get("params"))
+
+        async def _mock_async_subscribe(
+            collection: str, callback: Callable[[dict], Awaitable[None]]
+        ) -> None:
+            self.callbacks[collection].append(callback)
+
+        async def _mock_async_unsubscribe(collection: str) -> None:
+            self.callbacks.pop(collection, None)
+
+        async def _mock_async_connect(*args: Any, **kwargs: Any) -> None:
+            instance.is_connected = True
+            instance.is_logged = True
+
+        instance.async_call = AsyncMock(side_effect=_mock_async_call)
+        instance.async_subscribe = AsyncMock(side_effect=_mock_async_subscribe)
+        instance.async_unsubscribe = AsyncMock(side_effect=_mock_async_unsubscribe)
+        instance.async_connect = AsyncMock(side_effect=_mock_async_connect)
+        return instance
+
+    async def async_play(self, speed: float = 1.0) -> int:
+        """Dispatch the recorded events and return the number dispatched.
+
+        speed scales the recorded timeline: 1 replays in real time, 10 ten
+        times faster and 0 without any delay.
+        """
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        origin = self.events[0]["t"] if self.events else 0.0
+        dispatched = 0
+        for record in self.events:
+            if speed > 0:
+                delay = (record["t"] - origin) / speed - (loop.time() - start)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            event = record["event"]
+            for callback in self.callbacks.get(event.get("collection", ""), []):
+                await callback(event)
+                dispatched += 1
+        return dispatched
@@ -0,0 +1,294 @@
+"""Synthetic TrueNAS payloads of parameterised size.
+
+The generator clones the rows of ``fixtures/truenas.json`` and renames them so
+that any number of pools, datasets, snapshots, apps, disks, VMs, services,
+interfaces and data protection tasks can be produced. It is used by the
+benchmark suite and can write a fixture file from the command line::
+
+    python -m tests.synthetic --entities 1000 > /tmp/truenas_1k.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import sys
+from copy import deepcopy
+from pathlib import Path
+from typing import Any
+from unittest.mock import AsyncMock, MagicMock
+
+FIXTURES = Path(__file__).parent / "fixtures"
+FIXTURE_DATA: dict = json.loads((FIXTURES / "truenas.json").read_text())
+EVENTS_DATA: dict = json.loads((FIXTURES / "events.json").read_text())
+
+# TrueNAS API method -> key of the fixture data returned by the method
+METHOD_KEYS = {
+    "system.info": "system_infos",
+    "interface.query": "interfaces",
+    "zfs.snapshot.query": "snapshots",
+    "disk.details": "disks",
+    "update.check_available": "update_available",
+    "update.available_versions": "update_available",
+    "update.get_pending": "update_infos",
+    "update.status": "update_infos",
+    "virt.instance.query": "virtualmachines",
+    "vm.query": "virtualmachines",
+    "app.query": "apps",
+    "pool.dataset.details": "datasets",
+    "pool.query": "pools",
+    "service.query": "services",
+    "replication.query": "replications",
+    "cloudsync.query": "cloudsync",
+    "pool.snapshottask.query": "snapshottasks",
+    "rsynctask.query": "rsynctasks",
+}
+
+# Entities created per row of a collection by the platforms
+ENTITIES_PER_ROW = {
+    "pools": 2,
+    "datasets": 1,
+    "apps": 2,
+    "disks": 2,
+    "virtualmachines": 1,
+    "services": 1,
+    "interfaces": 3,
+    "tasks": 4,
+}
+
+_TASK_TEMPLATE = {
+    "enabled": True,
+    "direction": "PUSH",
+    "transfer_mode": "COPY",
+    "recursive": False,
+    "job": None,
+    "state": {"state": "FINISHED", "datetime": {"$date": 1778972403000}},
+}
+
+
+def async_call_result(data: dict[str, Any], method: str) -> Any:
+    """Return the payload of an API method from fixture-shaped data."""
+    if method == "disk.temperatures":
+        return {
+            disk["name"]: disk["temperature"]
+            for disk in data.get("disks_temperatures", [])
+        }
+    if (key := METHOD_KEYS.get(method)) is not None:
+        return deepcopy(data[key])
+    return []
+
+
+def configure_websocket_mock(
+    instance: MagicMock, data: dict[str, Any], events: dict[str, Any] | None = None
+) -> MagicMock:
+    """Make a mocked TruenasWebsocket serve the given payload and events."""
+    events = EVENTS_DATA["events"] if events is None else events
+    instance.is_connected = False
+    instance.is_logged = False
+    instance.async_close = AsyncMock()
+
+    async def _mock_async_call(**kwargs: Any) -> Any:
+        return async_call_result(data, kwargs.get("method", ""))
+
+    instance.async_call = AsyncMock(side_effect=_mock_async_call)
+
+    async def _mock_async_subscribe(collection: str, callback: Any) -> None:
+        if collection == "app.query":
+            for event in events.get(collection, []):
+                await callback(event)
+        elif events.get(collection):
+            await callback(events[collection][0])
+
+    instance.async_subscribe = AsyncMock(side_effect=_mock_async_subscribe)
+    instance.async_unsubscribe = AsyncMock()
+
+    async def _mock_async_connect(*args: Any, **kwargs: Any) -> None:
+        instance.is_connected = True
+        instance.is_logged = True
+
+    instance.async_connect = AsyncMock(side_effect=_mock_async_connect)
+    return instance
+
+
+def _rename(row: dict[str, Any], **values: Any) -> dict[str, Any]:
+    """Return a copy of a template row with some fields replaced."""
+    row = deepcopy(row)
+    row.update(values)
+    return row
+
+
+def generate_truenas_data(
+    *,
+    pools: int = 1,
+    datasets: int = 10,
+    snapshots: int = 10,
+    apps: int = 5,
+    disks: int = 4,
+    vms: int = 2,
+    services: int = 8,
+    interfaces: int = 2,
+    tasks: int = 0,
+    seed: int = 0,
+) -> dict[str, Any]:
+    """Generate a payload shaped like ``fixtures/truenas.json``."""
+    rnd = random.Random(seed)
+    base = FIXTURE_DATA
+    data: dict[str, Any] = {
+        key: deepcopy(base[key])
+        for key in ("system_infos", "update_available", "update_infos")
+    }
+
+    pool_names = [f"pool{i}" for i in range(pools)]
+    data["pools"] = [
+        _rename(
+            base["pools"][i % len(base["pools"])],
+            id=i + 1,
+            name=name,
+            path=f"/mnt/{name}",
+            free=rnd.randint(1, 1 << 40),
+        )
+        for i, name in enumerate(pool_names)
+    ]
+
+    template = base["datasets"]
+    data["datasets"] = []
+    for i in range(datasets):
+        pool = pool_names[i % pools] if pools else "pool0"
+        name = f"{pool}/ds{i}"
+        data["datasets"].append(
+            _rename(template[i % len(template)], id=name, name=name, pool=pool)
+        )
+
+    data["snapshots"] = [
+        {
+            "dataset": data["datasets"][i % datasets]["id"] if datasets else "pool0",
+            "snapshot_name": f"@auto-{i}",
+            "pool": pool_names[i % pools] if pools else "pool0",
+        }
+        for i in range(snapshots)
+    ]
+
+    template = base["apps"]
+    data["apps"] = [
+        _rename(template[i % len(template)], id=f"app{i}", name=f"app{i}")
+        for i in range(apps)
+    ]
+
+    template = base["disks"]["used"]
+    used = [
+        _rename(
+            template[i % len(template)],
+            name=f"sd{i}",
+            identifier=f"{{serial}}DISK{i}",
+            serial=f"DISK{i}",
+        )
+        for i in range(disks)
+    ]
+    data["disks"] = {"used": used, "unused": []}
+    data["disks_temperatures"] = [
+        {"name": disk["name"], "temperature": float(rnd.randint(25, 55))}
+        for disk in used
+    ]
+
+    template = base["virtualmachines"]
+    data["virtualmachines"] = [
+        _rename(template[i % len(template)], id=i + 1, name=f"vm{i}")
+        for i in range(vms)
+    ]
+
+    template = base["services"]
+    data["services"] = [
+        _rename(template[i % len(template)], id=i + 1, service=f"service{i}")
+        for i in range(services)
+    ]
+
+    template = base["interfaces"]
+    data["interfaces"] = [
+        _rename(template[i % len(template)], id=f"eth{i}", name=f"eth{i}")
+        for i in range(interfaces)
+    ]
+
+    for key, id_field in (
+        ("cloudsync", "id"),
+        ("replications", "id"),
+        ("snapshottasks", "dataset"),
+        ("rsynctasks", "path"),
+    ):
+        data[key] = []
+        for i in range(tasks):
+            row = _rename(_TASK_TEMPLATE, id=i + 1, description=f"{key} {i}")
+            if id_field != "id":
+                row[id_field] = f"/mnt/pool0/{key}{i}"
+            data[key].append(row)
+
+    return data
+
+
+def counts_for_entities(entities: int) -> dict[str, int]:
+    """Return collection sizes producing roughly the requested entity count."""
+    # Share of the entities held by each collection on a typical large host
+    shares = {
+        "datasets": 0.45,
+        "apps": 0.15,
+        "disks": 0.1,
+        "virtualmachines": 0.05,
+        "services": 0.05,
+        "interfaces": 0.05,
+        "tasks": 0.1,
+        "pools": 0.05,
+    }
+    rows = {
+        key: max(1, round(entities * share / ENTITIES_PER_ROW[key]))
+        for key, share in shares.items()
+    }
+    return {
+        "pools": rows["pools"],
+        "datasets": rows["datasets"],
+        "snapshots": rows["datasets"] * 5,
+        "apps": rows["apps"],
+        "disks": rows["disks"],
+        "vms": rows["virtualmachines"],
+        "services": rows["services"],
+        "interfaces": rows["interfaces"],
+        "tasks": rows["tasks"],
+    }
+
+
+def generate_for_entities(entities: int, seed: int = 0) -> dict[str, Any]:
+    """Generate a payload producing roughly the requested entity count."""
+    return generate_truenas_data(**counts_for_entities(entities), seed=seed)
+
+
+def main() -> None:
+    """Write a synthetic payload to stdout."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entities", type=int, help="approximate entity count")
+    for key in (
+        "pools",
+        "datasets",
+        "snapshots",
+        "apps",
+        "disks",
+        "vms",
+        "services",
+        "interfaces",
+        "tasks",
+    ):
+        parser.add_argument(f"--{key}", type=int)
+    parser.add_argument("--seed", type=int, default=0)
+    args = vars(parser.parse_args())
+
+    seed = args.pop("seed")
+    if (entities := args.pop("entities")) is not None:
+        data = generate_for_entities(entities, seed)
+    else:
+        data = generate_truenas_data(
+            **{key: value for key, value in args.items() if value is not None},
+            seed=seed,
+        )
+    json.dump(data, sys.stdout)
+
+
+if __name__ == "__main__":
+    main()
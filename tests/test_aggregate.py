@@ -0,0 +1,169 @@
+"""Tests for the totals aggregated over the TrueNAS hosts."""
+
+from collections.abc import Generator
+from typing import Any
+from unittest.mock import AsyncMock, MagicMock
+
+from homeassistant.config_entries import SOURCE_USER, ConfigEntry, ConfigEntryState
+from homeassistant.const import CONF_NAME
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers import device_registry as dr
+from homeassistant.helpers import entity_registry as er
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.truenas.aggregate import FleetAggregator, async_get_aggregator
+from custom_components.truenas.const import DOMAIN
+
+from .const import MOCK_USER_INPUT
+
+POOLS_FREE_EID = "sensor.truenas_fleet_pools_free"
+DATASETS_EID = "sensor.truenas_fleet_datasets"
+
+
+def _host(entry_id: str, data: dict[str, Any]) -> MagicMock:
+    """Return a coordinator stand-in notifying its listeners on demand."""
+    coordinator = MagicMock()
+    coordinator.config_entry.entry_id = entry_id
+    coordinator.data = data
+    listeners: list = []
+
+    def _add_listener(update_callback):
+        listeners.append(update_callback)
+        return lambda: listeners.remove(update_callback)
+
+    coordinator.async_add_listener.side_effect = _add_listener
+    coordinator.async_update_listeners.side_effect = lambda: [
+        update_callback() for update_callback in list(listeners)
+    ]
+    return coordinator
+
+
+def _data(free: int, datasets: int, outdated: int = 0) -> dict[str, Any]:
+    """Return coordinator data with one pool, datasets and apps."""
+    return {
+        "pools": [{"name": "tank", "free": free, "allocated": 10, "healthy": True}],
+        "datasets": [{"id": f"tank/{index}"} for index in range(datasets)],
+        "apps": [
+            {"id": f"app{index}", "upgrade_available": index < outdated}
+            for index in range(3)
+        ],
+        "events": {"alert_list": [{"uuid": "1"}, {"uuid": "2", "dismissed": True}]},
+    }
+
+
+async def test_totals_follow_the_changed_collections() -> None:
+    """Only the replaced collections are recomputed and the totals move."""
+    aggregator = FleetAggregator()
+    added = []
+    removed = []
+
+    def _adder(entry_id: str):
+        def _add() -> Any:
+            added.append(entry_id)
+            return lambda: removed.append(entry_id)
+
+        return _add
+
+    one = _host("entry_1", _data(100, 2))
+    two = _host("entry_2", _data(50, 3, outdated=2))
+    remove_one = aggregator.async_add(one, _adder("entry_1"))
+    # A single host has no fleet sensors
+    assert added == []
+    aggregator.async_add(two, _adder("entry_2"))
+
+    assert added == ["entry_1"]
+    assert aggregator.totals == {
+        "pool_free": 150,
+        "pool_used": 20,
+        "pools_unhealthy": 0,
+        "datasets": 5,
+        "alerts": 2,
+        "apps_outdated": 2,
+    }
+
+    recomputed = aggregator.recomputed
+    one.data = {**one.data, "pools": [{"free": 10, "allocated": 0, "healthy": False}]}
+    one.async_update_listeners()
+    # The pools and the alerts, changed in place, only
+    assert aggregator.recomputed == recomputed + 2
+    assert aggregator.totals["pool_free"] == 60
+    assert aggregator.totals["pool_used"] == 10
+    assert aggregator.totals["pools_unhealthy"] == 1
+    assert aggregator.totals["datasets"] == 5
+
+    remove_one()
+    # Back to a single host, the fleet sensors are removed
+    assert added == ["entry_1"]
+    assert removed == ["entry_1"]
+    assert aggregator.as_dict()["owner"] is None
+    assert aggregator.totals["pool_free"] == 50
+    assert aggregator.totals["pools_unhealthy"] == 0
+    assert aggregator.totals["datasets"] == 3
+    assert aggregator.totals["apps_outdated"] == 2
+
+
+async def test_fleet_sensors_follow_the_number_of_hosts(
+    hass: HomeAssistant,
+    config_entry: ConfigEntry,
+    truenas_ws: Generator[AsyncMock | MagicMock],
+) -> None:
+    """The fleet sensors sum two hosts or more and move between their entries."""
+    await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
+    assert hass.states.get(DATASETS_EID) is None
+    free = sum(pool["free"] for pool in config_entry.runtime_data.data["pools"])
+    datasets = len(config_entry.runtime_data.data["datasets"])
+
+    entries = [config_entry]
+    for index in range(2):
+        entry = MockConfigEntry(
+            domain=DOMAIN,
+            source=SOURCE_USER,
+            data={**MOCK_USER_INPUT, CONF_NAME: f"truenas_{index}"},
+            unique_id=f"98765432109876{index}",
+            options={"check_dev_version": False},
+        )
+        entry.add_to_hass(hass)
+        await hass.config_entries.async_setup(entry.entry_id)
+        await hass.async_block_till_done()
+        entries.append(entry)
+        hosts = len(entries)
+        assert float(hass.states.get(POOLS_FREE_EID).state) == round(
+            hosts * free / 1024**3, 2
+        )
+        assert hass.states.get(DATASETS_EID).state == str(hosts * datasets)
+        assert hass.states.get(DATASETS_EID).attributes["hosts"] == hosts
+    assert hass.states.get("sensor.truenas_fleet_active_alerts").state == "3"
+    assert hass.states.get("sensor.truenas_fleet_apps_to_update").state == "0"
+
+    aggregator = async_get_aggregator(hass)
+    owner = aggregator.as_dict()["owner"]
+    await hass.config_entries.async_unload(owner)
+    await hass.async_block_till_done()
+    # Handed over to another entry
+    assert hass.states.get(DATASETS_EID).state == str(2 * datasets)
+    assert aggregator.as_dict()["owner"] not in (None, owner)
+
+    await hass.config_entries.async_unload(aggregator.as_dict()["owner"])
+    await hass.async_block_till_done()
+    # Back to a single host, the registry entries are kept for a reload
+    assert hass.states.get(DATASETS_EID) is None
+    assert er.async_get(hass).async_get_entity_id("sensor", DOMAIN, "fleet-datasets")
+    assert aggregator.as_dict()["owner"] is None
+    assert len(aggregator.hosts) == 1
+
+    for entry in entries:
+        if entry.state is ConfigEntryState.LOADED:
+            await hass.config_entries.async_unload(entry.entry_id)
+    await hass.async_block_till_done()
+    assert not aggregator.hosts
+
+    # The registry entries and the device are removed with the entries
+    for entry in entries:
+        await hass.config_entries.async_remove(entry.entry_id)
+    await hass.async_block_till_done()
+    assert (
+        er.async_get(hass).async_get_entity_id("sensor", DOMAIN, "fleet-datasets")
+        is None
+    )
+    assert dr.async_get(hass).async_get_device(identifiers={(DOMAIN, "fleet")}) is None
@@ -64,10 +64,29 @@ async def test_button_press_truenas_exception_is_caught(
     data = {ATTR_ENTITY_ID: "button.truenas_test_system_restart"}
 
     with patch(
-        "custom_components.truenas.coordinator.TruenasWebsocket.async_call",
+        "custom_components.truenas.coordinator.TruenasClient.async_call",
         side_effect=TruenasException("ws error"),
     ):
         await hass.services.async_call(
             BUTTON_DOMAIN, SERVICE_PRESS, service_data=data, blocking=True
         )
         await hass.async_block_till_done()
+
+
+async def test_button_press_refreshes_system_infos_only(
+    hass: HomeAssistant,
+    config_entry: ConfigEntry,
+    truenas_ws: Generator[AsyncMock | MagicMock],
+) -> None:
+    """A press refetches the system infos instead of the whole data set."""
+    await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
+    truenas_ws.async_call.reset_mock()
+
+    data = {ATTR_ENTITY_ID: "button.truenas_test_system_restart"}
+    await hass.services.async_call(
+        BUTTON_DOMAIN, SERVICE_PRESS, service_data=data, blocking=True
+    )
+
+    methods = [c.kwargs.get("method") for c in truenas_ws.async_call.call_args_list]
+    assert methods == ["system.reboot.info", "system.info"]
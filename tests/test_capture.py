@@ -0,0 +1,180 @@
+"""Tests for the websocket traffic capture and its replay."""
+
+import time
+from collections.abc import Generator
+from copy import deepcopy
+from pathlib import Path
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers import entity_registry as er
+from pytest_homeassistant_custom_component.common import async_capture_events
+
+from custom_components.truenas.capture import EVENT_CAPTURE_DONE, TrafficCapture
+from custom_components.truenas.const import DOMAIN
+from custom_components.truenas.service import SERVICE_CAPTURE, SERVICE_CAPTURE_STOP
+
+from .replay import TrafficReplay
+from .synthetic import EVENTS_DATA, FIXTURE_DATA, METHOD_KEYS, async_call_result
+
+CPU_USAGE_EID = "sensor.truenas_test_system_cpu_usage"
+
+
+def _cpu_event(usage: float) -> dict:
+    """Return a reporting.realtime event with the given CPU usage."""
+    event = deepcopy(EVENTS_DATA["events"]["reporting.realtime"][0])
+    event["fields"]["cpu"]["cpu"]["usage"] = usage
+    return event
+
+
+def _write_capture(path: Path, usages: list[float], spacing: float) -> None:
+    """Write a capture of the fixture calls followed by CPU events."""
+    capture = TrafficCapture()
+    for method in ("disk.temperatures", *METHOD_KEYS):
+        capture.record_call(method, None, 0.01, async_call_result(FIXTURE_DATA, method))
+    for index, usage in enumerate(usages):
+        capture.record_event(_cpu_event(usage))
+        capture.records[-1]["t"] = index * spacing
+    capture.write(str(path))
+
+
+async def test_capture_service_writes_redacted_file(
+    hass: HomeAssistant,
+    config_entry: ConfigEntry,
+    truenas_ws: Generator[AsyncMock | MagicMock],
+    tmp_path: Path,
+) -> None:
+    """The capture service records the calls of a refresh with redaction."""
+    hass.config.config_dir = str(tmp_path)
+    await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
+
+    await hass.services.async_call(DOMAIN, SERVICE_CAPTURE, {"duration": 1}, True)
+    await hass.async_block_till_done(wait_background_tasks=True)
+
+    files = list(tmp_path.glob("truenas_capture_*.jsonl.gz"))
+    assert len(files) == 1
+    replay = TrafficReplay.load(files[0])
+    assert replay.header["records"] == len(replay.records)
+    methods = {r["method"] for r in replay.records if r["type"] == "call"}
+    assert {"system.info", "disk.details", "pool.query"} <= methods
+    # app.query is kept current from its subscription, not polled
+    assert "app.query" not in methods
+
+    disks = replay.response("disk.details")
+    assert disks["used"][0]["serial"] == "**REDACTED**"
+    assert config_entry.runtime_data.capture is None
+
+
+async def test_capture_runs_in_background_until_stopped(
+    hass: HomeAssistant,
+    config_entry: ConfigEntry,
+    truenas_ws: Generator[AsyncMock | MagicMock],
+    tmp_path: Path,
+) -> None:
+    """The capture service returns at once and the stop service writes the file."""
+    hass.config.config_dir = str(tmp_path)
+    await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
+    events = async_capture_events(hass, EVENT_CAPTURE_DONE)
+
+    await hass.services.async_call(DOMAIN, SERVICE_CAPTURE, {"duration": 3600}, True)
+    assert config_entry.runtime_data.capture is not None
+    with pytest.raises(HomeAssistantError):
+        await hass.services.async_call(DOMAIN, SERVICE_CAPTURE, {}, True)
+
+    await hass.services.async_call(DOMAIN, SERVICE_CAPTURE_STOP, {}, True)
+    await hass.async_block_till_done(wait_background_tasks=True)
+
+    assert config_entry.runtime_data.capture is None
+    (event,) = events
+    assert event.data["config_entry_id"] == config_entry.entry_id
+    assert Path(event.data["file"]).exists()
+    assert event.data["records"] > 0
+    with pytest.raises(HomeAssistantError):
+        await hass.services.async_call(DOMAIN, SERVICE_CAPTURE_STOP, {}, True)
+
+
+async def test_capture_holds_every_planned_method(
+    hass: HomeAssistant,
+    config_entry: ConfigEntry,
+    truenas_ws: Generator[AsyncMock | MagicMock],
+    tmp_path: Path,
+) -> None:
+    """The capture fetches the collections the planner skips."""
+    hass.config.config_dir = str(tmp_path)
+    await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
+    coordinator = config_entry.runtime_data
+    registry = er.async_get(hass)
+    for entity in er.async_entries_for_config_entry(registry, config_entry.entry_id):
+        registry.async_update_entity(
+            entity.entity_id, disabled_by=er.RegistryEntryDisabler.USER
+        )
+    await hass.async_block_till_done()
+
+    def _methods() -> set[str]:
+        return {c.kwargs["method"] for c in truenas_ws.async_call.call_args_list}
+
+    truenas_ws.async_call.reset_mock()
+    with patch("custom_components.truenas.planner.PLANNER_DISCOVERY_INTERVAL", 0):
+        await coordinator.async_refresh()
+    planned = _methods()
+    truenas_ws.async_call.reset_mock()
+    await coordinator.async_refresh()
+    assert "pool.dataset.details" not in _methods()
+
+    await hass.services.async_call(DOMAIN, SERVICE_CAPTURE, {"duration": 1}, True)
+    await hass.async_block_till_done(wait_background_tasks=True)
+
+    replay = TrafficReplay.load(next(tmp_path.glob("truenas_capture_*.jsonl.gz")))
+    captured = {r["method"] for r in replay.records if r["type"] == "call"}
+    assert "pool.dataset.details" in planned
+    assert planned <= captured
+
+
+async def test_capture_records_events(
+    hass: HomeAssistant,
+    config_entry: ConfigEntry,
+    truenas_ws: Generator[AsyncMock | MagicMock],
+) -> None:
+    """Events received while capturing are recorded."""
+    await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
+
+    coordinator = config_entry.runtime_data
+    coordinator.capture = TrafficCapture()
+    callback = coordinator._make_event_callback(scalar=True, notify=True)
+    await callback(_cpu_event(12.0))
+
+    (record,) = coordinator.capture.records
+    assert record["type"] == "event"
+    assert record["event"]["collection"] == "reporting.realtime"
+
+
+async def test_replay_drives_coordinator(
+    hass: HomeAssistant, config_entry: ConfigEntry, tmp_path: Path
+) -> None:
+    """A replayed capture sets up the entry and its events reach the entities."""
+    path = tmp_path / "capture.jsonl.gz"
+    _write_capture(path, [10.0, 20.0, 30.0], spacing=0.5)
+    replay = TrafficReplay.load(path)
+
+    with patch("custom_components.truenas.coordinator.TruenasClient") as mock_cls:
+        replay.configure_websocket_mock(mock_cls.return_value)
+        await hass.config_entries.async_setup(config_entry.entry_id)
+        await hass.async_block_till_done()
+
+        assert hass.states.get("switch.truenas_test_services_cifs").state == "on"
+
+        start = time.perf_counter()
+        assert await replay.async_play(speed=10) == 3
+        assert time.perf_counter() - start >= 0.1
+        config_entry.runtime_data.event_queue.async_flush()
+        await hass.async_block_till_done()
+
+    assert hass.states.get(CPU_USAGE_EID).state == "30.0"
+    assert not replay.missed
@@ -22,8 +22,10 @@ from truenaspy import ConnectionError as TruenasConnectionError
 from custom_components.truenas.const import (
     CONF_CHECK_DEV_VERSION,
     CONF_NOTIFY,
+    CONF_TRANSPORT,
     DEFAULT_PORT,
     DOMAIN,
+    TRANSPORT_UNIX,
 )
 
 MOCK_CONFIG = {
@@ -53,7 +55,7 @@ async def test_user_success(hass: HomeAssistant, truenas_ws) -> None:
     """Une entrée est créée quand la connection WebSocket réussit."""
     await setup.async_setup_component(hass, "persistent_notification", {})
 
-    with patch("custom_components.truenas.config_flow.TruenasWebsocket") as mock:
+    with patch("custom_components.truenas.config_flow.TruenasClient") as mock:
         result = await hass.config_entries.flow.async_init(
             DOMAIN, context={"source": config_entries.SOURCE_USER}
         )
@@ -81,7 +83,7 @@ async def test_user_success(hass: HomeAssistant, truenas_ws) -> None:
 
 async def test_user_cannot_connect_flag(hass: HomeAssistant, truenas_ws) -> None:
     """L'erreur cannot_connect est affichée si is_connected retourne False."""
-    with patch("custom_components.truenas.config_flow.TruenasWebsocket") as mock:
+    with patch("custom_components.truenas.config_flow.TruenasClient") as mock:
         mock.return_value = truenas_ws
         mock.return_value.async_connect = AsyncMock()
         mock.return_value.is_connected = False
@@ -104,7 +106,7 @@ async def test_user_authentication_failed_exception(
     hass: HomeAssistant, truenas_ws
 ) -> None:
     """L'erreur invalid_auth est affichée sur AuthenticationFailed."""
-    with patch("custom_components.truenas.config_flow.TruenasWebsocket") as mock:
+    with patch("custom_components.truenas.config_flow.TruenasClient") as mock:
         mock.return_value = truenas_ws
         mock.return_value.async_connect.side_effect = AuthenticationFailed(
             "Login failed"
@@ -120,7 +122,7 @@ async def test_user_authentication_failed_exception(
 
 async def test_user_connection_error_exception(hass: HomeAssistant, truenas_ws) -> None:
     """L'erreur cannot_connect est affichée sur ConnectionError."""
-    with patch("custom_components.truenas.config_flow.TruenasWebsocket") as mock:
+    with patch("custom_components.truenas.config_flow.TruenasClient") as mock:
         mock.return_value = truenas_ws
         mock.return_value.async_connect.side_effect = TruenasConnectionError(
             "Connection failed"
@@ -136,7 +138,7 @@ async def test_user_connection_error_exception(hass: HomeAssistant, truenas_ws)
 
 async def test_user_unknown_exception(hass: HomeAssistant, truenas_ws) -> None:
     """L'erreur unknown est affichée sur TruenasException générique."""
-    with patch("custom_components.truenas.config_flow.TruenasWebsocket") as mock:
+    with patch("custom_components.truenas.config_flow.TruenasClient") as mock:
         mock.return_value = truenas_ws
         mock.return_value.async_connect.side_effect = TruenasException("Unknown error")
 
@@ -149,6 +151,75 @@ async def test_user_unknown_exception(hass: HomeAssistant, truenas_ws) -> None:
     assert result["errors"]["base"] == "unknown"
 
 
+async def test_user_missing_credentials(hass: HomeAssistant, truenas_ws) -> None:
+    """L'erreur missing_credentials est affichée sans mot de passe ni clé API."""
+    config = {**MOCK_CONFIG}
+    config.pop(CONF_PASSWORD)
+    with patch("custom_components.truenas.config_flow.TruenasClient") as mock:
+        mock.return_value = truenas_ws
+        result = await hass.config_entries.flow.async_init(
+            DOMAIN, context={"source": config_entries.SOURCE_USER}, data=config
+        )
+        await hass.async_block_till_done()
+
+    assert result["type"] == FlowResultType.FORM
+    assert result["errors"]["base"] == "missing_credentials"
+    mock.assert_not_called()
+
+
+async def test_user_missing_host(hass: HomeAssistant, truenas_ws) -> None:
+    """L'erreur missing_host est affichée sans hôte hors du socket unix."""
+    config = {**MOCK_CONFIG}
+    config.pop(CONF_HOST)
+    with patch("custom_components.truenas.config_flow.TruenasClient") as mock:
+        mock.return_value = truenas_ws
+        result = await hass.config_entries.flow.async_init(
+            DOMAIN, context={"source": config_entries.SOURCE_USER}, data=config
+        )
+        await hass.async_block_till_done()
+
+    assert result["type"] == FlowResultType.FORM
+    assert result["errors"]["base"] == "missing_host"
+    mock.assert_not_called()
+
+
+async def test_user_unix_socket_without_host(hass: HomeAssistant, truenas_ws) -> None:
+    """Une entrée par le socket unix est créée sans hôte."""
+    config = {**MOCK_CONFIG, CONF_TRANSPORT: TRANSPORT_UNIX}
+    for key in (CONF_HOST, CONF_PORT, CONF_SSL, CONF_VERIFY_SSL):
+        config.pop(key)
+    with patch("custom_components.truenas.config_flow.TruenasClient") as mock:
+        mock.return_value = truenas_ws
+        result = await hass.config_entries.flow.async_init(
+            DOMAIN, context={"source": config_entries.SOURCE_USER}, data=config
+        )
+        await hass.async_block_till_done()
+
+    assert result["type"] == FlowResultType.CREATE_ENTRY
+    assert CONF_HOST not in result["data"]
+    assert CONF_PORT not in result["data"]
+    assert mock.call_args.kwargs["host"] == "localhost"
+    assert mock.call_args.kwargs["use_tls"] is False
+
+
+async def test_user_tcp_default_port_and_tls(hass: HomeAssistant, truenas_ws) -> None:
+    """Sans port ni TLS, la connexion TCP prend le port par défaut et le TLS."""
+    config = dict(MOCK_CONFIG)
+    for key in (CONF_PORT, CONF_SSL, CONF_VERIFY_SSL):
+        config.pop(key)
+    with patch("custom_components.truenas.config_flow.TruenasClient") as mock:
+        mock.return_value = truenas_ws
+        result = await hass.config_entries.flow.async_init(
+            DOMAIN, context={"source": config_entries.SOURCE_USER}, data=config
+        )
+        await hass.async_block_till_done()
+
+    assert result["type"] == FlowResultType.CREATE_ENTRY
+    assert mock.call_args.kwargs["port"] == DEFAULT_PORT
+    assert mock.call_args.kwargs["use_tls"] is True
+    assert mock.call_args.kwargs["verify_ssl"] is True
+
+
 # ---------------------------------------------------------------------------
 # User step — doublon
 # ---------------------------------------------------------------------------
@@ -160,7 +231,7 @@ async def test_duplicate_entry_abort(hass: HomeAssistant, truenas_ws) -> None:
         domain=DOMAIN, unique_id=MOCK_CONFIG[CONF_NAME], data=MOCK_CONFIG
     ).add_to_hass(hass)
 
-    with patch("custom_components.truenas.config_flow.TruenasWebsocket") as mock:
+    with patch("custom_components.truenas.config_flow.TruenasClient") as mock:
         mock.return_value = truenas_ws
         result = await hass.config_entries.flow.async_init(
             DOMAIN, context={"source": config_entries.SOURCE_USER}, data=MOCK_CONFIG
@@ -178,7 +249,7 @@ async def test_duplicate_entry_abort(hass: HomeAssistant, truenas_ws) -> None:
 
 async def test_import_step_delegates_to_user(hass: HomeAssistant, truenas_ws) -> None:
     """async_step_import délègue à async_step_user et crée l'entrée."""
-    with patch("custom_components.truenas.config_flow.TruenasWebsocket") as mock:
+    with patch("custom_components.truenas.config_flow.TruenasClient") as mock:
         mock.return_value = truenas_ws
 
         result = await hass.config_entries.flow.async_init(
@@ -216,3 +287,15 @@ async def test_options_flow_save(hass: HomeAssistant, config_entry) -> None:
 
     assert result["type"] == FlowResultType.CREATE_ENTRY
     assert config_entry.options == {CONF_NOTIFY: True, CONF_CHECK_DEV_VERSION: True}
+
+
+async def test_options_flow_invalid_filter(hass: HomeAssistant, config_entry) -> None:
+    """Une règle de filtre invalide affiche l'erreur invalid_filter."""
+    result = await hass.config_entries.options.async_init(config_entry.entry_id)
+    result = await hass.config_entries.options.async_configure(
+        result["flow_id"],
+        user_input={CONF_NOTIFY: False, "filter_apps": "re:(plex"},
+    )
+
+    assert result["type"] == FlowResultType.FORM
+    assert result["errors"]["base"] == "invalid_filter"
@@ -0,0 +1,104 @@
+"""Tests for the websocket connections shared across reloads."""
+
+from collections.abc import Generator
+from datetime import timedelta
+from unittest.mock import AsyncMock, MagicMock
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import CONF_PASSWORD
+from homeassistant.core import HomeAssistant
+from homeassistant.util import dt as dt_util
+from pytest_homeassistant_custom_component.common import async_fire_time_changed
+
+from custom_components.truenas.connection import (
+    CONNECTION_LINGER,
+    async_get_connections,
+)
+
+
+async def test_reload_reuses_the_connection(
+    hass: HomeAssistant,
+    config_entry: ConfigEntry,
+    truenas_ws: Generator[AsyncMock | MagicMock],
+) -> None:
+    """A reloaded entry takes its connection and subscriptions back."""
+    await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
+    subscribes = truenas_ws.async_subscribe.call_count
+
+    await hass.config_entries.async_reload(config_entry.entry_id)
+    await hass.async_block_till_done()
+
+    coordinator = config_entry.runtime_data
+    connection = async_get_connections(hass).connections[config_entry.entry_id]
+    assert connection.reuses == 1
+    assert truenas_ws.async_connect.await_count == 1
+    # Unsubscribed when released, subscribed again by the new coordinator
+    assert truenas_ws.async_unsubscribe.await_count == subscribes
+    assert truenas_ws.async_subscribe.call_count == 2 * subscribes
+    truenas_ws.async_close.assert_not_awaited()
+    # The events reach the new coordinator
+    assert connection.handlers["core.get_jobs"] == coordinator._async_job_event
+    assert coordinator.subscriptions["core.get_jobs"] == "subscribed"
+
+
+async def test_unloaded_connection_is_closed_after_a_delay(
+    hass: HomeAssistant,
+    config_entry: ConfigEntry,
+    truenas_ws: Generator[AsyncMock | MagicMock],
+) -> None:
+    """A connection not taken back is closed once, then forgotten."""
+    await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
+    manager = async_get_connections(hass)
+
+    await hass.config_entries.async_unload(config_entry.entry_id)
+    await hass.async_block_till_done()
+    assert not manager.connections[config_entry.entry_id].handlers
+    truenas_ws.async_close.assert_not_awaited()
+
+    async_fire_time_changed(
+        hass, dt_util.utcnow() + timedelta(seconds=CONNECTION_LINGER + 1)
+    )
+    await hass.async_block_till_done()
+    truenas_ws.async_close.assert_awaited_once()
+    assert config_entry.entry_id not in manager.connections
+
+
+async def test_changed_settings_open_a_new_connection(
+    hass: HomeAssistant,
+    config_entry: ConfigEntry,
+    truenas_ws: Generator[AsyncMock | MagicMock],
+) -> None:
+    """New credentials close the old connection before logging in again."""
+    await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
+
+    hass.config_entries.async_update_entry(
+        config_entry, data={**config_entry.data, CONF_PASSWORD: "changed"}
+    )
+    truenas_ws.async_close.side_effect = lambda: setattr(
+        truenas_ws, "is_connected", False
+    )
+    await hass.config_entries.async_reload(config_entry.entry_id)
+    await hass.async_block_till_done()
+
+    truenas_ws.async_close.assert_awaited_once()
+    assert truenas_ws.async_connect.await_count == 2
+    assert truenas_ws.async_connect.call_args.args[1] == "changed"
+
+
+async def test_removed_entry_closes_its_connection(
+    hass: HomeAssistant,
+    config_entry: ConfigEntry,
+    truenas_ws: Generator[AsyncMock | MagicMock],
+) -> None:
+    """Removing the entry closes its connection at once."""
+    await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
+
+    await hass.config_entries.async_remove(config_entry.entry_id)
+    await hass.async_block_till_done()
+
+    truenas_ws.async_close.assert_awaited_once()
+    assert not async_get_connections(hass).connections
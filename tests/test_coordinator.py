@@ -1,5 +1,7 @@
 """Tests for the TrueNAS data update coordinator."""
 
+from collections.abc import Generator
+from datetime import timedelta
 from typing import Any
 from unittest.mock import AsyncMock, MagicMock, patch
 
@@ -8,9 +10,17 @@ from aiohttp import WebSocketError
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers.update_coordinator import UpdateFailed
+from homeassistant.util import dt as dt_util
+from pytest_homeassistant_custom_component.common import async_fire_time_changed
 from truenaspy import TruenasException
 
+from custom_components.truenas.const import (
+    CONF_CHECK_DEV_VERSION,
+    CONF_EVENT_INTERVAL,
+    CONF_LIVE_COLLECTIONS,
+)
 from custom_components.truenas.coordinator import TruenasDataUpdateCoordinator
+from custom_components.truenas.live import LiveCollection
 
 
 # ---------------------------------------------------------------------------
@@ -190,7 +200,12 @@ async def test_event_callback_list_added_removed_changed(
 
     # CHANGED with id updates the matching entry.
     await cb(
-        {"collection": "my.list", "msg": "changed", "id": 1, "fields": {"id": 1, "v": "z"}}
+        {
+            "collection": "my.list",
+            "msg": "changed",
+            "id": 1,
+            "fields": {"id": 1, "v": "z"},
+        }
     )
     assert coordinator._events[name][0]["v"] == "z"
 
@@ -213,6 +228,200 @@ async def test_event_callback_notify_pushes_data(
 ) -> None:
     """With notify=True and existing data, the coordinator pushes an update."""
     cb = coordinator._make_event_callback(scalar=True, notify=True)
-    with patch.object(coordinator, "async_set_updated_data") as push:
+    with patch.object(coordinator, "async_update_listeners") as push:
         await cb({"collection": "n.scalar", "msg": "added", "fields": {"v": 1}})
+        assert coordinator._events["n_scalar"] == {"v": 1}
+        push.assert_not_called()
+        coordinator.event_queue.async_flush()
     push.assert_called_once()
+
+
+async def test_event_burst_is_coalesced(
+    hass: HomeAssistant,
+    coordinator: TruenasDataUpdateCoordinator,
+) -> None:
+    """A burst of events is applied at once but notified in a single fan-out."""
+    cb = coordinator._make_event_callback(scalar=False, notify=True)
+    with patch.object(coordinator, "async_update_listeners") as push:
+        for i in range(50):
+            await cb({"collection": "burst", "msg": "added", "fields": {"id": i}})
+        assert len(coordinator._events["burst"]) == 50
+        push.assert_not_called()
+
+        async_fire_time_changed(hass, dt_util.utcnow() + timedelta(seconds=1))
+        await hass.async_block_till_done()
+    push.assert_called_once()
+
+    fanout = coordinator.metrics.fanout.as_dict()
+    assert fanout["fanouts"] == 1
+    assert fanout["last_batch"] == 50
+    assert fanout["coalesced"] == 49
+    assert fanout["pending"] == 0
+
+
+async def test_event_interval_zero_notifies_inline(
+    hass: HomeAssistant,
+    config_entry: ConfigEntry,
+    truenas_ws: Generator[AsyncMock | MagicMock],
+) -> None:
+    """An event interval of 0 notifies the listeners for every event."""
+    hass.config_entries.async_update_entry(
+        config_entry, options={**config_entry.options, CONF_EVENT_INTERVAL: 0}
+    )
+    await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
+    coordinator = config_entry.runtime_data
+
+    cb = coordinator._make_event_callback(scalar=True, notify=True)
+    with patch.object(coordinator, "async_update_listeners") as push:
+        await cb({"collection": "n.scalar", "msg": "added", "fields": {"v": 1}})
+        await cb({"collection": "n.scalar", "msg": "changed", "fields": {"v": 2}})
+    assert push.call_count == 2
+
+
+# ---------------------------------------------------------------------------
+# Metrics
+# ---------------------------------------------------------------------------
+
+
+async def test_async_call_records_metrics(
+    hass: HomeAssistant,
+    config_entry: ConfigEntry,
+) -> None:
+    """Successful and failed calls are recorded per method."""
+    coordinator = TruenasDataUpdateCoordinator(hass, config_entry)
+    coordinator.websocket = MagicMock()
+    coordinator.websocket.async_call = AsyncMock(return_value=[{"id": 1}, {"id": 2}])
+
+    await coordinator.async_call("app.query")
+
+    stats = coordinator.metrics.methods["app.query"]
+    assert stats.calls == 1
+    assert stats.last_objects == 2
+    assert stats.last_bytes > 0
+
+    # The size of the next results is only measured now and then
+    last_bytes = stats.last_bytes
+    coordinator.websocket.async_call = AsyncMock(return_value=[{"id": 1}])
+    await coordinator.async_call("app.query")
+    assert stats.calls == 2
+    assert stats.last_objects == 1
+    assert stats.last_bytes == last_bytes
+    assert stats.sampled == 1
+
+    coordinator.websocket.async_call = AsyncMock(side_effect=TruenasException("nope"))
+    with pytest.raises(TruenasException):
+        await coordinator.async_call("app.query")
+
+    assert stats.errors == 1
+
+
+async def test_refresh_exposes_metrics_summary(
+    coordinator: TruenasDataUpdateCoordinator,
+) -> None:
+    """A refresh publishes its duration and slowest method in the data."""
+    await coordinator.async_refresh()
+
+    metrics = coordinator.data["metrics"]
+    assert metrics["refresh_duration"] is not None
+    assert metrics["refresh_calls"] > 0
+    assert metrics["slowest_method"] in coordinator.metrics.methods
+
+
+# ---------------------------------------------------------------------------
+# Live collections
+# ---------------------------------------------------------------------------
+
+
+def _called_methods(coordinator: TruenasDataUpdateCoordinator) -> list[str]:
+    """Return the methods called on the websocket."""
+    return [
+        c.kwargs.get("method") for c in coordinator.websocket.async_call.call_args_list
+    ]
+
+
+def test_live_collection_applies_buffered_events_on_snapshot() -> None:
+    """Events received before the snapshot are applied on top of it."""
+    live = LiveCollection("app.query", "apps")
+    live.apply({"msg": "changed", "id": "a", "fields": {"id": "a", "v": 2}})
+    live.apply({"msg": "removed", "id": "b"})
+
+    rows = live.snapshot([{"id": "a", "v": 1}, {"id": "b", "v": 1}])
+
+    assert rows == [{"id": "a", "v": 2}]
+    assert live.apply({"msg": "added", "id": "c", "fields": {"id": "c"}})
+    assert live.dirty
+    assert not live.healthy
+
+
+async def test_live_collection_replaces_polling(
+    coordinator: TruenasDataUpdateCoordinator,
+) -> None:
+    """A healthy live collection is not polled again."""
+    assert coordinator.live["app.query"].healthy
+    coordinator.websocket.async_call.reset_mock()
+
+    await coordinator.async_refresh()
+
+    methods = _called_methods(coordinator)
+    assert "app.query" not in methods
+    assert "pool.query" in methods
+    assert coordinator.data["apps"]
+
+
+async def test_live_collection_event_updates_data(
+    coordinator: TruenasDataUpdateCoordinator,
+) -> None:
+    """An event updates the live collection in the coordinator data."""
+    cb = coordinator._make_live_callback(coordinator.live["app.query"])
+    await cb(
+        {
+            "collection": "app.query",
+            "msg": "changed",
+            "id": "jellyfin",
+            "fields": {"id": "jellyfin", "version": "9.9.9"},
+        }
+    )
+    coordinator.event_queue.async_flush()
+
+    app = next(a for a in coordinator.data["apps"] if a["id"] == "jellyfin")
+    assert app["version"] == "9.9.9"
+    assert app["name"] == "jellyfin"
+
+
+async def test_live_collection_polls_when_unhealthy(
+    coordinator: TruenasDataUpdateCoordinator,
+) -> None:
+    """The collection is polled again when its subscription is lost."""
+    coordinator.live["app.query"].reset()
+    coordinator.websocket.async_call.reset_mock()
+
+    await coordinator.async_refresh()
+
+    assert "app.query" in _called_methods(coordinator)
+    assert coordinator.live["app.query"].snapshots == 2
+
+
+async def test_options_are_applied_without_reload(
+    hass: HomeAssistant,
+    coordinator: TruenasDataUpdateCoordinator,
+) -> None:
+    """Behaviour options apply in place, the live collections reload the entry."""
+    entry = coordinator.config_entry
+    connects = coordinator.websocket.async_connect.await_count
+
+    hass.config_entries.async_update_entry(
+        entry,
+        options={**entry.options, CONF_CHECK_DEV_VERSION: True, CONF_EVENT_INTERVAL: 0},
+    )
+    await hass.async_block_till_done()
+    assert entry.runtime_data is coordinator
+    assert coordinator.event_queue.interval == 0
+    assert coordinator.websocket.async_connect.await_count == connects
+
+    hass.config_entries.async_update_entry(
+        entry, options={**entry.options, CONF_LIVE_COLLECTIONS: []}
+    )
+    await hass.async_block_till_done()
+    assert entry.runtime_data is not coordinator
+    assert not entry.runtime_data.live
@@ -0,0 +1,55 @@
+"""Tests for TrueNAS diagnostics."""
+
+from homeassistant.components.diagnostics import REDACTED
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from custom_components.truenas.coordinator import TruenasDataUpdateCoordinator
+from custom_components.truenas.diagnostics import async_get_config_entry_diagnostics
+
+
+async def test_diagnostics_metrics(
+    hass: HomeAssistant,
+    config_entry: ConfigEntry,
+    coordinator: TruenasDataUpdateCoordinator,
+) -> None:
+    """The diagnostics expose the per-method metrics and the refresh history."""
+    diagnostics = await async_get_config_entry_diagnostics(hass, config_entry)
+
+    performance = diagnostics["performance"]
+    assert performance["methods"]["system.info"]["calls"] >= 1
+    assert performance["summary"]["slowest_method"] is not None
+    assert "system.info" in performance["refreshes"][-1]["calls"]
+
+
+async def test_diagnostics_redacted_snapshot(
+    hass: HomeAssistant,
+    config_entry: ConfigEntry,
+    coordinator: TruenasDataUpdateCoordinator,
+) -> None:
+    """Secrets are redacted from the entry and the data snapshot."""
+    diagnostics = await async_get_config_entry_diagnostics(hass, config_entry)
+
+    assert diagnostics["entry"]["data"]["password"] == REDACTED
+    assert diagnostics["entry"]["data"]["host"] == REDACTED
+    assert diagnostics["data"]["system_infos"]["hostname"]
+    assert diagnostics["collections"]["apps"]["objects"] == len(
+        coordinator.data["apps"]
+    )
+
+
+async def test_diagnostics_events_and_subscriptions(
+    hass: HomeAssistant,
+    config_entry: ConfigEntry,
+    coordinator: TruenasDataUpdateCoordinator,
+) -> None:
+    """Event rates, subscriptions and connection stats are reported."""
+    diagnostics = await async_get_config_entry_diagnostics(hass, config_entry)
+
+    assert diagnostics["subscriptions"]["app.query"] == "subscribed"
+    assert diagnostics["events"]["app.query"]["count"] >= 1
+    assert diagnostics["connection"]["connected"] is True
+    assert diagnostics["connection"]["connects"] == 1
+    assert diagnostics["event_queue"]["interval"] == 0.25
+    assert diagnostics["event_queue"]["pending"] == 0
+    assert diagnostics["live"]["app.query"]["healthy"] is True
@@ -0,0 +1,53 @@
+"""Tests for the include and exclude rules on the collections."""
+
+import re
+
+import pytest
+
+from custom_components.truenas.filters import RowFilter, row_filters
+
+DATASETS = [
+    "volume1",
+    "volume1/media",
+    "volume1/virtualmachines/Core1",
+    "volume2",
+    "volume2/iso",
+    "volume2/isos",
+]
+
+
+def test_rules_keep_included_not_excluded() -> None:
+    """Globs and regexes include, a ! prefixed rule excludes."""
+    row_filter = RowFilter.parse(
+        "volume1/*, !volume1/virtualmachines*\nre:volume2(/iso)?"
+    )
+
+    kept = row_filter.apply("id", [{"id": dataset} for dataset in DATASETS])
+
+    assert [row["id"] for row in kept] == ["volume1/media", "volume2", "volume2/iso"]
+
+
+def test_query_filters_match_like_middlewared() -> None:
+    """The query-filters keep the rows the local rules keep."""
+    row_filter = RowFilter.parse("!*/iso*")
+    filters = row_filter.query_filters("id")
+
+    assert all(operator == "~" for _, operator, _ in filters)
+    # middlewared applies the ~ operator with re.match
+    served = [
+        dataset
+        for dataset in DATASETS
+        if all(re.match(regex, dataset) for _, _, regex in filters)
+    ]
+    assert served == [
+        dataset for dataset in DATASETS if row_filter.match("id", {"id": dataset})
+    ]
+    assert "volume2/iso" not in served
+
+
+def test_options_without_rules() -> None:
+    """Empty rules filter nothing, invalid ones are refused."""
+    assert row_filters({"filter_apps": " , ", "filter_pools": ""}) == {}
+    assert row_filters({"filter_apps": "plex"}) == {"apps": RowFilter.parse("plex")}
+    with pytest.raises(ValueError):
+        row_filters({"filter_apps": "re:(plex"})
@@ -0,0 +1,90 @@
+"""Tests for the refresh scheduling shared by the TrueNAS hosts."""
+
+import asyncio
+from collections.abc import Generator
+from datetime import timedelta
+from unittest.mock import AsyncMock, MagicMock
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+from homeassistant.util import dt as dt_util
+from pytest_homeassistant_custom_component.common import async_fire_time_changed
+
+from custom_components.truenas.fleet import FleetScheduler, async_get_fleet
+from custom_components.truenas.metrics import TruenasMetrics
+
+
+def _host(hass: HomeAssistant, entry_id: str) -> MagicMock:
+    """Return a coordinator stand-in refreshed by the scheduler."""
+    coordinator = MagicMock()
+    coordinator.config_entry.entry_id = entry_id
+    coordinator.config_entry.async_create_background_task.side_effect = (
+        lambda hass, target, name: hass.async_create_background_task(target, name)
+    )
+    coordinator.metrics = TruenasMetrics()
+    coordinator.async_refresh = AsyncMock()
+    return coordinator
+
+
+async def test_hosts_are_spread_over_the_interval(hass: HomeAssistant) -> None:
+    """Each host gets its own offset and a removed host frees its slot."""
+    fleet = FleetScheduler(hass, interval=60)
+    hosts = [_host(hass, f"entry_{index}") for index in range(3)]
+    removers = [fleet.async_add(host) for host in hosts]
+
+    assert [h.metrics.schedule.offset for h in hosts] == [0, 20, 40]
+
+    removers[1]()
+    assert [hosts[0].metrics.schedule.offset, hosts[2].metrics.schedule.offset] == [
+        0,
+        30,
+    ]
+    removers[0]()
+    removers[2]()
+    assert not fleet.members
+
+
+async def test_concurrent_refreshes_are_capped(hass: HomeAssistant) -> None:
+    """No more than max_concurrent hosts refresh at the same time."""
+    fleet = FleetScheduler(hass, interval=60, max_concurrent=1)
+    release = asyncio.Event()
+    hosts = [_host(hass, f"entry_{index}") for index in range(2)]
+    for host in hosts:
+        host.async_refresh.side_effect = release.wait
+        fleet.async_add(host)
+
+    async_fire_time_changed(hass, dt_util.utcnow() + timedelta(seconds=61))
+    await hass.async_block_till_done()
+    assert fleet.in_flight == 1
+
+    release.set()
+    await hass.async_block_till_done(wait_background_tasks=True)
+    assert fleet.max_in_flight == 1
+    assert all(h.metrics.schedule.refreshes == 1 for h in hosts)
+    assert all(h.async_refresh.await_count == 1 for h in hosts)
+
+    for member in list(fleet.members):
+        fleet._async_remove(member)
+
+
+async def test_config_entry_joins_and_leaves_the_fleet(
+    hass: HomeAssistant,
+    config_entry: ConfigEntry,
+    truenas_ws: Generator[AsyncMock | MagicMock],
+) -> None:
+    """A loaded entry is refreshed by the fleet until it is unloaded."""
+    await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
+    fleet = async_get_fleet(hass)
+    assert config_entry.entry_id in fleet.members
+
+    truenas_ws.async_call.reset_mock()
+    async_fire_time_changed(hass, dt_util.utcnow() + timedelta(seconds=61))
+    await hass.async_block_till_done(wait_background_tasks=True)
+    methods = [c.kwargs["method"] for c in truenas_ws.async_call.call_args_list]
+    assert "system.info" in methods
+    assert config_entry.runtime_data.metrics.schedule.refreshes == 1
+
+    await hass.config_entries.async_unload(config_entry.entry_id)
+    await hass.async_block_till_done()
+    assert config_entry.entry_id not in fleet.members
@@ -0,0 +1,128 @@
+"""Tests for the TrueNAS job tracker."""
+
+import asyncio
+from typing import Any
+
+import pytest
+
+from custom_components.truenas.coordinator import TruenasDataUpdateCoordinator
+from custom_components.truenas.jobs import JobTracker
+
+
+def _job_event(job_id: int, state: str, percent: int | None = None) -> dict:
+    """Return a core.get_jobs event."""
+    return {
+        "collection": "core.get_jobs",
+        "msg": "changed",
+        "id": job_id,
+        "fields": {"id": job_id, "state": state, "progress": {"percent": percent}},
+    }
+
+
+async def test_parallel_jobs_are_tracked_independently() -> None:
+    """Two jobs waited in parallel finish on their own events."""
+    tracker = JobTracker()
+    first, second = tracker.track(1), tracker.track(2)
+    progress: list[int | None] = []
+    first.async_add_listener(lambda job: progress.append(job.percent))
+
+    waits = asyncio.gather(first.async_wait(1), second.async_wait(1))
+    tracker.async_apply(_job_event(1, "RUNNING", 40))
+    tracker.async_apply(_job_event(2, "SUCCESS", 100))
+    tracker.async_apply(_job_event(1, "FAILED", 60))
+    await waits
+
+    assert progress == [40, 60]
+    assert first.done and not first.success
+    assert second.success
+    assert tracker.running == []
+
+
+async def test_job_finished_before_tracking_is_done() -> None:
+    """A job whose final event arrives before its handle is still done."""
+    tracker = JobTracker()
+    tracker.async_apply(_job_event(7, "SUCCESS"))
+
+    job = tracker.track(7)
+
+    assert (await job.async_wait(0.1)).success
+
+
+async def test_job_wait_times_out() -> None:
+    """Waiting for a job still running raises TimeoutError."""
+    job = JobTracker().track(1)
+
+    with pytest.raises(TimeoutError):
+        await job.async_wait(0.01)
+
+
+async def test_coordinator_subscribes_once_to_jobs(
+    coordinator: TruenasDataUpdateCoordinator,
+) -> None:
+    """The coordinator keeps a single core.get_jobs subscription."""
+    collections = [
+        c.args[0] for c in coordinator.websocket.async_subscribe.call_args_list
+    ]
+    assert collections.count("core.get_jobs") == 1
+    assert coordinator.subscriptions["core.get_jobs"] == "subscribed"
+
+    await coordinator._async_job_event(_job_event(3, "RUNNING", 10))
+    assert coordinator.jobs.jobs[3].percent == 10
+    assert coordinator.metrics.events["core.get_jobs"].count == 1
+
+
+def _serve_jobs(coordinator: TruenasDataUpdateCoordinator, jobs: list[dict]) -> None:
+    """Serve the core.get_jobs queries of the coordinator."""
+    default_call = coordinator.websocket.async_call.side_effect
+
+    async def _mock_call(method: str, params: Any = None) -> Any:
+        if method == "core.get_jobs":
+            return jobs
+        return await default_call(method=method, params=params)
+
+    coordinator.websocket.async_call.side_effect = _mock_call
+    coordinator.websocket.async_call.reset_mock()
+
+
+def _polls(coordinator: TruenasDataUpdateCoordinator) -> list[Any]:
+    """Return the params of the core.get_jobs queries."""
+    return [
+        c.kwargs["params"]
+        for c in coordinator.websocket.async_call.call_args_list
+        if c.kwargs["method"] == "core.get_jobs"
+    ]
+
+
+async def test_jobs_polled_without_their_subscription(
+    coordinator: TruenasDataUpdateCoordinator,
+) -> None:
+    """The tracked jobs are polled at every refresh without the job events."""
+    coordinator.subscriptions["core.get_jobs"] = "failed"
+    job = coordinator.jobs.track(5)
+    coordinator.jobs.track(6).async_update({"state": "SUCCESS"})
+    _serve_jobs(coordinator, [{"id": 5, "state": "SUCCESS", "result": True}])
+
+    await coordinator.async_refresh()
+
+    assert job.success and job.result is True
+    # Only the jobs still running are queried
+    assert _polls(coordinator) == [[[["id", "in", [5]]]]]
+
+
+async def test_jobs_polled_after_a_reconnection(
+    coordinator: TruenasDataUpdateCoordinator,
+) -> None:
+    """A job finished while disconnected is done once connected again."""
+    job = coordinator.jobs.track(7)
+    coordinator.websocket.is_connected = False
+    _serve_jobs(coordinator, [{"id": 7, "state": "FAILED", "error": "boom"}])
+
+    await coordinator.async_refresh()
+
+    assert job.done and job.error == "boom"
+    assert _polls(coordinator) == [[[["id", "in", [7]]]]]
+
+    # Subscribed again, the events follow the jobs
+    coordinator.jobs.track(8)
+    await coordinator.async_refresh()
+    assert len(_polls(coordinator)) == 1
@@ -0,0 +1,308 @@
+"""End-to-end tests against the local middlewared stand-in."""
+
+import asyncio
+import tempfile
+from collections.abc import AsyncGenerator
+from copy import deepcopy
+from pathlib import Path
+
+import pytest
+from homeassistant.config_entries import ConfigEntryState
+from homeassistant.const import (
+    CONF_API_KEY,
+    CONF_HOST,
+    CONF_PASSWORD,
+    CONF_PORT,
+    CONF_SSL,
+)
+from homeassistant.core import HomeAssistant
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.truenas.connection import async_get_connections
+from custom_components.truenas.const import (
+    CONF_SOCKET_PATH,
+    CONF_TRANSPORT,
+    DOMAIN,
+    TRANSPORT_UNIX,
+)
+
+from .const import MOCK_USER_INPUT
+from .middlewared import MiddlewaredStandIn, _query
+from .synthetic import EVENTS_DATA
+
+CPU_USAGE_EID = "sensor.truenas_test_system_cpu_usage"
+
+
+@pytest.fixture(name="middlewared")
+async def fixture_middlewared() -> AsyncGenerator[MiddlewaredStandIn]:
+    """Start a middlewared stand-in."""
+    server = MiddlewaredStandIn(latency=0.001)
+    await server.start()
+    yield server
+    await server.stop()
+
+
+@pytest.fixture(name="standin_entry")
+def fixture_standin_entry(
+    hass: HomeAssistant, middlewared: MiddlewaredStandIn
+) -> MockConfigEntry:
+    """Create a config entry pointing to the stand-in."""
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        unique_id="standin",
+        data={
+            **MOCK_USER_INPUT,
+            CONF_HOST: "127.0.0.1",
+            CONF_PORT: middlewared.port,
+            CONF_SSL: False,
+        },
+        options={"check_dev_version": False, "notify": False},
+    )
+    entry.add_to_hass(hass)
+    return entry
+
+
+async def _async_unload(hass: HomeAssistant, entry: MockConfigEntry) -> None:
+    """Unload the entry and close its websocket."""
+    await hass.config_entries.async_unload(entry.entry_id)
+    await async_get_connections(hass).async_close(entry.entry_id)
+
+
+async def test_setup_against_standin(
+    hass: HomeAssistant,
+    middlewared: MiddlewaredStandIn,
+    standin_entry: MockConfigEntry,
+) -> None:
+    """The integration sets up through a real websocket."""
+    assert await hass.config_entries.async_setup(standin_entry.entry_id)
+    await hass.async_block_till_done()
+
+    assert standin_entry.state is ConfigEntryState.LOADED
+    assert hass.states.get("switch.truenas_test_services_cifs").state == "on"
+    assert middlewared.calls["auth.login_ex"] == 1
+    assert middlewared.calls["system.info"] == 1
+    assert middlewared.calls["core.subscribe"] >= 1
+
+    await _async_unload(hass, standin_entry)
+
+
+async def test_event_reaches_entity(
+    hass: HomeAssistant,
+    middlewared: MiddlewaredStandIn,
+    standin_entry: MockConfigEntry,
+) -> None:
+    """A pushed event updates the entity state."""
+    assert await hass.config_entries.async_setup(standin_entry.entry_id)
+    await hass.async_block_till_done()
+
+    event = deepcopy(EVENTS_DATA["events"]["reporting.realtime"][0])
+    event["fields"]["cpu"]["cpu"]["usage"] = 42.0
+    await middlewared.push("reporting.realtime", event)
+
+    async with asyncio.timeout(5):
+        while hass.states.get(CPU_USAGE_EID).state != "42.0":
+            await asyncio.sleep(0.01)
+            await hass.async_block_till_done()
+
+    await _async_unload(hass, standin_entry)
+
+
+async def test_released_connection_unsubscribes(
+    hass: HomeAssistant,
+    middlewared: MiddlewaredStandIn,
+    standin_entry: MockConfigEntry,
+) -> None:
+    """An unloaded entry unsubscribes, its reload subscribes again."""
+    assert await hass.config_entries.async_setup(standin_entry.entry_id)
+    await hass.async_block_till_done()
+    collections = middlewared.subscribed()
+    assert "core.get_jobs" in collections
+
+    await hass.config_entries.async_unload(standin_entry.entry_id)
+    await hass.async_block_till_done()
+    assert middlewared.subscribed() == set()
+    assert middlewared.calls["core.unsubscribe"] == len(collections)
+
+    assert await hass.config_entries.async_setup(standin_entry.entry_id)
+    await hass.async_block_till_done()
+    connection = async_get_connections(hass).connections[standin_entry.entry_id]
+    assert connection.reuses == 1
+    assert middlewared.calls["auth.login_ex"] == 1
+    assert middlewared.subscribed() == collections
+    assert connection.subscribed == collections
+
+    await _async_unload(hass, standin_entry)
+
+
+async def test_api_key_login_then_session_token(
+    hass: HomeAssistant,
+    middlewared: MiddlewaredStandIn,
+    standin_entry: MockConfigEntry,
+) -> None:
+    """Reconnects log in with the session token, the API key once it is lost."""
+    data = {**standin_entry.data, CONF_API_KEY: middlewared.api_key}
+    data.pop(CONF_PASSWORD)
+    hass.config_entries.async_update_entry(standin_entry, data=data)
+    assert await hass.config_entries.async_setup(standin_entry.entry_id)
+    await hass.async_block_till_done()
+    assert standin_entry.state is ConfigEntryState.LOADED
+    assert middlewared.logins == {"API_KEY_PLAIN": 1}
+
+    coordinator = standin_entry.runtime_data
+    await coordinator.websocket.async_close()
+    await coordinator._ensure_connection()
+    assert middlewared.logins == {"API_KEY_PLAIN": 1, "TOKEN_PLAIN": 1}
+
+    # A restarted middlewared forgets its tokens
+    middlewared.tokens.clear()
+    await coordinator.websocket.async_close()
+    await coordinator._ensure_connection()
+    assert coordinator.websocket.is_logged
+    assert middlewared.logins == {"API_KEY_PLAIN": 2, "TOKEN_PLAIN": 1}
+    # A fresh token after every login
+    assert middlewared.calls["auth.generate_token"] == 3
+
+    await _async_unload(hass, standin_entry)
+
+
+async def test_api_key_login_without_session_token(
+    hass: HomeAssistant,
+    middlewared: MiddlewaredStandIn,
+    standin_entry: MockConfigEntry,
+) -> None:
+    """A failed token generation leaves the API key for the next logins."""
+    middlewared.errors["auth.generate_token"] = 1.0
+    data = {**standin_entry.data, CONF_API_KEY: middlewared.api_key}
+    data.pop(CONF_PASSWORD)
+    hass.config_entries.async_update_entry(standin_entry, data=data)
+    assert await hass.config_entries.async_setup(standin_entry.entry_id)
+    await hass.async_block_till_done()
+    assert standin_entry.state is ConfigEntryState.LOADED
+
+    coordinator = standin_entry.runtime_data
+    assert coordinator.websocket.token is None
+    await coordinator.websocket.async_close()
+    await coordinator._ensure_connection()
+    assert coordinator.websocket.is_logged
+    assert middlewared.logins == {"API_KEY_PLAIN": 2}
+
+    await _async_unload(hass, standin_entry)
+
+
+async def test_filters_pushed_down(
+    hass: HomeAssistant,
+    middlewared: MiddlewaredStandIn,
+    standin_entry: MockConfigEntry,
+) -> None:
+    """Only the rows kept by the rules are fetched and followed."""
+    hass.config_entries.async_update_entry(
+        standin_entry,
+        options={
+            **standin_entry.options,
+            "filter_apps": "jellyfin, sync*",
+            "filter_services": "!nvmet, !ups",
+            "filter_datasets": "volume2/*",
+        },
+    )
+    assert await hass.config_entries.async_setup(standin_entry.entry_id)
+    await hass.async_block_till_done()
+
+    coordinator = standin_entry.runtime_data
+    assert [app["id"] for app in coordinator.data["apps"]] == [
+        "jellyfin",
+        "syncthing",
+    ]
+    services = [service["service"] for service in coordinator.data["services"]]
+    assert "ups" not in services
+    assert "cifs" in services
+    assert all(
+        dataset["id"].startswith("volume2/") for dataset in coordinator.data["datasets"]
+    )
+    assert hass.states.get("switch.truenas_test_services_cifs") is not None
+    assert hass.states.get("switch.truenas_test_services_ups") is None
+
+    # The events of the rows filtered out are ignored by the live collection
+    await middlewared.push(
+        "app.query", {"msg": "added", "id": "plex", "fields": {"id": "plex"}}
+    )
+    await middlewared.push(
+        "app.query",
+        {"msg": "added", "id": "syncthing2", "fields": {"id": "syncthing2"}},
+    )
+    live = coordinator.live["app.query"]
+    async with asyncio.timeout(5):
+        while "syncthing2" not in live.rows:
+            await asyncio.sleep(0.01)
+    assert "plex" not in live.rows
+
+    await _async_unload(hass, standin_entry)
+
+
+def test_query_filters_and_options() -> None:
+    """The stand-in applies query-filters and query-options like middlewared."""
+    rows = [
+        {"name": "tank@b", "dataset": "tank", "creation": {"$date": 2000}},
+        {"name": "tank/sub@a", "dataset": "tank/sub", "creation": {"$date": 1000}},
+        {"name": "tank2@c", "dataset": "tank2", "creation": {"$date": 3000}},
+        {"name": "boot@d", "dataset": "boot"},
+    ]
+    in_tank = [["OR", [["dataset", "=", "tank"], ["dataset", "^", "tank/"]]]]
+
+    assert [row["name"] for row in _query(rows, in_tank, {})] == [
+        "tank@b",
+        "tank/sub@a",
+    ]
+    older = [["creation", "<", {"$date": 2500}]]
+    assert [row["name"] for row in _query(rows, older, {"order_by": ["name"]})] == [
+        "tank/sub@a",
+        "tank@b",
+    ]
+    page = _query(rows, [], {"order_by": ["-creation"], "offset": 1, "limit": 2})
+    assert [row["name"] for row in page] == ["tank@b", "tank/sub@a"]
+    assert _query(rows, [["dataset", "in", ["boot", "tank"]]], {"count": True}) == 2
+
+
+async def test_setup_through_unix_socket(hass: HomeAssistant) -> None:
+    """The local transport reaches middlewared through its unix socket."""
+    with tempfile.TemporaryDirectory() as directory:
+        # Unix socket paths are short, the pytest tmp_path may be too long
+        path = str(Path(directory) / "middlewared.sock")
+        server = MiddlewaredStandIn(latency=0.001)
+        await server.start_unix(path)
+        entry = MockConfigEntry(
+            domain=DOMAIN,
+            unique_id="standin_unix",
+            data={
+                **MOCK_USER_INPUT,
+                CONF_TRANSPORT: TRANSPORT_UNIX,
+                CONF_SOCKET_PATH: path,
+            },
+            options={"check_dev_version": False, "notify": False},
+        )
+        entry.add_to_hass(hass)
+        try:
+            assert await hass.config_entries.async_setup(entry.entry_id)
+            await hass.async_block_till_done()
+
+            assert entry.state is ConfigEntryState.LOADED
+            assert hass.states.get("switch.truenas_test_services_cifs").state == "on"
+            assert server.calls["auth.login_ex"] == 1
+            assert server.calls["core.subscribe"] >= 1
+            await _async_unload(hass, entry)
+        finally:
+            await server.stop()
+
+
+@pytest.mark.parametrize("expected_lingering_timers", [True])
+async def test_injected_error_retries_setup(
+    hass: HomeAssistant,
+    middlewared: MiddlewaredStandIn,
+    standin_entry: MockConfigEntry,
+) -> None:
+    """A failing critical call puts the entry in setup retry."""
+    middlewared.errors["system.info"] = 1.0
+
+    await hass.config_entries.async_setup(standin_entry.entry_id)
+    await hass.async_block_till_done()
+
+    assert standin_entry.state is ConfigEntryState.SETUP_RETRY
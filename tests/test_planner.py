@@ -0,0 +1,85 @@
+"""Tests for the collections fetched for the enabled entities."""
+
+from collections.abc import Generator
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers import entity_registry as er
+
+from custom_components.truenas.planner import async_get_planner
+
+
+def _calls(truenas_ws: MagicMock, method: str) -> int:
+    """Return the number of calls of a method."""
+    return sum(
+        1
+        for call in truenas_ws.async_call.call_args_list
+        if call.kwargs.get("method") == method
+    )
+
+
+async def test_disabled_collection_is_not_fetched(
+    hass: HomeAssistant,
+    config_entry: ConfigEntry,
+    truenas_ws: Generator[AsyncMock | MagicMock],
+) -> None:
+    """A collection read by disabled entities only is fetched at a low cadence."""
+    await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
+    coordinator = config_entry.runtime_data
+    datasets = coordinator.data["datasets"]
+    assert "datasets" in async_get_planner(hass).async_needed(config_entry.entry_id)
+
+    registry = er.async_get(hass)
+    for entity in er.async_entries_for_config_entry(registry, config_entry.entry_id):
+        if "-dataset-" in entity.unique_id or entity.unique_id == "fleet-datasets":
+            registry.async_update_entity(
+                entity.entity_id, disabled_by=er.RegistryEntryDisabler.USER
+            )
+    await hass.async_block_till_done()
+    fetched = _calls(truenas_ws, "pool.dataset.details")
+
+    await coordinator.async_refresh()
+    assert _calls(truenas_ws, "pool.dataset.details") == fetched
+    assert coordinator.data["datasets"] == datasets
+    # Collections read by an enabled entity are still fetched
+    assert _calls(truenas_ws, "pool.query") > 1
+    assert async_get_planner(hass).as_dict(config_entry.entry_id)["skipped"] >= 1
+
+    # Until the discovery interval elapsed
+    with patch("custom_components.truenas.planner.PLANNER_DISCOVERY_INTERVAL", 0):
+        await coordinator.async_refresh()
+    assert _calls(truenas_ws, "pool.dataset.details") == fetched + 1
+
+
+async def test_plan_bookkeeping_only_when_applied(
+    hass: HomeAssistant,
+    config_entry: ConfigEntry,
+    truenas_ws: Generator[AsyncMock | MagicMock],
+) -> None:
+    """Skips are counted, and collections kept, only when the plan is applied."""
+    await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
+    coordinator = config_entry.runtime_data
+    planner = async_get_planner(hass)
+    registry = er.async_get(hass)
+    for entity in er.async_entries_for_config_entry(registry, config_entry.entry_id):
+        registry.async_update_entity(
+            entity.entity_id, disabled_by=er.RegistryEntryDisabler.USER
+        )
+    await hass.async_block_till_done()
+
+    # A capture fetches every collection, nothing is skipped
+    coordinator.capture = MagicMock()
+    await coordinator.async_refresh()
+    coordinator.capture = None
+    assert planner.as_dict(config_entry.entry_id)["skipped"] == 0
+
+    # A skipped collection missing from the previous data is left out
+    del coordinator.data["disks"]
+    fetched = _calls(truenas_ws, "disk.details")
+    await coordinator.async_refresh()
+    assert _calls(truenas_ws, "disk.details") == fetched
+    assert planner.as_dict(config_entry.entry_id)["skipped"] >= 1
+    assert "disks" not in coordinator.data
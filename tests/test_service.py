@@ -1,21 +1,36 @@
 """Tests for TrueNAS services."""
 
-from typing import Generator
-from unittest.mock import AsyncMock, MagicMock
-
-from homeassistant.config_entries import ConfigEntry
-from homeassistant.const import CONF_ENTITY_ID
+import re
+from collections.abc import Container
+from pathlib import Path
+from typing import Any, Generator
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from homeassistant.config_entries import SOURCE_USER, ConfigEntry
+from homeassistant.const import CONF_ENTITY_ID, CONF_NAME
 from homeassistant.core import HomeAssistant
+from homeassistant.exceptions import HomeAssistantError
 from homeassistant.helpers import entity_registry as er
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+from truenaspy import TruenasException
 
+from custom_components.truenas.bulk import async_call_bulk
 from custom_components.truenas.const import DOMAIN
 from custom_components.truenas.coordinator import TruenasDataUpdateCoordinator
+from custom_components.truenas.router import async_get_router
 from custom_components.truenas.service import (
+    SERVICE_BULK_ACTION,
     SERVICE_CLOUDSYNC_RUN,
     SERVICE_DATASET_SNAPSHOT,
+    SERVICE_PROFILE,
+    SERVICE_PRUNE_SNAPSHOTS,
     SERVICE_SERVICE_RELOAD,
 )
 
+from .const import MOCK_USER_INPUT
+from .middlewared import _query
+
 
 def _last_call_kwargs(coordinator: TruenasDataUpdateCoordinator) -> dict:
     """Return the kwargs of the last websocket async_call."""
@@ -64,10 +79,14 @@ async def test_service_reload_calls_websocket(
         {CONF_ENTITY_ID: "switch.truenas_test_services_cifs"},
         blocking=True,
     )
+    await hass.async_block_till_done(wait_background_tasks=True)
 
-    kwargs = _last_call_kwargs(coordinator)
-    assert kwargs["method"] == "service.reload"
-    assert kwargs["params"] == ["cifs"]
+    calls = [c.kwargs for c in coordinator.websocket.async_call.call_args_list]
+    assert calls[0] == {"method": "service.reload", "params": ["cifs"]}
+    # The reloaded service alone is refetched
+    assert calls[1:] == [
+        {"method": "service.query", "params": [[["service", "=", "cifs"]]]}
+    ]
 
 
 # ---------------------------------------------------------------------------
@@ -146,3 +165,627 @@ async def test_cloudsync_run_calls_websocket(
     kwargs = _last_call_kwargs(coordinator)
     assert kwargs["method"] == "cloudsync.sync"
     assert kwargs["params"] == [42]
+
+
+# ---------------------------------------------------------------------------
+# profile
+# ---------------------------------------------------------------------------
+
+
+async def test_profile_writes_report(
+    hass: HomeAssistant,
+    config_entry: ConfigEntry,
+    truenas_ws: Generator[AsyncMock | MagicMock],
+    tmp_path: Path,
+) -> None:
+    """profile runs the refreshes under cProfile and writes a report file."""
+    await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
+    hass.config.config_dir = str(tmp_path)
+
+    await hass.services.async_call(
+        DOMAIN, SERVICE_PROFILE, {"refreshes": 2}, blocking=True
+    )
+
+    reports = list(tmp_path.glob("truenas_profile_*.txt"))
+    assert len(reports) == 1
+    content = reports[0].read_text()
+    assert "refreshes: 2" in content
+    assert "_fetch_data: calls=" in content
+
+
+async def test_profile_stops_between_refreshes(
+    hass: HomeAssistant,
+    config_entry: ConfigEntry,
+    truenas_ws: Generator[AsyncMock | MagicMock],
+    tmp_path: Path,
+) -> None:
+    """Past the timeout, no refresh is started and the running one completes."""
+    await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
+    hass.config.config_dir = str(tmp_path)
+    coordinator = config_entry.runtime_data
+    refreshes = 0
+
+    async def _slow_refresh() -> None:
+        nonlocal refreshes
+        refreshes += 1
+        clock.perf_counter.return_value = 10
+
+    clock = MagicMock()
+    clock.perf_counter.return_value = 0
+    with (
+        patch("custom_components.truenas.profiler.time", clock),
+        patch.object(coordinator, "async_refresh", side_effect=_slow_refresh),
+    ):
+        await hass.services.async_call(
+            DOMAIN, SERVICE_PROFILE, {"refreshes": 3, "timeout": 5}, blocking=True
+        )
+
+    assert refreshes == 1
+    (report,) = tmp_path.glob("truenas_profile_*.txt")
+    assert "refreshes: 1" in report.read_text()
+
+
+# ---------------------------------------------------------------------------
+# bulk_action
+# ---------------------------------------------------------------------------
+
+BULK_TARGETS = [
+    "switch.truenas_test_services_cifs",
+    "switch.truenas_test_apps_transmission",
+]
+
+
+async def test_bulk_action_calls_each_target_and_refreshes_once(
+    hass: HomeAssistant,
+    config_entry: ConfigEntry,
+    truenas_ws: Generator[AsyncMock | MagicMock],
+) -> None:
+    """Without core.bulk, every target is called then each collection refetched."""
+    await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
+    default_call = truenas_ws.async_call.side_effect
+
+    async def _mock_call(method: str, params: Any = None) -> Any:
+        if method == "service.stop":
+            raise TruenasException("busy")
+        return await default_call(method=method, params=params)
+
+    truenas_ws.async_call.side_effect = _mock_call
+    truenas_ws.async_call.reset_mock()
+
+    response = await hass.services.async_call(
+        DOMAIN,
+        SERVICE_BULK_ACTION,
+        {CONF_ENTITY_ID: BULK_TARGETS, "action": "stop"},
+        blocking=True,
+        return_response=True,
+    )
+
+    assert response["action"] == "stop"
+    assert {r["uid"]: (r["success"], r["error"]) for r in response["results"]} == {
+        "cifs": (False, "busy"),
+        "transmission": (True, None),
+    }
+    methods = [c.kwargs["method"] for c in truenas_ws.async_call.call_args_list]
+    assert methods.count("service.query") == 1
+    assert methods.count("app.query") == 1
+    assert "system.info" not in methods
+
+
+async def test_bulk_action_uses_core_bulk(
+    hass: HomeAssistant,
+    config_entry: ConfigEntry,
+    truenas_ws: Generator[AsyncMock | MagicMock],
+) -> None:
+    """core.bulk runs the serial calls of a method in one job."""
+    await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
+    coordinator: TruenasDataUpdateCoordinator = config_entry.runtime_data
+    default_call = truenas_ws.async_call.side_effect
+
+    async def _mock_call(method: str, params: Any = None) -> Any:
+        if method == "core.bulk":
+            coordinator.jobs.async_apply(
+                {
+                    "fields": {
+                        "id": 7,
+                        "state": "SUCCESS",
+                        "result": [
+                            {"result": None, "error": None, "job_id": 8}
+                            for _ in params[1]
+                        ],
+                    }
+                }
+            )
+            return 7
+        return await default_call(method=method, params=params)
+
+    truenas_ws.async_call.side_effect = _mock_call
+    truenas_ws.async_call.reset_mock()
+
+    response = await hass.services.async_call(
+        DOMAIN,
+        SERVICE_BULK_ACTION,
+        {
+            CONF_ENTITY_ID: BULK_TARGETS,
+            "action": "start",
+            "concurrency": 1,
+            "wait": True,
+        },
+        blocking=True,
+        return_response=True,
+    )
+
+    assert all(r["success"] and r["job_id"] == 8 for r in response["results"])
+    bulk_params = [
+        c.kwargs["params"]
+        for c in truenas_ws.async_call.call_args_list
+        if c.kwargs["method"] == "core.bulk"
+    ]
+    assert sorted(bulk_params) == [
+        ["app.start", [["transmission"]]],
+        ["service.start", [["cifs"]]],
+    ]
+    methods = [c.kwargs["method"] for c in truenas_ws.async_call.call_args_list]
+    assert "app.start" not in methods
+
+
+async def test_bulk_action_refreshes_each_target_after_its_job(
+    hass: HomeAssistant,
+    config_entry: ConfigEntry,
+    truenas_ws: Generator[AsyncMock | MagicMock],
+) -> None:
+    """A target started as a job is refetched alone once the job is done."""
+    await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
+    coordinator: TruenasDataUpdateCoordinator = config_entry.runtime_data
+    default_call = truenas_ws.async_call.side_effect
+
+    async def _mock_call(method: str, params: Any = None) -> Any:
+        if method == "app.stop":
+            return 12
+        return await default_call(method=method, params=params)
+
+    truenas_ws.async_call.side_effect = _mock_call
+    truenas_ws.async_call.reset_mock()
+
+    response = await hass.services.async_call(
+        DOMAIN,
+        SERVICE_BULK_ACTION,
+        {CONF_ENTITY_ID: BULK_TARGETS, "action": "stop"},
+        blocking=True,
+        return_response=True,
+    )
+
+    assert {r["uid"]: r["job_id"] for r in response["results"]} == {
+        "cifs": None,
+        "transmission": 12,
+    }
+    methods = [c.kwargs["method"] for c in truenas_ws.async_call.call_args_list]
+    # The service without a job is refetched with its collection at once
+    assert methods.count("service.query") == 1
+    assert "app.query" not in methods
+
+    coordinator.jobs.async_apply({"fields": {"id": 12, "state": "SUCCESS"}})
+    await hass.async_block_till_done(wait_background_tasks=True)
+    queries = [
+        c.kwargs["params"]
+        for c in truenas_ws.async_call.call_args_list
+        if c.kwargs["method"] == "app.query"
+    ]
+    assert queries == [[[["id", "=", "transmission"]]]]
+
+
+async def test_bulk_calls_wait_for_each_job(
+    hass: HomeAssistant,
+    config_entry: ConfigEntry,
+    truenas_ws: Generator[AsyncMock | MagicMock],
+) -> None:
+    """Concurrent calls wait for their own job, a slow job only times out its call."""
+    await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
+    coordinator: TruenasDataUpdateCoordinator = config_entry.runtime_data
+    default_call = truenas_ws.async_call.side_effect
+
+    async def _mock_call(method: str, params: Any = None) -> Any:
+        if method == "app.start":
+            if params == ["transmission"]:
+                coordinator.jobs.async_apply(
+                    {"fields": {"id": 8, "state": "SUCCESS", "result": True}}
+                )
+                return 8
+            # Never finishes
+            return 9
+        return await default_call(method=method, params=params)
+
+    truenas_ws.async_call.side_effect = _mock_call
+    truenas_ws.async_call.reset_mock()
+
+    statuses = await async_call_bulk(
+        coordinator, "app.start", [["transmission"], ["plex"]], timeout=0.1
+    )
+
+    assert statuses == [
+        {"result": True, "error": None, "job_id": 8},
+        {"result": None, "error": "timeout", "job_id": 9},
+    ]
+    methods = [c.kwargs["method"] for c in truenas_ws.async_call.call_args_list]
+    assert "core.bulk" not in methods
+
+
+# ---------------------------------------------------------------------------
+# Multiple targets
+# ---------------------------------------------------------------------------
+
+
+async def test_dataset_snapshot_many_targets_returns_snapshots(
+    hass: HomeAssistant,
+    config_entry: ConfigEntry,
+    truenas_ws: Generator[AsyncMock | MagicMock],
+) -> None:
+    """dataset_snapshot snapshots every target and returns the snapshot names."""
+    await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
+
+    registry = er.async_get(hass)
+    entity_ids = [
+        registry.async_get_or_create(
+            domain="sensor",
+            platform=DOMAIN,
+            unique_id=f"Truenas_test-snapshottask-tank/{name}",
+            config_entry=config_entry,
+        ).entity_id
+        for name in ("apps", "media")
+    ]
+    truenas_ws.async_call.reset_mock()
+
+    response = await hass.services.async_call(
+        DOMAIN,
+        SERVICE_DATASET_SNAPSHOT,
+        {CONF_ENTITY_ID: entity_ids, "name": "pre-upgrade"},
+        blocking=True,
+        return_response=True,
+    )
+
+    assert [r["snapshot"] for r in response["results"]] == [
+        "tank/apps@pre-upgrade",
+        "tank/media@pre-upgrade",
+    ]
+    params = [c.kwargs["params"] for c in truenas_ws.async_call.call_args_list]
+    assert [{"dataset": "tank/media", "name": "pre-upgrade"}] in params
+
+
+async def test_cloudsync_run_waits_for_jobs(
+    hass: HomeAssistant,
+    config_entry: ConfigEntry,
+    truenas_ws: Generator[AsyncMock | MagicMock],
+) -> None:
+    """cloudsync_run returns the job ids, and their outcome with wait."""
+    await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
+    coordinator: TruenasDataUpdateCoordinator = config_entry.runtime_data
+
+    registry = er.async_get(hass)
+    entity_id = registry.async_get_or_create(
+        domain="sensor",
+        platform=DOMAIN,
+        unique_id="Truenas_test-cloudsync-42",
+        config_entry=config_entry,
+    ).entity_id
+    default_call = truenas_ws.async_call.side_effect
+
+    async def _mock_call(method: str, params: Any = None) -> Any:
+        if method == "cloudsync.sync":
+            coordinator.jobs.async_apply(
+                {"fields": {"id": 77, "state": "FAILED", "error": "bucket gone"}}
+            )
+            return 77
+        return await default_call(method=method, params=params)
+
+    truenas_ws.async_call.side_effect = _mock_call
+
+    response = await hass.services.async_call(
+        DOMAIN,
+        SERVICE_CLOUDSYNC_RUN,
+        {CONF_ENTITY_ID: entity_id},
+        blocking=True,
+        return_response=True,
+    )
+    assert response["results"] == [
+        {
+            "entity_id": entity_id,
+            "uid": "42",
+            "success": True,
+            "error": None,
+            "job_id": 77,
+        }
+    ]
+
+    response = await hass.services.async_call(
+        DOMAIN,
+        SERVICE_CLOUDSYNC_RUN,
+        {CONF_ENTITY_ID: entity_id, "wait": True},
+        blocking=True,
+        return_response=True,
+    )
+    assert response["results"][0]["success"] is False
+    assert response["results"][0]["error"] == "bucket gone"
+
+
+async def test_uid_cache_follows_entity_id_changes(
+    hass: HomeAssistant,
+    config_entry: ConfigEntry,
+    truenas_ws: Generator[AsyncMock | MagicMock],
+) -> None:
+    """A renamed entity is resolved again under its new entity id."""
+    await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
+
+    registry = er.async_get(hass)
+    entity_id = registry.async_get_or_create(
+        domain="sensor",
+        platform=DOMAIN,
+        unique_id="Truenas_test-cloudsync-42",
+        config_entry=config_entry,
+    ).entity_id
+    data = {CONF_ENTITY_ID: entity_id}
+    await hass.services.async_call(DOMAIN, SERVICE_CLOUDSYNC_RUN, data, blocking=True)
+
+    registry.async_update_entity(entity_id, new_entity_id="sensor.backup_b2")
+    await hass.async_block_till_done()
+    data = {CONF_ENTITY_ID: "sensor.backup_b2"}
+    await hass.services.async_call(DOMAIN, SERVICE_CLOUDSYNC_RUN, data, blocking=True)
+
+    assert _last_call_kwargs(config_entry.runtime_data)["params"] == [42]
+    with pytest.raises(HomeAssistantError):
+        await hass.services.async_call(
+            DOMAIN, SERVICE_CLOUDSYNC_RUN, {CONF_ENTITY_ID: entity_id}, blocking=True
+        )
+
+
+async def test_calls_are_routed_to_the_host_of_each_target(
+    hass: HomeAssistant,
+    config_entry: ConfigEntry,
+    truenas_ws: Generator[AsyncMock | MagicMock],
+) -> None:
+    """Every target reaches the host of its config entry, until it is unloaded."""
+    second = MockConfigEntry(
+        domain=DOMAIN,
+        source=SOURCE_USER,
+        data={**MOCK_USER_INPUT, CONF_NAME: "truenas_two"},
+        unique_id="987654321098765",
+        options={"check_dev_version": False},
+    )
+    second.add_to_hass(hass)
+    registry = er.async_get(hass)
+    entity_ids = []
+    for task_id, entry in enumerate((config_entry, second), start=1):
+        await hass.config_entries.async_setup(entry.entry_id)
+        await hass.async_block_till_done()
+        entry.runtime_data.async_call = AsyncMock(return_value=True)
+        device_name = entry.data[CONF_NAME].capitalize()
+        entity_ids.append(
+            registry.async_get_or_create(
+                domain="sensor",
+                platform=DOMAIN,
+                unique_id=f"{device_name}-cloudsync-{task_id}",
+                config_entry=entry,
+            ).entity_id
+        )
+
+    response = await hass.services.async_call(
+        DOMAIN,
+        SERVICE_CLOUDSYNC_RUN,
+        {CONF_ENTITY_ID: entity_ids},
+        blocking=True,
+        return_response=True,
+    )
+    assert [result["uid"] for result in response["results"]] == ["1", "2"]
+    config_entry.runtime_data.async_call.assert_awaited_once_with("cloudsync.sync", [1])
+    second.runtime_data.async_call.assert_awaited_once_with("cloudsync.sync", [2])
+    with pytest.raises(HomeAssistantError, match="Several TrueNAS hosts"):
+        await hass.services.async_call(
+            DOMAIN, SERVICE_PRUNE_SNAPSHOTS, {"dataset": "tank"}, blocking=True
+        )
+
+    await hass.config_entries.async_unload(second.entry_id)
+    await hass.async_block_till_done()
+    assert async_get_router(hass).as_dict() == {"hosts": 1, "routes": 1}
+    with pytest.raises(HomeAssistantError, match="not an entity of a loaded"):
+        await hass.services.async_call(
+            DOMAIN,
+            SERVICE_CLOUDSYNC_RUN,
+            {CONF_ENTITY_ID: entity_ids[1]},
+            blocking=True,
+        )
+
+
+# ---------------------------------------------------------------------------
+# prune_snapshots
+# ---------------------------------------------------------------------------
+
+
+def _snapshot(dataset: str, name: str, created: int) -> dict[str, Any]:
+    """Return a zfs.snapshot.query row."""
+    return {
+        "name": f"{dataset}@{name}",
+        "dataset": dataset,
+        "snapshot_name": name,
+        "properties": {
+            "creation": {
+                "rawvalue": str(created),
+                "parsed": {"$date": created * 1000},
+            },
+            "used": {"parsed": 10},
+        },
+    }
+
+
+def _serve_snapshots(
+    truenas_ws: MagicMock, snapshots: list[dict], failures: Container[str] = ()
+) -> None:
+    """Serve the snapshot queries, like middlewared, and their deletion.
+
+    The deletion of the snapshots in failures reports an error, once done.
+    """
+    default_call = truenas_ws.async_call.side_effect
+
+    async def _mock_call(method: str, params: Any = None) -> Any:
+        if method == "zfs.snapshot.query":
+            return _query(snapshots, *params)
+        if method == "zfs.snapshot.delete":
+            snapshots[:] = [s for s in snapshots if s["name"] != params[0]]
+            if params[0] in failures:
+                raise TruenasException("timeout")
+            return True
+        return await default_call(method=method, params=params)
+
+    truenas_ws.async_call.side_effect = _mock_call
+
+
+async def test_prune_snapshots_deletes_matches_page_by_page(
+    hass: HomeAssistant,
+    config_entry: ConfigEntry,
+    truenas_ws: Generator[AsyncMock | MagicMock],
+) -> None:
+    """Every matching snapshot is deleted across pages, the others are kept."""
+    await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
+    snapshots = [_snapshot("tank/media", f"auto-{i}", 1000) for i in range(5)]
+    snapshots += [
+        _snapshot("tank/media", "manual", 1000),
+        _snapshot("tank/media", "auto-new", 4102444800),
+        _snapshot("tank/apps", "auto-0", 1000),
+    ]
+    _serve_snapshots(truenas_ws, snapshots)
+
+    response = await hass.services.async_call(
+        DOMAIN,
+        SERVICE_PRUNE_SNAPSHOTS,
+        {
+            "dataset": "tank/media",
+            "pattern": "^auto-",
+            "older_than": {"days": 30},
+            "page_size": 2,
+        },
+        blocking=True,
+        return_response=True,
+    )
+
+    assert response["matched"] == 5
+    assert response["deleted"] == 5
+    assert response["failed"] == 0
+    assert response["bytes"] == 50
+    assert [s["name"] for s in snapshots] == [
+        "tank/media@manual",
+        "tank/media@auto-new",
+        "tank/apps@auto-0",
+    ]
+    query = next(
+        c.kwargs["params"][0]
+        for c in truenas_ws.async_call.call_args_list
+        if c.kwargs["method"] == "zfs.snapshot.query"
+    )
+    assert ["dataset", "=", "tank/media"] in query
+    assert ["snapshot_name", "~", ".*(?:^auto-)"] in query
+
+
+async def test_prune_snapshots_pages_skip_nothing_on_failures(
+    hass: HomeAssistant,
+    config_entry: ConfigEntry,
+    truenas_ws: Generator[AsyncMock | MagicMock],
+) -> None:
+    """Unconfirmed deletions do not move the pages over the next snapshots."""
+    await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
+    snapshots = [_snapshot("tank/media", f"auto-{i}", 1000) for i in range(7)]
+    snapshots.append(_snapshot("tank/media", "auto-new", 4102444800))
+    _serve_snapshots(
+        truenas_ws, snapshots, failures={"tank/media@auto-1", "tank/media@auto-2"}
+    )
+
+    response = await hass.services.async_call(
+        DOMAIN,
+        SERVICE_PRUNE_SNAPSHOTS,
+        {"older_than": {"days": 30}, "page_size": 3},
+        blocking=True,
+        return_response=True,
+    )
+
+    assert (response["matched"], response["deleted"], response["failed"]) == (7, 5, 2)
+    assert response["errors"] == [
+        "tank/media@auto-1: timeout",
+        "tank/media@auto-2: timeout",
+    ]
+    assert [s["name"] for s in snapshots] == ["tank/media@auto-new"]
+    # The creation date is filtered on the server
+    query = next(
+        c.kwargs["params"][0]
+        for c in truenas_ws.async_call.call_args_list
+        if c.kwargs["method"] == "zfs.snapshot.query"
+    )
+    assert query[-1][:2] == ["properties.creation.parsed", "<"]
+
+
+async def test_prune_snapshots_pattern_matches_anywhere_in_the_name(
+    hass: HomeAssistant,
+    config_entry: ConfigEntry,
+    truenas_ws: Generator[AsyncMock | MagicMock],
+) -> None:
+    """The pattern selects the same snapshots on the server and locally."""
+    await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
+    snapshots = [
+        _snapshot("tank/media", "daily-keep-1", 1000),
+        _snapshot("tank/media", "keep-2", 1000),
+        _snapshot("tank/media", "daily-3", 1000),
+    ]
+    _serve_snapshots(truenas_ws, snapshots)
+
+    response = await hass.services.async_call(
+        DOMAIN,
+        SERVICE_PRUNE_SNAPSHOTS,
+        {"pattern": "keep", "dry_run": True},
+        blocking=True,
+        return_response=True,
+    )
+
+    assert response["matched"] == 2
+    query = next(
+        c.kwargs["params"][0]
+        for c in truenas_ws.async_call.call_args_list
+        if c.kwargs["method"] == "zfs.snapshot.query"
+    )
+    regex = next(f[2] for f in query if f[0] == "snapshot_name")
+    # middlewared applies the ~ operator with re.match
+    assert [
+        s["snapshot_name"] for s in snapshots if re.match(regex, s["snapshot_name"])
+    ] == [
+        "daily-keep-1",
+        "keep-2",
+    ]
+
+
+async def test_prune_snapshots_dry_run_deletes_nothing(
+    hass: HomeAssistant,
+    config_entry: ConfigEntry,
+    truenas_ws: Generator[AsyncMock | MagicMock],
+) -> None:
+    """A dry run reports the matches without deleting them."""
+    await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
+    snapshots = [_snapshot("tank/media", f"auto-{i}", 1000) for i in range(3)]
+    _serve_snapshots(truenas_ws, snapshots)
+
+    response = await hass.services.async_call(
+        DOMAIN,
+        SERVICE_PRUNE_SNAPSHOTS,
+        {"older_than": {"days": 1}, "dry_run": True, "page_size": 2},
+        blocking=True,
+        return_response=True,
+    )
+
+    assert (response["matched"], response["deleted"], response["bytes"]) == (3, 0, 30)
+    assert len(snapshots) == 3
@@ -1,14 +1,20 @@
 """Tests for TrueNAS switch entities."""
 
-from typing import Generator
+import asyncio
+from datetime import timedelta
+from typing import Any, Generator
 from unittest.mock import AsyncMock, MagicMock
 
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import ATTR_ENTITY_ID, STATE_ON, Platform
 from homeassistant.core import HomeAssistant, ServiceCall
 from homeassistant.helpers import entity_registry as er
+from homeassistant.util import dt as dt_util
+from pytest_homeassistant_custom_component.common import async_fire_time_changed
 from truenaspy import TruenasException
 
+from custom_components.truenas.switch import SWITCH_PENDING_TIMEOUT
+
 
 
 async def test_service_switch_is_on_when_running(
@@ -265,3 +271,166 @@ async def test_vm_turn_off_exception_skips_refresh(
     await hass.services.async_call(Platform.SWITCH, "turn_off", data, blocking=True)
 
     assert len(service_calls) == 1
+
+
+# ---------------------------------------------------------------------------
+# Targeted refresh after an action
+# ---------------------------------------------------------------------------
+
+
+def _called(truenas_ws: MagicMock) -> list[tuple[str, Any]]:
+    """Return the methods and params called on the websocket."""
+    return [
+        (c.kwargs.get("method"), c.kwargs.get("params"))
+        for c in truenas_ws.async_call.call_args_list
+    ]
+
+
+async def test_service_turn_on_refreshes_only_the_service(
+    hass: HomeAssistant,
+    config_entry: ConfigEntry,
+    truenas_ws: Generator[AsyncMock | MagicMock],
+) -> None:
+    """A toggle refetches the toggled service only, not the whole data set."""
+    await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
+    truenas_ws.async_call.reset_mock()
+
+    data = {ATTR_ENTITY_ID: "switch.truenas_test_services_cifs"}
+    await hass.services.async_call(Platform.SWITCH, "turn_on", data, blocking=True)
+    await hass.async_block_till_done(wait_background_tasks=True)
+
+    assert _called(truenas_ws) == [
+        ("service.start", ["cifs"]),
+        ("service.query", [[["service", "=", "cifs"]]]),
+    ]
+    services = config_entry.runtime_data.data["services"]
+    assert [s["service"] for s in services].count("cifs") == 1
+
+
+async def test_app_turn_off_refreshes_after_its_job(
+    hass: HomeAssistant,
+    config_entry: ConfigEntry,
+    truenas_ws: Generator[AsyncMock | MagicMock],
+) -> None:
+    """An action running as a job refreshes its object once the job is done."""
+    await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
+    coordinator = config_entry.runtime_data
+    _stop_app_as_job(truenas_ws)
+    truenas_ws.async_call.reset_mock()
+
+    data = {ATTR_ENTITY_ID: "switch.truenas_test_apps_transmission"}
+    await hass.services.async_call(Platform.SWITCH, "turn_off", data, blocking=True)
+    await hass.async_block_till_done()
+    assert [method for method, _ in _called(truenas_ws)] == ["app.stop"]
+
+    await coordinator._async_job_event(
+        {"collection": "core.get_jobs", "fields": {"id": 42, "state": "SUCCESS"}}
+    )
+    await hass.async_block_till_done(wait_background_tasks=True)
+
+    assert _called(truenas_ws)[-1] == ("app.query", [[["id", "=", "transmission"]]])
+
+
+# ---------------------------------------------------------------------------
+# Optimistic state
+# ---------------------------------------------------------------------------
+
+
+def _stop_app_as_job(truenas_ws: MagicMock) -> None:
+    """Make app.stop return the id of a job which is left running."""
+    default_call = truenas_ws.async_call.side_effect
+
+    async def _mock_call(method: str, params: Any = None) -> Any:
+        if method == "app.stop":
+            return 42
+        return await default_call(method=method, params=params)
+
+    truenas_ws.async_call.side_effect = _mock_call
+
+
+async def _finish_job(hass: HomeAssistant, config_entry: ConfigEntry) -> None:
+    """Finish the job of the action and its refresh."""
+    await config_entry.runtime_data._async_job_event(
+        {"collection": "core.get_jobs", "fields": {"id": 42, "state": "SUCCESS"}}
+    )
+    await hass.async_block_till_done(wait_background_tasks=True)
+
+
+async def test_switch_state_is_optimistic_then_reverted_by_refresh(
+    hass: HomeAssistant,
+    config_entry: ConfigEntry,
+    truenas_ws: Generator[AsyncMock | MagicMock],
+) -> None:
+    """The toggle shows at once and the refetched object reverts it."""
+    await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
+    default_call = truenas_ws.async_call.side_effect
+    release = asyncio.Event()
+
+    async def _mock_call(method: str, params: Any = None) -> Any:
+        if method == "service.query":
+            await release.wait()
+        return await default_call(method=method, params=params)
+
+    truenas_ws.async_call.side_effect = _mock_call
+
+    data = {ATTR_ENTITY_ID: "switch.truenas_test_services_cifs"}
+    await hass.services.async_call(Platform.SWITCH, "turn_off", data, blocking=True)
+    assert hass.states.get("switch.truenas_test_services_cifs").state == "off"
+
+    # The service is still reported RUNNING
+    release.set()
+    await hass.async_block_till_done(wait_background_tasks=True)
+    assert hass.states.get("switch.truenas_test_services_cifs").state == STATE_ON
+
+
+async def test_switch_state_is_confirmed_by_event(
+    hass: HomeAssistant,
+    config_entry: ConfigEntry,
+    truenas_ws: Generator[AsyncMock | MagicMock],
+) -> None:
+    """A matching update confirms the pending state before its deadline."""
+    await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
+    _stop_app_as_job(truenas_ws)
+    coordinator = config_entry.runtime_data
+
+    data = {ATTR_ENTITY_ID: "switch.truenas_test_apps_transmission"}
+    await hass.services.async_call(Platform.SWITCH, "turn_off", data, blocking=True)
+    assert hass.states.get("switch.truenas_test_apps_transmission").state == "off"
+
+    app = next(a for a in coordinator.data["apps"] if a["id"] == "transmission")
+    app["state"] = "STOPPED"
+    coordinator.async_update_listeners()
+    async_fire_time_changed(
+        hass, dt_util.utcnow() + timedelta(seconds=SWITCH_PENDING_TIMEOUT + 1)
+    )
+    await hass.async_block_till_done()
+    assert hass.states.get("switch.truenas_test_apps_transmission").state == "off"
+
+    await _finish_job(hass, config_entry)
+
+
+async def test_switch_state_is_reverted_at_deadline(
+    hass: HomeAssistant,
+    config_entry: ConfigEntry,
+    truenas_ws: Generator[AsyncMock | MagicMock],
+) -> None:
+    """A state not confirmed before its deadline is reverted."""
+    await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
+    _stop_app_as_job(truenas_ws)
+
+    data = {ATTR_ENTITY_ID: "switch.truenas_test_apps_transmission"}
+    await hass.services.async_call(Platform.SWITCH, "turn_off", data, blocking=True)
+    assert hass.states.get("switch.truenas_test_apps_transmission").state == "off"
+
+    async_fire_time_changed(
+        hass, dt_util.utcnow() + timedelta(seconds=SWITCH_PENDING_TIMEOUT + 1)
+    )
+    await hass.async_block_till_done()
+    assert hass.states.get("switch.truenas_test_apps_transmission").state == STATE_ON
+
+    await _finish_job(hass, config_entry)
@@ -0,0 +1,104 @@
+"""Tests for the data protection tasks followed through their jobs."""
+
+from typing import Any
+from unittest.mock import AsyncMock, patch
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers import entity_registry as er
+
+from custom_components.truenas.coordinator import TruenasDataUpdateCoordinator
+
+from .synthetic import configure_websocket_mock, generate_truenas_data
+
+
+def _task_job_event(
+    job_id: int, method: str, task_id: int, state: str, percent: int | None = None
+) -> dict:
+    """Return a core.get_jobs event of a task run."""
+    return {
+        "collection": "core.get_jobs",
+        "msg": "changed",
+        "id": job_id,
+        "fields": {
+            "id": job_id,
+            "method": method,
+            "arguments": [task_id],
+            "state": state,
+            "progress": {"percent": percent, "description": "Sending"},
+        },
+    }
+
+
+async def test_task_queries_are_not_polled_every_refresh(
+    coordinator: TruenasDataUpdateCoordinator,
+) -> None:
+    """The task collections are not queried again by the periodic refresh."""
+    coordinator.websocket.async_call.reset_mock()
+
+    await coordinator.async_refresh()
+
+    methods = [
+        c.kwargs.get("method") for c in coordinator.websocket.async_call.call_args_list
+    ]
+    assert "cloudsync.query" not in methods
+    assert "replication.query" not in methods
+    assert coordinator.data["cloudsync"] == []
+
+
+async def test_task_job_updates_progress_and_refetches(
+    hass: HomeAssistant,
+    coordinator: TruenasDataUpdateCoordinator,
+) -> None:
+    """A running job updates its task live and the task is refetched when done."""
+    coordinator.data["cloudsync"] = [{"id": 1, "description": "b2", "job": None}]
+
+    await coordinator._async_job_event(
+        _task_job_event(10, "cloudsync.sync", 1, "RUNNING", 40)
+    )
+    task = coordinator.data["cloudsync"][0]
+    assert task["job_percent"] == 40
+    assert task["job_description"] == "Sending"
+    assert task["state"] == "RUNNING"
+
+    refreshed = {"id": 1, "description": "b2", "job": {"state": "SUCCESS"}}
+
+    async def _mock_call(method: str, params: Any = None) -> Any:
+        return [refreshed]
+
+    coordinator.websocket.async_call = AsyncMock(side_effect=_mock_call)
+    await coordinator._async_job_event(
+        _task_job_event(10, "cloudsync.sync", 1, "SUCCESS", 100)
+    )
+    await hass.async_block_till_done(wait_background_tasks=True)
+
+    kwargs = coordinator.websocket.async_call.call_args.kwargs
+    assert kwargs["method"] == "cloudsync.query"
+    assert kwargs["params"] == [[["id", "=", 1]]]
+    assert coordinator.data["cloudsync"] == [refreshed]
+    assert coordinator.tasks.refetches == 1
+
+
+async def test_task_sensor_shows_live_progress(
+    hass: HomeAssistant, config_entry: ConfigEntry
+) -> None:
+    """The task sensor attributes follow the job progress."""
+    data = generate_truenas_data(tasks=1)
+    with patch("custom_components.truenas.coordinator.TruenasClient") as mock_cls:
+        configure_websocket_mock(mock_cls.return_value, data)
+        await hass.config_entries.async_setup(config_entry.entry_id)
+        await hass.async_block_till_done()
+
+        coordinator: TruenasDataUpdateCoordinator = config_entry.runtime_data
+        await coordinator._async_job_event(
+            _task_job_event(20, "replication.run", 1, "RUNNING", 75)
+        )
+        coordinator.event_queue.async_flush()
+        await hass.async_block_till_done()
+
+    entity_id = er.async_get(hass).async_get_entity_id(
+        "sensor", "truenas", "Truenas_test-replication-1"
+    )
+    state = hass.states.get(entity_id)
+    assert state.attributes["job_percent"] == 75
+    assert state.attributes["state"]["state"] == "RUNNING"
@@ -4,12 +4,17 @@ import asyncio
 from typing import Any, Generator
 from unittest.mock import AsyncMock, MagicMock, patch
 
+from homeassistant.components.button import DOMAIN as BUTTON_DOMAIN
+from homeassistant.components.button import SERVICE_PRESS
 from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import ATTR_ENTITY_ID
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers import entity_registry as er
 from truenaspy import TruenasException
 
+from custom_components.truenas.const import DOMAIN
 from custom_components.truenas.coordinator import TruenasDataUpdateCoordinator
+from custom_components.truenas.service import SERVICE_UPDATE_APPS
 from custom_components.truenas.update import (
     RESOURCE_LIST,
     RESOURCE_LIST_25_10,
@@ -19,6 +24,8 @@ from custom_components.truenas.update import (
 
 SYSTEM_EID = "update.truenas_test_system_firmware"
 APP_EID = "update.truenas_test_apps_transmission"
+APPS_TO_UPDATE_EID = "sensor.truenas_test_apps_apps_to_update"
+UPDATE_ALL_APPS_EID = "button.truenas_test_apps_update_all_apps"
 
 
 # ---------------------------------------------------------------------------
@@ -98,13 +105,16 @@ async def test_system_update_install_calls_websocket(
     entity = UpdateSensor(coordinator, RESOURCE_LIST_25_10[0])
     coordinator.websocket.async_call.reset_mock()
 
-    with patch.object(coordinator, "async_refresh", new=AsyncMock()):
+    with patch.object(coordinator, "async_refresh", new=AsyncMock()) as refresh:
         await entity.async_install(None, False)
 
     methods = [
         c.kwargs.get("method") for c in coordinator.websocket.async_call.call_args_list
     ]
     assert "update.run" in methods
+    # Only the update status is refetched
+    assert methods[-1] == "update.status"
+    refresh.assert_not_called()
 
 
 async def test_system_update_install_truenas_exception_is_caught(
@@ -117,11 +127,13 @@ async def test_system_update_install_truenas_exception_is_caught(
         side_effect=TruenasException("update failed")
     )
 
-    with patch.object(coordinator, "async_refresh", new=AsyncMock()) as refresh:
+    with patch.object(
+        coordinator, "async_refresh_item", new=AsyncMock()
+    ) as refresh_item:
         # Must not raise an exception.
         await entity.async_install(None, False)
 
-    refresh.assert_not_called()
+    refresh_item.assert_not_called()
 
 
 # ---------------------------------------------------------------------------
@@ -178,7 +190,12 @@ async def test_app_latest_version_upgrade_available(
     """upgrade_available → latest_version returns latest_version."""
     entity = _make_app_entity(
         coordinator,
-        {"id": "foo", "version": "1.0", "upgrade_available": True, "latest_version": "2.0"},
+        {
+            "id": "foo",
+            "version": "1.0",
+            "upgrade_available": True,
+            "latest_version": "2.0",
+        },
     )
     assert entity.latest_version == "2.0"
 
@@ -256,40 +273,42 @@ async def _run_app_install(
     entity = _make_app_entity(coordinator, device_data)
     entity.hass = hass
 
-    captured: dict[str, Any] = {}
     methods: list[str] = []
 
-    async def fake_subscribe(collection: str, cb: Any) -> None:
-        captured[collection] = cb
-
-    async def fake_unsubscribe(collection: str) -> None:
-        return None
-
     async def fake_call(method: str | None = None, params: Any = None) -> Any:
         methods.append(method)
         if method in ("app.upgrade", "app.pull_images"):
 
             async def _fire() -> None:
-                # Let async_call return and assign job_id before firing the
+                # Let async_call return and track the job before firing the
                 # event (HA tasks start eagerly).
                 await asyncio.sleep(0)
-                await captured["core.get_jobs"](
-                    {"fields": {"id": 99, "state": "SUCCESS", "progress": {"percent": 50}}}
+                await coordinator._async_job_event(
+                    {
+                        "collection": "core.get_jobs",
+                        "msg": "changed",
+                        "fields": {
+                            "id": 99,
+                            "state": "SUCCESS",
+                            "progress": {"percent": 50},
+                        },
+                    }
                 )
 
             hass.async_create_task(_fire())
             return 99
         return []
 
-    coordinator.websocket.async_subscribe = AsyncMock(side_effect=fake_subscribe)
-    coordinator.websocket.async_unsubscribe = AsyncMock(side_effect=fake_unsubscribe)
     coordinator.websocket.async_call = AsyncMock(side_effect=fake_call)
 
-    with patch.object(UpdateAppSensor, "async_write_ha_state"), patch.object(
-        coordinator, "async_refresh", new=AsyncMock()
+    with (
+        patch.object(UpdateAppSensor, "async_write_ha_state"),
+        patch.object(coordinator, "async_refresh", new=AsyncMock()) as refresh,
     ):
         await entity.async_install(None, False)
 
+    # Never a full refresh, only the installed app is refetched
+    refresh.assert_not_called()
     return methods
 
 
@@ -310,6 +329,8 @@ async def test_app_install_upgrade_calls_app_upgrade(
         },
     )
     assert "app.upgrade" in methods
+    assert methods[-1] == "app.query"
+    coordinator.websocket.async_unsubscribe.assert_not_called()
 
 
 async def test_app_install_image_update_calls_pull_images(
@@ -415,3 +436,131 @@ async def test_system_in_progress_false_without_percent(
     coordinator.data["events"]["update_status"] = {}
     entity = _make_system_entity(coordinator, "26.0.0", {})
     assert entity.in_progress is False
+
+
+# ---------------------------------------------------------------------------
+# Update of all the apps
+# ---------------------------------------------------------------------------
+
+
+def _outdate_apps(coordinator: TruenasDataUpdateCoordinator, *app_ids: str) -> None:
+    """Flag apps with an upgrade available."""
+    for app in coordinator.data["apps"]:
+        if app["id"] in app_ids:
+            app.update(upgrade_available=True, latest_version="9.9.9")
+    coordinator.async_update_listeners()
+
+
+async def test_apps_to_update_sensor_counts_outdated_apps(
+    hass: HomeAssistant,
+    config_entry: ConfigEntry,
+    truenas_ws: Generator[AsyncMock | MagicMock],
+) -> None:
+    """The sensor counts the outdated apps out of all of them."""
+    await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
+
+    state = hass.states.get(APPS_TO_UPDATE_EID)
+    assert state.state == "0"
+    assert state.attributes["total"] == 6
+
+    _outdate_apps(config_entry.runtime_data, "jellyfin", "pihole")
+    await hass.async_block_till_done()
+
+    state = hass.states.get(APPS_TO_UPDATE_EID)
+    assert state.state == "2"
+    assert state.attributes["total"] == 6
+    assert state.attributes["apps"] == ["jellyfin", "pihole"]
+    assert state.attributes["progress"] is None
+
+    # The progress of an update of all the apps is shown by the sensor
+    config_entry.runtime_data.app_updates.percents = {"jellyfin": 100, "pihole": 0}
+    config_entry.runtime_data.async_update_listeners()
+    await hass.async_block_till_done()
+    assert hass.states.get(APPS_TO_UPDATE_EID).attributes["progress"] == 50
+    config_entry.runtime_data.app_updates.percents = {}
+
+
+async def test_update_all_apps_button_updates_outdated_apps(
+    hass: HomeAssistant,
+    config_entry: ConfigEntry,
+    truenas_ws: Generator[AsyncMock | MagicMock],
+) -> None:
+    """Pressing the button upgrades every outdated app."""
+    await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
+    _outdate_apps(config_entry.runtime_data, "jellyfin", "pihole")
+    truenas_ws.async_call.reset_mock()
+
+    await hass.services.async_call(
+        BUTTON_DOMAIN,
+        SERVICE_PRESS,
+        {ATTR_ENTITY_ID: UPDATE_ALL_APPS_EID},
+        blocking=True,
+    )
+    # The press only starts the update
+    await hass.async_block_till_done(wait_background_tasks=True)
+
+    upgraded = [
+        c.kwargs["params"]
+        for c in truenas_ws.async_call.call_args_list
+        if c.kwargs["method"] == "app.upgrade"
+    ]
+    assert sorted(upgraded) == [["jellyfin"], ["pihole"]]
+    assert not config_entry.runtime_data.app_updates.running
+
+
+async def test_update_apps_service_updates_outdated_apps(
+    hass: HomeAssistant,
+    config_entry: ConfigEntry,
+    truenas_ws: Generator[AsyncMock | MagicMock],
+) -> None:
+    """update_apps upgrades every outdated app, follows the jobs, refetches once."""
+    await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
+    coordinator: TruenasDataUpdateCoordinator = config_entry.runtime_data
+    _outdate_apps(coordinator, "jellyfin", "pihole")
+    default_call = truenas_ws.async_call.side_effect
+    job_ids = iter((11, 12))
+
+    async def _mock_call(method: str, params: Any = None) -> Any:
+        if method == "app.upgrade":
+            job_id = next(job_ids)
+            state = "SUCCESS" if params == ["jellyfin"] else "FAILED"
+            coordinator.jobs.async_apply(
+                {"fields": {"id": job_id, "state": state, "error": "no space"}}
+            )
+            return job_id
+        return await default_call(method=method, params=params)
+
+    truenas_ws.async_call.side_effect = _mock_call
+    truenas_ws.async_call.reset_mock()
+
+    response = await hass.services.async_call(
+        DOMAIN, SERVICE_UPDATE_APPS, {}, blocking=True, return_response=True
+    )
+
+    assert {r["app"]: (r["success"], r["error"]) for r in response["results"]} == {
+        "jellyfin": (True, None),
+        "pihole": (False, "no space"),
+    }
+    assert {r["host"] for r in response["results"]} == {"truenas_test"}
+    methods = [c.kwargs["method"] for c in truenas_ws.async_call.call_args_list]
+    assert methods.count("app.upgrade") == 2
+    assert methods.count("app.query") == 1
+    assert not coordinator.app_updates.running
+
+
+async def test_app_updater_aggregates_progress(
+    coordinator: TruenasDataUpdateCoordinator,
+) -> None:
+    """The progress of an update of all the apps is the mean of its apps."""
+    updater = coordinator.app_updates
+    updater.percents = {"jellyfin": 0, "pihole": 0}
+
+    job = coordinator.jobs.track(5)
+    job.async_add_listener(lambda job: updater._async_progress("jellyfin", job))
+    job.async_update({"state": "RUNNING", "progress": {"percent": 50}})
+
+    assert updater.progress == 25
+    updater.percents = {}